@@ -0,0 +1,65 @@
+"""
+Benchmark for ranking a large module's issues by error history.
+
+Generates a module of `functions` functions, records errors in a few of
+them at the lines they had before 10 lines were added at the top, then
+edits one function repeatedly. Each version is analyzed incrementally,
+returning either every issue or the top 20 ranked by failures; the
+benchmark compares the time per edit and the size of what is shipped.
+
+Usage: python benchmarks/bench_correlation.py [functions]
+"""
+
+import json
+import sys
+import time
+
+from error_learner.analyzer import PatternAnalyzer
+
+FUNCTION = '''
+def handler_{n}(request, data):
+    total = data["count"] + request.offset
+    ratio = total / data["size"]
+    for item in data["items"]:
+        total += item["value"] * ratio
+    return total
+'''
+
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 1_500
+    source = "\n" * 10 + "".join(FUNCTION.format(n=n) for n in range(functions))
+    errors = [{
+        "error_type": "ZeroDivisionError" if n % 2 else "KeyError",
+        "line": 7 * n + 3 + n % 3,
+        "count": 1 + n % 50,
+        "function": f"handler_{n}",
+        "function_line": 7 * n + 2,
+    } for n in range(0, functions, max(functions // 40, 1))]
+    lines = source.split("\n")
+    middle = len(lines) // 2
+    edits = 50
+    versions = []
+    for i in range(edits):
+        edited = list(lines)
+        edited[middle] = edited[middle] + f" + {i}" if edited[middle].strip() else f"x{i} = {i}"
+        versions.append("\n".join(edited))
+    print(f"{len(lines)} lines, {len(errors)} errors")
+
+    analyzer = PatternAnalyzer()
+    analyzer.enable_incremental()
+    analyzer.analyze_source(source, "module.py", errors)
+    for label, analyze in (
+        ("all issues", lambda version: analyzer.analyze_source(version, "module.py", errors)),
+        ("top 20", lambda version: analyzer.top_issues("module.py", 20, errors, version)),
+    ):
+        start = time.perf_counter()
+        for version in versions:
+            issues = analyze(version)
+        elapsed = (time.perf_counter() - start) / edits
+        print(f"{label:>12}: {elapsed * 1000:8.2f} ms per edit, {len(issues):5} issues, "
+              f"{len(json.dumps(issues)) / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark for finding the Python files of a workspace.
+
+Generates a workspace of `packages` packages alongside a node_modules tree,
+a build directory and a virtualenv not named .venv, then times the former
+rglob-and-filter discovery against a cold directory walk, a rescan of the
+unchanged tree and a git ls-files listing.
+
+Usage: python benchmarks/bench_discovery.py [packages]
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from error_learner.discovery import WorkspaceScanner
+
+
+def _write(root: Path, directory: str, names, suffix: str) -> None:
+    path = root / directory
+    path.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (path / f"{name}{suffix}").write_text("x = 1\n")
+
+
+def build(root: Path, packages: int) -> None:
+    for p in range(packages):
+        for s in range(5):
+            _write(root, f"src/pkg{p}/sub{s}", range(8), ".py")
+        for m in range(20):
+            _write(root, f"node_modules/mod{p}_{m}/lib", range(10), ".js")
+            _write(root, f"node_modules/mod{p}_{m}/scripts", range(2), ".py")
+        _write(root, f"build/lib/pkg{p}", range(40), ".py")
+        _write(root, f"test_venv/lib/python3/site-packages/dep{p}", range(40), ".py")
+    (root / "test_venv" / "pyvenv.cfg").write_text("home = /usr/bin\n")
+    (root / ".gitignore").write_text("node_modules/\nbuild/\ntest_venv/\n")
+    # Old enough for listings to be kept
+    old = time.time() - 60
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, (old, old))
+
+
+def rglob(root: Path):
+    return [str(p) for p in root.rglob("*.py")
+            if not any(ignore in str(p) for ignore in [".venv", "__pycache__", ".git"])]
+
+
+def timed(label: str, func, runs: int = 5):
+    start = time.perf_counter()
+    for _ in range(runs):
+        files = func()
+    elapsed = (time.perf_counter() - start) / runs
+    print(f"{label:>16}: {elapsed * 1000:8.2f} ms, {len(files)} files")
+
+
+def main() -> None:
+    packages = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    root = Path(tempfile.mkdtemp(prefix="bench_discovery_"))
+    try:
+        build(root, packages)
+        print(f"{sum(len(d) + len(f) for _, d, f in os.walk(root))} entries")
+        timed("rglob + filter", lambda: rglob(root), runs=1)
+        timed("walk (cold)", lambda: WorkspaceScanner(str(root), use_git=False).files())
+        scanner = WorkspaceScanner(str(root), use_git=False)
+        scanner.files()
+        timed("rescan", scanner.files, runs=20)
+        if shutil.which("git"):
+            subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+            timed("git ls-files", WorkspaceScanner(str(root)).files)
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
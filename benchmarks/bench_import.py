@@ -0,0 +1,73 @@
+"""
+Import-time benchmark with budgets.
+
+Runs each import in a fresh interpreter under `python -X importtime`,
+takes the best of several runs and compares the cumulative time of the
+imported module against its budget. Also checks that importing the
+package does not load the tracker or analyzer modules.
+
+Usage: python benchmarks/bench_import.py [runs]
+
+Exits with status 1 if an import is over budget.
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+# Statement -> budget in milliseconds
+BUDGETS = {
+    "import error_learner": 15,
+    "from error_learner import track": 80,
+    "from error_learner import tracker": 100,
+    "from error_learner import analyzer": 140,
+}
+
+# Modules that `import error_learner` alone must not load
+DEFERRED = ["error_learner.core", "error_learner.extension", "error_learner.analyzer", "ast"]
+
+_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_time_ms(statement: str, env: dict) -> float:
+    """Total time spent in the imports a statement triggers, in milliseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    total = 0
+    for match in _LINE.finditer(result.stderr):
+        cumulative, indent, module = match.groups()
+        # Top-level entries not already loaded by the bare interpreter
+        if not indent and module not in ("site", "encodings", "_frozen_importlib_external"):
+            total += int(cumulative)
+    return total / 1000
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+
+    over = False
+    print(f"{'statement':<40} {'best ms':>8} {'budget':>7}")
+    for statement, budget in BUDGETS.items():
+        best = min(import_time_ms(statement, env) for _ in range(runs))
+        over |= best > budget
+        flag = "" if best <= budget else "  OVER"
+        print(f"{statement:<40} {best:>8.1f} {budget:>7}{flag}")
+
+    check = f"import sys, error_learner; print(*[m for m in {DEFERRED!r} if m in sys.modules])"
+    loaded = subprocess.run([sys.executable, "-c", check], env=env,
+                            capture_output=True, text=True, check=True).stdout.split()
+    if loaded:
+        over = True
+        print(f"import error_learner loaded: {', '.join(loaded)}")
+
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
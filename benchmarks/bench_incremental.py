@@ -0,0 +1,53 @@
+"""
+Benchmark for re-analyzing a large module after a one-line edit.
+
+Generates a module of `functions` functions, then edits one function in
+the middle repeatedly and times a full analysis of each version against
+an incremental one, which re-parses and visits only the edited block.
+
+Usage: python benchmarks/bench_incremental.py [functions]
+"""
+
+import sys
+import time
+
+from error_learner.analyzer import PatternAnalyzer
+
+FUNCTION = '''
+def handler_{n}(request, data):
+    total = data["count"] + request.offset
+    ratio = total / data["size"]
+    for item in data["items"]:
+        total += item["value"] * ratio
+    return total
+'''
+
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 1_500
+    source = "".join(FUNCTION.format(n=n) for n in range(functions))
+    lines = source.split("\n")
+    middle = len(lines) // 2
+    edits = 50
+    versions = []
+    for i in range(edits):
+        edited = list(lines)
+        edited[middle] = edited[middle] + f" + {i}" if edited[middle].strip() else f"x{i} = {i}"
+        versions.append("\n".join(edited))
+    print(f"{len(lines)} lines, {functions} functions")
+
+    full = PatternAnalyzer()
+    incremental = PatternAnalyzer()
+    incremental.enable_incremental()
+    incremental.analyze_source(source, "module.py", [])
+
+    for label, analyzer in (("full", full), ("incremental", incremental)):
+        start = time.perf_counter()
+        for version in versions:
+            issues = analyzer.analyze_source(version, "module.py", [])
+        elapsed = (time.perf_counter() - start) / edits
+        print(f"{label:>12}: {elapsed * 1000:8.2f} ms per edit, {len(issues)} issues")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Memory benchmark for recorded errors.
+
+Measures the memory held per 1M recorded errors, for ErrorTracker (one
+ErrorInfo per occurrence) and ExtensionTracker (one entry per distinct
+error type and line), against the dict/dataclass layouts used before.
+The tracker's own fixed cost is left out. Without arguments, runs a high
+cardinality case (100k distinct lines) and a low one (100 lines).
+
+Usage: python benchmarks/bench_memory.py [errors] [distinct_lines]
+"""
+
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Type
+
+from error_learner.core import ErrorInfo
+from error_learner.extension import ExtensionTracker
+
+
+@dataclass
+class LegacyErrorInfo:
+    """The ErrorInfo dataclass used before slotted records."""
+    timestamp: datetime
+    error_type: Type[Exception]
+    error_message: str
+    function_name: str
+    line_number: int
+    fix_suggestion: Optional[str] = None
+
+
+def measure(build, setup=None) -> int:
+    tracemalloc.start()
+    state = setup() if setup is not None else None
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build(state) if setup is not None else build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept, state
+    return after - before
+
+
+def occurrences(errors: int, info_class) -> list:
+    now = time.time()
+    stamp = datetime.fromtimestamp(now) if info_class is LegacyErrorInfo else now
+    return [info_class(stamp, KeyError, "'user_id'", "handle_request", 42)
+            for _ in range(errors)]
+
+
+def legacy_entries(errors: int, lines: int) -> dict:
+    history = {}
+    for i in range(errors):
+        entries = history.setdefault(f"/srv/app/handlers.py:func_{i % 100}", {})
+        key = ("KeyError", i % lines)
+        entry = entries.get(key)
+        if entry is not None:
+            entry['count'] += 1
+            entry['timestamp'] = datetime.now().isoformat()
+        else:
+            entries[key] = {
+                'timestamp': datetime.now().isoformat(),
+                'error_type': 'KeyError',
+                # Made per error like str(exc); a literal would be shared
+                'message': "".join(("'user", "_id'")),
+                'line': i % lines,
+                # Built at runtime like a real path; a literal would be one shared constant
+                'file': "".join(("/srv/app/", "handlers.py")),
+                'count': 1
+            }
+    return history
+
+
+def new_tracker() -> ExtensionTracker:
+    tracker = ExtensionTracker()
+    tracker.logger.disabled = True
+    return tracker
+
+
+def tracker_entries(tracker: ExtensionTracker, errors: int, lines: int) -> ExtensionTracker:
+    for i in range(errors):
+        tracker._track_error(KeyError, "".join(("'user", "_id'")), f"func_{i % 100}", i % lines,
+                             "".join(("/srv/app/", "handlers.py")))
+    return tracker
+
+
+def run(errors: int, lines: int) -> None:
+    scale = 1_000_000 / errors
+
+    print(f"{errors:,} errors, {lines:,} distinct lines; MB per 1M errors")
+    rows = [
+        ("ErrorInfo (dataclass)", lambda: occurrences(errors, LegacyErrorInfo), None),
+        ("ErrorInfo (slotted)", lambda: occurrences(errors, ErrorInfo), None),
+        ("history entries (dicts)", lambda: legacy_entries(errors, lines), None),
+        ("ExtensionTracker",
+         lambda tracker: tracker_entries(tracker, errors, lines), new_tracker),
+    ]
+    for name, build, setup in rows:
+        print(f"{name:>24}: {measure(build, setup) * scale / 1e6:8.2f} MB")
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        run(int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
+        return
+    run(1_000_000, 100_000)
+    print()
+    run(20_000, 100)
+
+
+if __name__ == "__main__":
+    main()
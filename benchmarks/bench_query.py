@@ -0,0 +1,71 @@
+"""
+Benchmark for querying a large on-disk error history.
+
+Writes `records` log records spread over `distinct` errors and a month
+of timestamps, compacting along the way, then times bringing the query
+index up to date and answering filtered, time-ranged top-k queries.
+
+Usage: python benchmarks/bench_query.py [records] [distinct]
+"""
+
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from error_learner.index import ErrorIndex
+from error_learner.store import ErrorStore
+
+
+def fill(path: str, records: int, distinct: int) -> None:
+    """Write records straight to the store's log, compacting as it grows."""
+    store = ErrorStore(path, compact_every=100_000)
+    start = datetime(2024, 4, 1)
+    for i in range(records):
+        n = i % distinct
+        store._pending.append({
+            "key": f"pkg/module{n % 50}.py:func{n}",
+            "error_type": ("KeyError", "ValueError", "OSError")[n % 3],
+            "message": "boom",
+            "line": n % 200,
+            "file": f"pkg/module{n % 50}.py",
+            "timestamp": (start + timedelta(seconds=i * 2_592_000 // records)).isoformat(),
+            "count": 1,
+        })
+        if len(store._pending) >= 10_000:
+            store.flush()
+    store.close()
+
+
+def timed(label: str, func: Callable[[], Any]) -> None:
+    start = time.perf_counter()
+    func()
+    print(f"{label:>28}: {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+
+def main() -> None:
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        fill(path, records, distinct)
+        print(f"wrote {records} records over {distinct} errors in "
+              f"{time.perf_counter() - start:.1f} s")
+
+        timed("refresh after writing", lambda: ErrorIndex(path).refresh().close())
+        timed("refresh, up to date", lambda: ErrorIndex(path).refresh().close())
+        index = ErrorIndex(path).refresh()
+        since = datetime(2024, 4, 20, 6).timestamp()
+        timed("top 10", lambda: index.query(top=10))
+        timed("top 10 by file and type", lambda: index.query(
+            file="module7.py", error_type="KeyError", top=10))
+        timed("top 10 in the last 10 days", lambda: index.query(since=since, top=10))
+        timed("stats in the last 10 days", lambda: index.stats(since=since, top=10))
+        index.close()
+        # What every query cost without the index: replay the snapshot and log tail
+        timed("load the store instead", lambda: ErrorStore(path).load())
+
+
+if __name__ == "__main__":
+    main()
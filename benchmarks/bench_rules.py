@@ -0,0 +1,80 @@
+"""
+Benchmark of the rule engine against the previous NodeVisitor chain.
+
+Generates a large module and reports AST nodes analyzed per second.
+
+Usage: python benchmarks/bench_rules.py [functions]
+"""
+
+import ast
+import sys
+import time
+
+from error_learner.rules import RuleContext, RuleEngine
+
+TEMPLATE = """
+def handler_{n}(data, total, scale):
+    value = data['key_{n}']
+    ratio = value / total
+    scaled = [item * scale for item in data['items'] if item]
+    name = f"{{data['name']}}-{n}"
+    result = {{'ratio': ratio + 1, 'scaled': scaled, 'name': name.upper()}}
+    for i, item in enumerate(scaled):
+        result[str(i)] = item - ratio
+    return result
+"""
+
+
+class LegacyVisitor(ast.NodeVisitor):
+    """The if/elif visitor the analyzer used before the rule engine."""
+
+    def __init__(self, file_errors):
+        self.file_errors = file_errors
+        self.issues = []
+
+    def visit(self, node):
+        line_no = getattr(node, 'lineno', None)
+        if line_no is not None:
+            if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name):
+                self.issues.append({'type': 'KeyError', 'line': line_no})
+            elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.Div):
+                self.issues.append({'type': 'ZeroDivisionError', 'line': line_no})
+            elif isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub, ast.Mult)):
+                if any(e['error_type'] == 'TypeError' for e in self.file_errors):
+                    self.issues.append({'type': 'TypeError', 'line': line_no})
+        self.generic_visit(node)
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = "".join(TEMPLATE.format(n=n) for n in range(functions))
+    tree = ast.parse(source)
+    nodes = sum(1 for _ in ast.walk(tree))
+    file_errors = [{'error_type': 'TypeError', 'line': 1}]
+
+    def legacy():
+        LegacyVisitor(file_errors).visit(tree)
+
+    engine = RuleEngine()
+    context = RuleContext('bench.py', file_errors)
+
+    def engine_run():
+        engine.run(tree, context)
+
+    print(f"{source.count(chr(10)):,} lines, {nodes:,} nodes")
+    for name, func in [('NodeVisitor chain', legacy), ('RuleEngine', engine_run)]:
+        elapsed = timed(func)
+        print(f"{name:>18}: {nodes / elapsed:>12,.0f} nodes/s")
+
+
+if __name__ == "__main__":
+    main()
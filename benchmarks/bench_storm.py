@@ -0,0 +1,54 @@
+"""
+Benchmark for error tracking during an incident storm.
+
+Records the same error many times, as a failing dependency would, and
+reports throughput, the recorded count and how many fix suggestions were
+logged. Modes: unlimited suggests a fix on every occurrence, as before;
+limited rate-limits suggestions; sampled also samples occurrences.
+
+Usage: python benchmarks/bench_storm.py [errors]
+"""
+
+import io
+import logging
+import sys
+import time
+
+from error_learner.extension import ExtensionTracker
+from error_learner.policies import SamplingPolicy
+
+
+def run(tracker: ExtensionTracker, errors: int) -> float:
+    """Record the same error `errors` times and return errors per second."""
+    track = tracker._track_error
+    start = time.perf_counter()
+    for _ in range(errors):
+        track(ConnectionError, "Connection refused", "fetch", 42, "client.py")
+    return errors / (time.perf_counter() - start)
+
+
+def main() -> None:
+    errors = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"{'mode':>10} {'errors/s':>12} {'counted':>10} {'logged':>7}")
+    modes = [
+        ("unlimited", None),
+        ("limited", SamplingPolicy(exact_first=None)),
+        ("sampled", SamplingPolicy()),
+    ]
+    for mode, sampling in modes:
+        tracker = ExtensionTracker(sampling=sampling)
+        # Log to memory, so formatting is paid for but the terminal is not
+        output = io.StringIO()
+        tracker.logger.handlers = [logging.StreamHandler(output)]
+        tracker.logger.propagate = False
+        if mode == "unlimited":
+            # Suggest on every occurrence, as before rate limiting
+            tracker._suggest_limiter.interval = 0
+        rate = run(tracker, errors)
+        counted = tracker._type_counts[("client.py:fetch", "ConnectionError")]
+        logged = output.getvalue().count("Recurring error")
+        print(f"{mode:>10} {rate:>12,.0f} {counted:>10,} {logged:>7,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Stress benchmark for concurrent error tracking.
+
+Runs ExtensionTracker._track_error from 1 to 32 threads and reports
+throughput, checking that no counts were lost.
+
+Usage: python benchmarks/bench_threads.py [errors_per_thread]
+"""
+
+import sys
+import threading
+import time
+
+from error_learner.extension import ExtensionTracker
+
+THREAD_COUNTS = [1, 2, 4, 8, 16, 32]
+FUNCTIONS = 64
+LINES = 16
+
+
+def run(tracker: ExtensionTracker, threads: int, per_thread: int) -> float:
+    """Record per_thread errors from each thread and return errors per second."""
+    start_barrier = threading.Barrier(threads + 1)
+
+    def worker(worker_id: int) -> None:
+        start_barrier.wait()
+        for i in range(per_thread):
+            n = worker_id + i
+            tracker._track_error(
+                KeyError, "'missing'", f"func_{n % FUNCTIONS}", n % LINES, "bench.py"
+            )
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    start_barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return threads * per_thread / elapsed
+
+
+def main() -> None:
+    per_thread = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+    print(f"{'threads':>8} {'errors/s':>12} {'exact':>6}")
+    for threads in THREAD_COUNTS:
+        tracker = ExtensionTracker()
+        tracker.logger.disabled = True
+        rate = run(tracker, threads, per_thread)
+        recorded = sum(tracker._type_counts.values())
+        exact = recorded == threads * per_thread
+        print(f"{threads:>8} {rate:>12,.0f} {str(exact):>6}")
+
+
+if __name__ == "__main__":
+    main()
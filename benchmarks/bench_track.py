@@ -0,0 +1,51 @@
+"""
+Microbenchmark for the cost @track adds to successful calls.
+
+Times calls to an undecorated function, to the same function tracked
+through the wrapper, and, on Python 3.12+, tracked through sys.monitoring.
+
+Usage: python benchmarks/bench_track.py [calls]
+"""
+
+import sys
+import timeit
+
+from error_learner import monitoring
+from error_learner.core import ErrorTracker
+
+
+def add(a, b=1):
+    return a + b
+
+
+def track(use_monitoring: bool):
+    """Track a fresh copy of add, so each mode registers its own code object."""
+    tracker = ErrorTracker()
+    tracker.use_monitoring = use_monitoring
+    copy = type(add)(add.__code__.replace(), add.__globals__, "add", add.__defaults__)
+    return tracker.track(copy)
+
+
+def main() -> None:
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    modes = [("undecorated", add), ("wrapper", track(False))]
+    if monitoring.AVAILABLE:
+        modes.append(("sys.monitoring", track(True)))
+
+    # Interleave the modes, so drift in machine speed affects all of them
+    best = {mode: float("inf") for mode, _ in modes}
+    for _ in range(7):
+        for mode, func in modes:
+            elapsed = timeit.timeit(lambda: func(1), number=calls)
+            best[mode] = min(best[mode], elapsed)
+
+    print(f"Python {sys.version.split()[0]}")
+    print(f"{'mode':>15} {'ns/call':>8} {'overhead':>9}")
+    baseline = best["undecorated"] / calls * 1e9
+    for mode, _ in modes:
+        ns = best[mode] / calls * 1e9
+        print(f"{mode:>15} {ns:>8.1f} {ns - baseline:>+9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,50 @@ Error Learner - A tool for automatic error tracking and learning for Python code
 
 This package provides functionality to automatically track errors in Python code
 and learn from them to suggest improvements and prevent future errors.
+
+Public names are imported on first use, so importing the package stays
+cheap and the analyzer is only loaded by code that analyzes.
 """
 
+import importlib
+import sys
+import types
+
 __version__ = "1.0.0"
 __author__ = "Eric Wahoo"
 __email__ = ""
 
-from error_learner.core import track, ErrorTracker
-from error_learner.analyzer import PatternAnalyzer
-from error_learner.extension import ExtensionTracker
+# Public name -> module providing it
+_LAZY_NAMES = {
+    'track': 'error_learner.core',
+    'ErrorTracker': 'error_learner.core',
+    'ExtensionTracker': 'error_learner.extension',
+    'tracker': 'error_learner.extension',
+    'PatternAnalyzer': 'error_learner.analyzer',
+    'analyzer': 'error_learner.analyzer',
+}
+
+__all__ = ['track', 'tracker', 'analyzer', 'ErrorTracker', 'PatternAnalyzer']
+
+def __getattr__(name):
+    module_name = _LAZY_NAMES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES))
 
-# Create global instances
-tracker = ExtensionTracker()
-analyzer = PatternAnalyzer()
+class _Package(types.ModuleType):
+    """Keeps `error_learner.analyzer` the global analyzer, not the submodule."""
+    
+    def __setattr__(self, name, value):
+        # Importing a submodule binds it on its package; `analyzer` is the
+        # PatternAnalyzer instance, as it was before imports became lazy
+        if name == 'analyzer' and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
 
-__all__ = ['track', 'tracker', 'analyzer', 'ErrorTracker', 'PatternAnalyzer'] 
\ No newline at end of file
+sys.modules[__name__].__class__ = _Package 
\ No newline at end of file
@@ -3,115 +3,298 @@ Pattern analyzer for identifying potential code issues based on error history.
 """
 
 import ast
+import importlib.util
 import logging
-from pathlib import Path
-from typing import Dict, List, Set, Optional
-from collections import defaultdict
+import os
+import threading
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, Future, wait
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, Iterator, List, Set, Optional, Tuple
+from collections import OrderedDict, defaultdict
 
-from .extension import tracker
+from .cache import AnalysisCache, Fingerprint, content_hash, errors_digest
+from .correlation import ErrorCorrelation, function_spans
+from .discovery import WorkspaceScanner
+from .incremental import DocumentAnalysis
+from .extension import get_tracker
+from .rules import Rule, RuleContext, RuleEngine
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
 
 class PatternAnalyzer:
     """Analyzes code patterns and suggests improvements based on error history."""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[AnalysisCache] = None,
+                 exclude: Optional[Iterable[str]] = None):
+        """
+        Create an analyzer.
+        
+        Args:
+            cache: Cache of analysis results; see enable_cache()
+            exclude: Patterns in .gitignore syntax of workspace paths never
+                to analyze; defaults to discovery.DEFAULT_EXCLUDES
+        """
         self.logger = logging.getLogger("error_learner.analyzer")
         self.error_patterns = defaultdict(list)
+        self.cache = cache
+        self.exclude = list(exclude) if exclude is not None else None
+        # workspace directory -> scanner, keeping its listings between analyses
+        self._scanners: Dict[str, WorkspaceScanner] = {}
+        # file path -> (errors digest, the file's errors indexed for ranking)
+        self._correlations: Dict[str, Tuple[str, ErrorCorrelation]] = {}
+        self.engine = RuleEngine()
+        self._pool: Optional["ProcessPoolExecutor"] = None
+        self._pool_workers = 0
+        # file path -> incremental analysis state, most recently used last
+        self._documents: Optional["OrderedDict[str, DocumentAnalysis]"] = None
+        self._max_documents = 0
     
-    def analyze_file(self, file_path: str) -> List[Dict]:
+    def enable_cache(self, path: Optional[str] = None, max_entries: int = 50_000) -> None:
+        """
+        Cache analysis results on disk, so unchanged files are not re-parsed.
+        
+        Args:
+            path: Cache file; defaults to one in the error store directory
+            max_entries: Maximum number of cached files
+        """
+        self.cache = AnalysisCache(path, max_entries)
+    
+    def enable_incremental(self, max_documents: int = 256) -> None:
+        """
+        Re-analyze only the top-level blocks that changed since a file's last analysis.
+        
+        Args:
+            max_documents: Maximum number of files whose state is kept
+        """
+        self._documents = OrderedDict()
+        self._max_documents = max_documents
+    
+    @property
+    def incremental(self) -> bool:
+        """Whether incremental re-analysis is enabled."""
+        return self._documents is not None
+    
+    def forget(self, file_path: str) -> None:
+        """Drop a file's incremental analysis state, such as when its editor closes."""
+        if self._documents is not None:
+            self._documents.pop(file_path, None)
+    
+    def analyze_file(self, file_path: str, file_errors: Optional[List[Dict]] = None) -> List[Dict]:
         """
         Analyze a Python file for potential issues based on error history.
         
         Args:
             file_path: Path to the Python file to analyze
+            file_errors: Error history for the file; looked up in the
+                tracker if omitted
             
         Returns:
             List of potential issues with suggestions
         """
         try:
-            with open(file_path, 'r') as f:
-                code = f.read()
+            if self.cache is not None:
+                return self._analyze_cached(file_path, file_errors)
             
-            tree = ast.parse(code)
-            return self._analyze_ast(tree, file_path)
+            return self.analyze_source(_read_source(file_path), file_path, file_errors)
         except Exception as e:
             self.logger.error(f"Error analyzing {file_path}: {e}")
             return []
     
-    def _analyze_ast(self, tree: ast.AST, file_path: str) -> List[Dict]:
-        """Analyze AST for potential issues."""
-        issues = []
+    def analyze_source(self, source: str, file_path: str,
+                       file_errors: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        Analyze source text that may differ from the file on disk, such as an unsaved editor buffer.
         
-        # Get error history for this file
-        file_errors = self._get_file_errors(file_path)
-        
-        class NodeVisitor(ast.NodeVisitor):
-            def __init__(self, analyzer, file_path, file_errors):
-                self.analyzer = analyzer
-                self.file_path = file_path
-                self.file_errors = file_errors
-                self.issues = []
-                self.line_offset = 0  # Track line offset for indented code
-                self.function_lines = {}  # Map function names to their line numbers
+        Args:
+            source: Python source code
+            file_path: Path the source belongs to, for error history lookups
+            file_errors: Error history for the file; looked up in the
+                tracker if omitted
+            
+        Returns:
+            List of potential issues with suggestions
+            
+        Raises:
+            SyntaxError: If the source does not parse
+        """
+        documents = self._documents
+        if documents is None:
+            return self._analyze_ast(ast.parse(source), file_path, file_errors)
+        
+        if file_errors is None:
+            file_errors = self._get_file_errors(file_path)
+        document = documents.get(file_path)
+        if document is None:
+            document = documents[file_path] = DocumentAnalysis(self.engine)
+            while len(documents) > self._max_documents:
+                documents.popitem(last=False)
+        else:
+            documents.move_to_end(file_path)
+        # A version that does not parse leaves the last one that did as the base
+        return document.update(source, RuleContext(file_path, file_errors),
+                               errors_digest(file_errors))
+    
+    def top_issues(self, file_path: str, top: Optional[int] = 10,
+                   file_errors: Optional[List[Dict]] = None,
+                   source: Optional[str] = None) -> List[Dict]:
+        """
+        Get the issues of a file most likely to fail, by the errors seen in it.
+        
+        Issues are ranked by how often their error type failed at their line,
+        then in their function, following functions that moved since (see
+        correlation.py). Issues whose type never failed there are dropped, so
+        a file without error history is not even parsed.
+        
+        Args:
+            file_path: Path to the Python file
+            top: Maximum number of issues; all that failed if None
+            file_errors: Error history for the file; looked up in the
+                tracker if omitted
+            source: Source to analyze instead of the file's content, such
+                as an unsaved editor buffer
             
-            def visit_FunctionDef(self, node):
-                """Visit function definitions to track their line numbers."""
-                self.function_lines[node.name] = node.lineno
-                self.generic_visit(node)
+        Returns:
+            Issues, most failures first, with 'failures' and
+            'function_failures' counts
             
-            def visit(self, node):
-                # Get the line number from the node
-                line_no = getattr(node, 'lineno', None)
-                if line_no is not None:
-                    # Adjust line number for indented code
-                    if self.line_offset == 0 and isinstance(node, ast.FunctionDef):
-                        # Find the line offset by checking the first function definition
-                        self.line_offset = line_no - 2  # Account for the function definition line
-                    
-                    actual_line = line_no - self.line_offset
-                    
-                    # Check dictionary access patterns
-                    if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name):
-                        self.issues.append({
-                            'type': 'KeyError',
-                            'line': line_no,
-                            'message': f"Potential KeyError: Consider using dict.get() or checking key existence",
-                            'suggestion': f"Use dict.get() or check key existence: 'if key in {node.value.id}'"
-                        })
-                    
-                    # Check division operations
-                    elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.Div):
-                        self.issues.append({
-                            'type': 'ZeroDivisionError',
-                            'line': line_no,
-                            'message': "Potential division by zero",
-                            'suggestion': "Add a check to prevent division by zero"
-                        })
-                    
-                    # Check type-related operations
-                    elif isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub, ast.Mult)):
-                        if any(e['type'] == 'TypeError' for e in self.file_errors):
-                            self.issues.append({
-                                'type': 'TypeError',
-                                'line': line_no,
-                                'message': "Potential type mismatch in operation",
-                                'suggestion': "Verify types before operation or add type conversion"
-                            })
-                
-                self.generic_visit(node)
-        
-        visitor = NodeVisitor(self, file_path, file_errors)
-        visitor.visit(tree)
-        return visitor.issues
+        Raises:
+            SyntaxError: If `source` is given and does not parse
+        """
+        if file_errors is None:
+            file_errors = self._get_file_errors(file_path)
+        correlation = self._correlation(file_path, file_errors)
+        if not correlation:
+            return []
+        buffer = source is not None
+        try:
+            if source is None:
+                source = _read_source(file_path)
+            if self._documents is not None:
+                issues = self.analyze_source(source, file_path, file_errors)
+                spans = self._documents[file_path].functions()
+            else:
+                tree = ast.parse(source)
+                issues = self._analyze_ast(tree, file_path, file_errors)
+                spans = function_spans(tree.body)
+        except Exception as e:
+            if buffer and isinstance(e, SyntaxError):
+                # A buffer mid-edit, as with analyze_source()
+                raise
+            self.logger.error(f"Error analyzing {file_path}: {e}")
+            return []
+        return correlation.rank(issues, spans, top)
+
+    def rank_issues(self, file_path: str, issues: List[Dict], top: Optional[int] = 10,
+                    file_errors: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        Rank issues already found in a file, as top_issues() does, without running the rules again.
+
+        The functions of the file are taken from its incremental state if
+        kept, and read from the file otherwise. Files without error history
+        are not read.
+
+        Args:
+            file_path: Path to the Python file
+            issues: Issues of the file, such as those iter_workspace() yields
+            top: Maximum number of issues; all that failed if None
+            file_errors: Error history for the file; looked up in the
+                tracker if omitted
+
+        Returns:
+            Issues, most failures first, with 'failures' and
+            'function_failures' counts
+        """
+        if not issues:
+            return []
+        if file_errors is None:
+            file_errors = self._get_file_errors(file_path)
+        correlation = self._correlation(file_path, file_errors)
+        if not correlation:
+            return []
+        document = self._documents.get(file_path) if self._documents is not None else None
+        if document is not None:
+            spans = document.functions()
+        else:
+            try:
+                spans = function_spans(ast.parse(_read_source(file_path)).body)
+            except Exception as e:
+                self.logger.error(f"Error analyzing {file_path}: {e}")
+                return []
+        return correlation.rank(issues, spans, top)
+
+    def _correlation(self, file_path: str, file_errors: List[Dict]) -> ErrorCorrelation:
+        """Get a file's errors indexed for ranking, built again only when they change."""
+        digest = errors_digest(file_errors)
+        cached = self._correlations.get(file_path)
+        if cached is not None and cached[0] == digest:
+            return cached[1]
+        correlation = ErrorCorrelation(file_errors)
+        if len(self._correlations) >= 4096:
+            # Drop the oldest
+            del self._correlations[next(iter(self._correlations))]
+        self._correlations[file_path] = (digest, correlation)
+        return correlation
+    
+    def _analyze_cached(self, file_path: str, file_errors: Optional[List[Dict]]) -> List[Dict]:
+        """Analyze a file, reusing the cached result if neither it nor its errors changed."""
+        if file_errors is None:
+            file_errors = self._get_file_errors(file_path)
+        digest = errors_digest(file_errors)
+        stat = os.stat(file_path)
+        issues = self.cache.lookup(file_path, stat, digest)
+        if issues is not None:
+            return issues
+        
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        content = content_hash(data)
+        issues = self.cache.lookup(file_path, stat, digest, content)
+        if issues is None:
+            if self._documents is not None:
+                issues = self.analyze_source(importlib.util.decode_source(data), file_path, file_errors)
+            else:
+                issues = self._analyze_ast(ast.parse(data), file_path, file_errors)
+            self.cache.put(file_path, (stat.st_mtime_ns, stat.st_size, content), digest, issues)
+        return issues
+    
+    def _read_and_analyze(self, file_path: str,
+                          file_errors: List[Dict]) -> Tuple[List[Dict], Optional[Fingerprint]]:
+        """Analyze a file, also returning the fingerprint of the content analyzed."""
+        try:
+            stat = os.stat(file_path)
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            issues = self._analyze_ast(ast.parse(data), file_path, file_errors)
+            return issues, (stat.st_mtime_ns, stat.st_size, content_hash(data))
+        except Exception as e:
+            self.logger.error(f"Error analyzing {file_path}: {e}")
+            return [], None
+    
+    def _analyze_ast(self, tree: ast.AST, file_path: str,
+                     file_errors: Optional[List[Dict]] = None) -> List[Dict]:
+        """Analyze AST for potential issues."""
+        # Get error history for this file
+        if file_errors is None:
+            file_errors = self._get_file_errors(file_path)
+        
+        return self.engine.run(tree, RuleContext(file_path, file_errors))
+    
+    def add_rule(self, rule: Rule) -> None:
+        """
+        Add a rule to this analyzer.
+        
+        Args:
+            rule: Rule to run in addition to the current ones
+        """
+        self.engine = RuleEngine(self.engine.rules + [rule])
+        if self._documents is not None:
+            self._documents.clear()
+        if self.cache is not None:
+            self.cache.invalidate()
     
     def _get_file_errors(self, file_path: str) -> List[Dict]:
         """Get all errors for a specific file."""
-        file_errors = []
-        for key, errors in tracker.error_history.items():
-            # The key format is 'file_path:func_name'
-            stored_path = key.split(':')[0] if ':' in key else key
-            if stored_path == file_path:
-                file_errors.extend(errors)
-        return file_errors
+        return get_tracker().get_file_errors(file_path)
     
     def _has_key_errors(self, file_path: str, line_no: int) -> bool:
         """Check if there are KeyErrors at this line."""
@@ -127,50 +310,202 @@ class PatternAnalyzer:
     
     def _has_error_type(self, file_path: str, line_no: int, error_type: str) -> bool:
         """Check if a specific type of error exists at a line."""
-        errors = self._get_file_errors(file_path)
-        return any(
-            e['type'] == error_type and e['line'] == line_no
-            for e in errors
-        )
+        return get_tracker().has_error(file_path, line_no, error_type)
     
-    def analyze_workspace(self, workspace_path: str) -> Dict[str, List[Dict]]:
+    def analyze_workspace(self, workspace_path: str,
+                          workers: Optional[int] = None,
+                          chunk_size: int = 32) -> Dict[str, List[Dict]]:
         """
         Analyze all Python files in a workspace.
         
         Args:
             workspace_path: Path to the workspace directory
+            workers: Number of worker processes; files are analyzed
+                serially if omitted or 1
+            chunk_size: Number of files sent to a worker at a time
             
         Returns:
             Dictionary mapping file paths to lists of potential issues and errors
         """
-        workspace = Path(workspace_path)
-        issues = {}
-        
-        for py_file in workspace.rglob('*.py'):
-            if not any(ignore in str(py_file) for ignore in ['.venv', '__pycache__', '.git']):
-                file_path = str(py_file)
-                print(f"Analyzing file: {file_path}")  # Debug
-                file_issues = self.analyze_file(file_path)
-                file_errors = self._get_file_errors(file_path)
-                print(f"Found errors: {file_errors}")  # Debug
-                print(f"Found issues: {file_issues}")  # Debug
-                
-                # Include file if it has either errors or issues
-                if file_errors or file_issues:
-                    # Convert file errors to issue format
-                    error_issues = [{
-                        'type': error['type'],
-                        'message': f"Previous {error['type']} occurred here",
-                        'line': error['line'],
-                        'suggestion': "Consider adding error handling"
-                    } for error in file_errors]
-                    
-                    # Combine both errors and issues
-                    issues[file_path] = error_issues + file_issues
-                    print(f"Added to issues: {issues[file_path]}")  # Debug
-        
-        print(f"Final issues: {issues}")  # Debug
-        return issues
+        # Keep discovery order, which the parallel path does not preserve
+        results = sorted(self._iter_workspace(workspace_path, workers, chunk_size))
+        return {file_path: issues for _, file_path, issues in results}
+    
+    def iter_workspace(self, workspace_path: str,
+                       workers: Optional[int] = None,
+                       chunk_size: int = 32) -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        Analyze a workspace, yielding each file's issues as soon as it is done.
+        
+        Files without errors or issues are skipped. With workers, files are
+        yielded in completion order and only a few chunks are in flight at once.
+        
+        Args:
+            workspace_path: Path to the workspace directory
+            workers: Number of worker processes; files are analyzed
+                serially if omitted or 1
+            chunk_size: Number of files sent to a worker at a time
+            
+        Yields:
+            (file_path, issues) tuples
+        """
+        for _, file_path, issues in self._iter_workspace(workspace_path, workers, chunk_size):
+            yield file_path, issues
+    
+    async def aiter_workspace(self, workspace_path: str,
+                              workers: Optional[int] = None,
+                              chunk_size: int = 32) -> AsyncIterator[Tuple[str, List[Dict]]]:
+        """
+        Async version of iter_workspace; the analysis runs in the default executor.
+        
+        Yields:
+            (file_path, issues) tuples
+        """
+        import asyncio
+        
+        loop = asyncio.get_running_loop()
+        results = self.iter_workspace(workspace_path, workers, chunk_size)
+        done = object()
+        while True:
+            item = await loop.run_in_executor(None, next, results, done)
+            if item is done:
+                return
+            yield item
+    
+    def close(self) -> None:
+        """Shut down the worker processes used for parallel analysis and save the cache."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_workers = 0
+        if self.cache is not None:
+            self.cache.save()
+    
+    def _iter_workspace(self, workspace_path: str, workers: Optional[int],
+                        chunk_size: int) -> Iterator[Tuple[int, str, List[Dict]]]:
+        """Yield (discovery index, file_path, issues) for files with errors or issues."""
+        files = self._workspace_files(workspace_path)
+        if workers is not None and workers > 1:
+            analyzed = self._analyze_parallel(files, workers, chunk_size)
+        else:
+            analyzed = self._analyze_serial(files)
+        
+        for index, file_path, file_issues, file_errors in analyzed:
+            # Include file if it has either errors or issues
+            if file_errors or file_issues:
+                yield index, file_path, self._workspace_issues(file_issues, file_errors)
+    
+    def _workspace_files(self, workspace_path: str) -> Iterator[str]:
+        """Yield the Python files to analyze in a workspace, skipping ignored ones."""
+        root = os.path.abspath(workspace_path)
+        scanner = self._scanners.get(root)
+        if scanner is None:
+            scanner = self._scanners[root] = WorkspaceScanner(root, self.exclude)
+        yield from scanner.files()
+    
+    def _workspace_issues(self, file_issues: List[Dict], file_errors: List[Dict]) -> List[Dict]:
+        """Combine previous errors and potential issues for one file."""
+        # Convert file errors to issue format
+        error_issues = [{
+            'type': error['error_type'],
+            'message': f"Previous {error['error_type']} occurred here",
+            'line': error['line'],
+            'suggestion': "Consider adding error handling"
+        } for error in file_errors]
+        
+        # Combine both errors and issues
+        return error_issues + file_issues
+    
+    def _analyze_serial(self, files: Iterable[str]) -> Iterator[Tuple[int, str, List[Dict], List[Dict]]]:
+        """Analyze files one at a time, yielding (index, file_path, issues, file_errors)."""
+        for index, file_path in enumerate(files):
+            file_errors = self._get_file_errors(file_path)
+            yield index, file_path, self.analyze_file(file_path, file_errors), file_errors
+    
+    def _analyze_parallel(self, files: Iterable[str], workers: int,
+                          chunk_size: int) -> Iterator[Tuple[int, str, List[Dict], List[Dict]]]:
+        """
+        Analyze files on a process pool.
+        
+        Yields (index, file_path, issues, file_errors) as chunks complete,
+        keeping at most two chunks per worker in flight.
+        """
+        if self._pool is None or self._pool_workers != workers:
+            from concurrent.futures import ProcessPoolExecutor
+            
+            self.close()
+            self._pool = ProcessPoolExecutor(max_workers=workers)
+            self._pool_workers = workers
+        
+        pending: Dict[Future, List[Tuple[int, str, List[Dict]]]] = {}
+        max_in_flight = workers * 2
+        chunk = []
+        for index, file_path in enumerate(files):
+            file_errors = self._get_file_errors(file_path)
+            if self.cache is not None and os.path.exists(file_path):
+                issues = self.cache.lookup(file_path, os.stat(file_path), errors_digest(file_errors))
+                if issues is not None:
+                    yield index, file_path, issues, file_errors
+                    continue
+            chunk.append((index, file_path, file_errors))
+            if len(chunk) == chunk_size:
+                if len(pending) >= max_in_flight:
+                    yield from self._collect_chunks(pending, FIRST_COMPLETED)
+                self._submit_chunk(pending, chunk)
+                chunk = []
+        if chunk:
+            self._submit_chunk(pending, chunk)
+        yield from self._collect_chunks(pending, ALL_COMPLETED)
+    
+    def _submit_chunk(self, pending: Dict[Future, List], chunk: List[Tuple[int, str, List[Dict]]]) -> None:
+        """Send a chunk to the pool; workers have their own tracker, so errors go along."""
+        work = [(file_path, file_errors) for _, file_path, file_errors in chunk]
+        pending[self._pool.submit(_analyze_chunk, work, self.engine.rules)] = chunk
+    
+    def _collect_chunks(self, pending: Dict[Future, List],
+                        return_when: str) -> Iterator[Tuple[int, str, List[Dict], List[Dict]]]:
+        """Yield the results of finished chunks and forget them."""
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                for (index, file_path, file_errors), (_, issues, fingerprint) in zip(chunk, future.result()):
+                    if self.cache is not None and fingerprint is not None:
+                        self.cache.put(file_path, fingerprint, errors_digest(file_errors), issues)
+                    yield index, file_path, issues, file_errors
+            if return_when == FIRST_COMPLETED:
+                return
+
+def _read_source(file_path: str) -> str:
+    """Read a Python file in its declared encoding (PEP 263), as the interpreter would."""
+    with open(file_path, 'rb') as f:
+        return importlib.util.decode_source(f.read())
+
+def _analyze_chunk(chunk: List[Tuple[str, List[Dict]]],
+                   rules: List[Rule]) -> List[Tuple[str, List[Dict], Optional[Fingerprint]]]:
+    """Analyze a chunk of files in a worker process."""
+    worker = PatternAnalyzer()
+    worker.engine = RuleEngine(rules)
+    results = []
+    for file_path, file_errors in chunk:
+        issues, fingerprint = worker._read_and_analyze(file_path, file_errors)
+        results.append((file_path, issues, fingerprint))
+    return results
+
+_analyzer: Optional[PatternAnalyzer] = None
+_analyzer_lock = threading.Lock()
+
+def get_analyzer() -> PatternAnalyzer:
+    """Get the global analyzer, creating it on first use."""
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = PatternAnalyzer()
+                globals()["analyzer"] = _analyzer
+    return _analyzer
 
-# Create global analyzer instance
-analyzer = PatternAnalyzer() 
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    if name == "analyzer":
+        return get_analyzer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}") 
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Persistent cache of per-file analysis results.
+
+Entries are keyed by file path and validated against the file's mtime,
+size and content hash, and against a digest of the file's error history,
+so a file is only re-parsed when its content or its errors change.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .store import default_store_path
+
+CACHE_VERSION = 1
+
+# (mtime_ns, size, content_hash)
+Fingerprint = Tuple[int, int, str]
+
+
+def content_hash(data: bytes) -> str:
+    """Hash file content for cache validation."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def errors_digest(file_errors: List[Dict[str, Any]]) -> str:
+    """Digest the parts of a file's error history that affect analysis."""
+    key = sorted((e["error_type"], e["line"], e.get("count", 1)) for e in file_errors)
+    return hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+
+
+class AnalysisCache:
+    """Bounded LRU cache of analysis results, persisted as JSON."""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 50_000):
+        """
+        Create a cache.
+
+        Args:
+            path: JSON file to load from and save to; defaults to
+                analysis_cache.json in the error store directory
+            max_entries: Maximum number of cached files; least recently
+                used entries are evicted first
+        """
+        self.path = Path(path) if path is not None else default_store_path() / "analysis_cache.json"
+        self.max_entries = max_entries
+        self.logger = logging.getLogger("error_learner.cache")
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+        atexit.register(self.save)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, file_path: str, stat: os.stat_result, digest: str,
+               content: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        Get cached issues for a file if they are still valid.
+
+        Args:
+            file_path: Path of the file
+            stat: Current stat of the file
+            digest: errors_digest() of the file's current error history
+            content: Content hash, to validate a file whose mtime changed
+
+        Returns:
+            The cached issues, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is None or entry["errors"] != digest:
+                return None
+            if entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                if content is None or entry["hash"] != content:
+                    return None
+                # Touched but unchanged; remember the new stat
+                entry["mtime_ns"] = stat.st_mtime_ns
+                entry["size"] = stat.st_size
+                self._dirty = True
+            self._entries.move_to_end(file_path)
+            return [dict(issue) for issue in entry["issues"]]
+
+    def put(self, file_path: str, fingerprint: Fingerprint, digest: str,
+            issues: List[Dict]) -> None:
+        """
+        Store the issues found in a file.
+
+        Args:
+            file_path: Path of the file
+            fingerprint: (mtime_ns, size, content_hash) of the analyzed content
+            digest: errors_digest() of the error history used
+            issues: Issues found in the file
+        """
+        mtime_ns, size, content = fingerprint
+        with self._lock:
+            self._entries[file_path] = {
+                "mtime_ns": mtime_ns,
+                "size": size,
+                "hash": content,
+                "errors": digest,
+                "issues": [dict(issue) for issue in issues],
+            }
+            self._entries.move_to_end(file_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def invalidate(self, file_path: Optional[str] = None) -> None:
+        """Drop the entry for one file, or every entry."""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(file_path, None)
+            self._dirty = True
+
+    def save(self) -> None:
+        """Write the cache to disk if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": CACHE_VERSION, "entries": self._entries}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_name(self.path.name + ".tmp")
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                self.logger.error(f"Error saving analysis cache to {self.path}: {e}")
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Error loading analysis cache from {self.path}: {e}")
+            return
+        if data.get("version") != CACHE_VERSION:
+            return
+        self._entries = OrderedDict(data.get("entries", {}))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,197 @@
+"""
+Process-wide capture of raised exceptions, handled or not.
+
+On Python 3.12 and later, a sys.monitoring RAISE handler sees every
+exception where it is raised, including the ones a framework catches
+and turns into an error response. An exception is recorded once, in the
+innermost frame it reaches whose code passes the capture's filters: one
+raised inside the standard library or an installed package, such as by
+json.loads, counts at the application's call into it, and one a library
+raises and handles itself is not recorded. The filter decision is cached
+per file, with per-code-object overrides, so a frame of filtered-out code
+costs two dict lookups.
+
+Older Pythons fall back to sys.excepthook and threading.excepthook. They
+add no per-call or per-line overhead, unlike sys.setprofile or
+sys.settrace, but handled exceptions are not seen at all: only uncaught
+ones are recorded.
+"""
+
+import importlib.util
+import os
+import sys
+import sysconfig
+import threading
+from types import CodeType, TracebackType
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from . import monitoring
+
+if TYPE_CHECKING:
+    from .extension import ExtensionTracker
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def default_excludes() -> List[str]:
+    """Path prefixes excluded by default: the standard library, installed packages and this package."""
+    paths = sysconfig.get_paths()
+    prefixes = {paths[name] for name in ("stdlib", "platstdlib", "purelib", "platlib") if name in paths}
+    prefixes.add(_PACKAGE_DIR)
+    return sorted(os.path.abspath(prefix) for prefix in prefixes)
+
+
+def module_paths(modules: Iterable[str]) -> List[str]:
+    """Turn module or package names into the path prefixes of their source."""
+    prefixes = []
+    for name in modules:
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise ValueError(f"Module not found: {name!r}")
+        if spec.submodule_search_locations:
+            prefixes.extend(os.path.abspath(p) for p in spec.submodule_search_locations)
+        elif spec.origin:
+            prefixes.append(os.path.abspath(spec.origin))
+    return prefixes
+
+
+class GlobalCapture:
+    """Feeds exceptions raised anywhere in the process to a tracker."""
+
+    def __init__(self,
+                 tracker: "ExtensionTracker",
+                 include: Optional[Iterable[str]] = None,
+                 exclude: Optional[Iterable[str]] = None,
+                 modules: Optional[Iterable[str]] = None):
+        """
+        Create a capture; call start() to begin capturing.
+
+        Args:
+            tracker: Tracker to record exceptions in
+            include: Path prefixes to capture; everything if omitted
+            exclude: Path prefixes never to capture; defaults to
+                default_excludes()
+            modules: Module or package names to capture, added to include
+        """
+        self.tracker = tracker
+        included = [os.path.abspath(p) for p in include] if include is not None else []
+        if modules is not None:
+            included.extend(module_paths(modules))
+        self.include: Optional[Tuple[str, ...]] = (
+            tuple(included) if include is not None or modules is not None else None
+        )
+        self.exclude = tuple(
+            os.path.abspath(p) for p in (exclude if exclude is not None else default_excludes())
+        )
+        self.mode: Optional[str] = None
+        # co_filename -> capture it, decided on first sight
+        self._files: Dict[str, bool] = {}
+        # id(code) -> (code, capture it), set by enable() and disable()
+        self._overrides: Dict[int, Tuple[CodeType, bool]] = {}
+        self._local = threading.local()
+        self._previous_threading_hook = None
+
+    def start(self) -> str:
+        """
+        Start capturing.
+
+        Returns:
+            'monitoring' if raised exceptions are captured, or 'hooks' if
+            only uncaught ones are, through the exception hooks; handled
+            exceptions are then not seen
+        """
+        if self.mode is not None:
+            return self.mode
+        if monitoring.set_raise_handler(id(self), self._on_raise):
+            self.mode = "monitoring"
+        else:
+            # The tracker's sys.excepthook covers the main thread
+            self._previous_threading_hook = threading.excepthook
+            threading.excepthook = self._threading_hook
+            self.mode = "hooks"
+        return self.mode
+
+    def stop(self) -> None:
+        """Stop capturing; other captures in the process keep running."""
+        if self.mode == "monitoring":
+            monitoring.set_raise_handler(id(self), None)
+        elif self.mode == "hooks" and threading.excepthook == self._threading_hook:
+            threading.excepthook = self._previous_threading_hook
+        # A hook installed after ours still calls it; it passes through from now on
+        self.mode = None
+
+    def enable(self, code: CodeType) -> None:
+        """Capture exceptions raised in a code object, whatever the filters say."""
+        self._overrides[id(code)] = (code, True)
+
+    def disable(self, code: CodeType) -> None:
+        """Never capture exceptions raised in a code object."""
+        self._overrides[id(code)] = (code, False)
+
+    def wants(self, code: CodeType) -> bool:
+        """Check whether exceptions raised in a code object are captured."""
+        override = self._overrides.get(id(code))
+        if override is not None:
+            return override[1]
+        filename = code.co_filename
+        wanted = self._files.get(filename)
+        if wanted is None:
+            wanted = self._files[filename] = self._match(filename)
+        return wanted
+
+    def _match(self, filename: str) -> bool:
+        if filename.startswith("<"):
+            # <string>, <stdin>, <frozen ...>: nothing to point a suggestion at
+            return False
+        if filename.startswith(self.exclude):
+            return False
+        return self.include is None or filename.startswith(self.include)
+
+    def _on_raise(self, code: CodeType, exception: BaseException) -> None:
+        # RAISE fires again in every frame the exception passes through, so
+        # the first wanted one is the innermost the exception reached
+        if not isinstance(exception, Exception) or not self.wants(code):
+            return
+        tracker = self.tracker
+        tb = exception.__traceback__
+        if tb is None or tracker._seen(exception):
+            return
+        if monitoring.is_registered(code, id(tracker)):
+            # A function the tracker tracks records its own exceptions as
+            # they leave it; the frames further out must not record it again
+            tracker._mark_seen(exception)
+            return
+        # The traceback starts at the current frame
+        self._record(code, exception, tb.tb_lineno, tb)
+
+    def _threading_hook(self, args: threading.ExceptHookArgs) -> None:
+        if (self.mode == "hooks" and args.exc_traceback is not None
+                and isinstance(args.exc_value, Exception)):
+            # The innermost wanted frame, as with sys.monitoring
+            code, line_no = None, 0
+            tb = args.exc_traceback
+            while tb is not None:
+                if self.wants(tb.tb_frame.f_code):
+                    code, line_no = tb.tb_frame.f_code, tb.tb_lineno
+                tb = tb.tb_next
+            if code is not None:
+                self._record(code, args.exc_value, line_no, args.exc_traceback)
+        self._previous_threading_hook(args)
+
+    def _record(self, code: CodeType, exception: BaseException, line_no: int,
+                tb: TracebackType) -> None:
+        local = self._local
+        if getattr(local, "busy", False):
+            # Exceptions raised while recording are not the application's
+            return
+        if self.tracker._seen(exception):
+            return
+        self.tracker._mark_seen(exception, code)
+        local.busy = True
+        try:
+            self.tracker._track_error(
+                type(exception), str(exception), code.co_name, line_no, code.co_filename,
+                tb=tb, function_line=code.co_firstlineno
+            )
+        finally:
+            local.busy = False
@@ -0,0 +1,191 @@
+"""
+Command-line interface for the error learner package.
+
+This module provides a CLI for querying the error history persisted by an
+ErrorStore, and for running the analysis daemon and the language server.
+"""
+
+import argparse
+import json
+import re
+import signal
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .index import ErrorIndex
+from .store import default_store_path
+from .utils import setup_logging
+
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$")
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_time(value: str, now: Optional[float] = None) -> float:
+    """
+    Parse a time argument into epoch seconds.
+
+    Args:
+        value: An ISO date or datetime, or a duration before now such as
+            '30m', '24h' or '7d'
+        now: Reference time for durations; defaults to the current time
+
+    Returns:
+        Epoch seconds
+    """
+    match = _DURATION.match(value)
+    if match:
+        amount, unit = match.groups()
+        return (now if now is not None else time.time()) - float(amount) * _UNIT_SECONDS[unit]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid time {value!r}: use an ISO date or a duration such as 24h"
+        ) from None
+
+
+def _print_stats(stats: Dict[str, Any]) -> None:
+    print(f"Total errors: {stats['total_errors']}")
+    if stats["error_types"]:
+        print("\nBy type:")
+        for error_type, count in sorted(stats["error_types"].items(),
+                                        key=lambda item: item[1], reverse=True):
+            print(f"  {count:>8}  {error_type}")
+    if stats["top_errors"]:
+        print("\nTop errors:")
+        for error in stats["top_errors"]:
+            print(f"  {error['count']:>8}  {error['error_type']}  "
+                  f"{error['file']}:{error['line']} in {error['function']}  "
+                  f"(last {error['last_seen']})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point for the CLI."""
+    parser = argparse.ArgumentParser(prog="error-learner", description="Error Learner CLI")
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        default="INFO",
+        help="Set the logging level"
+    )
+    parser.add_argument(
+        "--store",
+        default=None,
+        help=f"Error store directory (default: {default_store_path()})"
+    )
+
+    subparsers = parser.add_subparsers(dest="command", help="Commands")
+
+    # Stats command
+    stats_parser = subparsers.add_parser("stats", help="Get error statistics")
+    stats_parser.add_argument("--top", type=int, default=10,
+                              help="Number of most frequent errors to list (default: 10)")
+    stats_parser.add_argument("--file", help="Only errors in this file, path suffix or glob")
+    stats_parser.add_argument("--function", help="Only errors in this function")
+    stats_parser.add_argument("--type", dest="error_type", help="Only errors of this type")
+    stats_parser.add_argument("--since", type=parse_time,
+                              help="Only errors since an ISO date or a duration ago (e.g. 24h)")
+    stats_parser.add_argument("--until", type=parse_time,
+                              help="Only errors before an ISO date or a duration ago")
+    stats_parser.add_argument("--json", action="store_true", help="Print JSON")
+
+    # Daemon command
+    daemon_parser = subparsers.add_parser(
+        "daemon", help="Watch a workspace and serve analysis results to the IDE"
+    )
+    daemon_parser.add_argument("workspace", nargs="?", default=".", help="Workspace to watch")
+    daemon_parser.add_argument("--debounce", type=float, default=0.3,
+                               help="Seconds a file must be quiet before it is analyzed")
+    daemon_parser.add_argument("--poll-interval", type=float, default=1.0,
+                               help="Seconds between scans of the workspace")
+    daemon_parser.add_argument("--address", help="Socket path to listen on")
+    daemon_parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                               help="Skip paths matching a .gitignore-style pattern, "
+                                    "in addition to the defaults (repeatable)")
+    daemon_parser.add_argument("--top", type=int, metavar="N",
+                               help="Serve only each file's N issues most likely to fail, "
+                                    "ranked by error history (default: all issues)")
+    daemon_parser.add_argument("--info",
+                               help="File to write the address and authkey to "
+                                    "(default: daemon.json in the store directory)")
+
+    # Language server command
+    lsp_parser = subparsers.add_parser(
+        "lsp", help="Serve diagnostics to an editor over the Language Server Protocol on stdio"
+    )
+    lsp_parser.add_argument("--debounce", type=float, default=0.2,
+                            help="Seconds a document must be unchanged before it is analyzed")
+    lsp_parser.add_argument("--top", type=int, metavar="N",
+                            help="Publish only each document's N issues most likely to fail, "
+                                 "ranked by error history (default: all issues)")
+
+    args = parser.parse_args(argv)
+
+    # Set up logging
+    setup_logging("error_learner").setLevel(args.log_level)
+
+    if args.command == "stats":
+        index = ErrorIndex(args.store)
+        try:
+            stats = index.refresh().stats(
+                file=args.file,
+                function=args.function,
+                error_type=args.error_type,
+                since=args.since,
+                until=args.until,
+                top=args.top,
+            )
+        finally:
+            index.close()
+        if args.json:
+            print(json.dumps(stats, indent=2))
+        else:
+            _print_stats(stats)
+        return 0
+
+    if args.command == "daemon":
+        return _run_daemon(args)
+
+    if args.command == "lsp":
+        from .lsp import LanguageServer
+
+        store = args.store if args.store is not None else str(default_store_path())
+        return LanguageServer(store=store, debounce=args.debounce, top=args.top).run()
+
+    parser.print_help()
+    return 1
+
+
+def _run_daemon(args: argparse.Namespace) -> int:
+    from .analyzer import PatternAnalyzer
+    from .daemon import AnalysisDaemon
+    from .discovery import DEFAULT_EXCLUDES
+
+    store = Path(args.store) if args.store is not None else default_store_path()
+    info = Path(args.info) if args.info is not None else store / "daemon.json"
+    analyzer = PatternAnalyzer(exclude=DEFAULT_EXCLUDES + tuple(args.exclude)) if args.exclude else None
+    daemon = AnalysisDaemon(
+        args.workspace, analyzer=analyzer, store=str(store), debounce=args.debounce,
+        poll_interval=args.poll_interval, top=args.top
+    ).start().serve(args.address)
+    info.parent.mkdir(parents=True, exist_ok=True)
+    daemon.write_info(str(info))
+    print(f"Watching {daemon.workspace}, serving on {daemon.address} (details in {info})")
+    # Clean up on a service manager's stop as on Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+        info.unlink()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main()) 
\ No newline at end of file
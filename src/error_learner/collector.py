@@ -0,0 +1,253 @@
+"""
+Cross-process aggregation of tracked errors.
+
+A collector runs in one process (usually the parent of a worker pool) and
+listens on a local socket. Each worker's tracker buffers its errors and a
+background thread sends them to the collector in batches, so raising an
+exception never pays for IPC. Each batch carries the client's id and a
+sequence number: a batch whose reply was lost is sent again, and the
+collector merges it only once.
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .store import merge_record
+
+CountKey = Tuple[str, str]
+
+
+class ErrorCollector:
+    """Merges error records sent by tracker processes."""
+
+    def __init__(self, address: Optional[Any] = None, authkey: Optional[bytes] = None):
+        """
+        Create a collector.
+
+        Args:
+            address: Listener address; defaults to a fresh Unix socket where
+                available
+            authkey: Key clients must present; a random one is generated
+                if omitted
+        """
+        self.authkey = authkey if authkey is not None else os.urandom(16)
+        self.logger = logging.getLogger("error_learner.collector")
+        self._listener = Listener(address, authkey=self.authkey)
+        self.address = self._listener.address
+        self._history: Dict[str, Dict[Tuple[str, int], Dict[str, Any]]] = {}
+        self._type_counts: Dict[CountKey, int] = {}
+        # client id -> sequence number of its last merged batch
+        self._batches: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ErrorCollector":
+        """Start accepting clients on a background thread."""
+        self._thread = threading.Thread(
+            target=self._accept, name="error-learner-collector", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop accepting clients."""
+        self._closed = True
+        self._listener.close()
+
+    def merge(self, records: List[Dict[str, Any]]) -> Dict[CountKey, int]:
+        """
+        Merge a batch of records.
+
+        Args:
+            records: Records in the ErrorStore record format
+
+        Returns:
+            Global counts for each (error_key, error_type) in the batch
+        """
+        with self._lock:
+            counts = {}
+            for record in records:
+                merge_record(self._history, record)
+                count_key = (record["key"], record["error_type"])
+                counts[count_key] = self._type_counts.get(count_key, 0) + record["count"]
+                self._type_counts[count_key] = counts[count_key]
+            return counts
+
+    def merge_batch(self, client: str, sequence: int,
+                    records: List[Dict[str, Any]]) -> Dict[CountKey, int]:
+        """
+        Merge a client's numbered batch, unless it was merged already.
+
+        Args:
+            client: Id of the sending client
+            sequence: The batch's sequence number, increasing per client
+            records: Records in the ErrorStore record format
+
+        Returns:
+            Global counts for each (error_key, error_type) in the batch
+        """
+        with self._lock:
+            if sequence <= self._batches.get(client, -1):
+                # Resent after a lost reply
+                return {(record["key"], record["error_type"]):
+                        self._type_counts.get((record["key"], record["error_type"]), 0)
+                        for record in records}
+            self._batches[client] = sequence
+        return self.merge(records)
+
+    @property
+    def error_history(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the merged error history of all processes."""
+        with self._lock:
+            return {key: [dict(e) for e in entries.values()]
+                    for key, entries in self._history.items()}
+
+    def _accept(self) -> None:
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                if self._closed:
+                    return
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: Connection) -> None:
+        with conn:
+            while True:
+                try:
+                    command, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if command == "merge":
+                    conn.send(self.merge_batch(*payload))
+                elif command == "history":
+                    conn.send(self.error_history)
+                else:
+                    self.logger.error(f"Unknown collector command: {command!r}")
+                    return
+
+
+class CollectorClient:
+    """Buffers records in a worker process and ships them to a collector."""
+
+    def __init__(self,
+                 address: Any,
+                 authkey: bytes,
+                 on_counts: Optional[Callable[[Dict[CountKey, int]], None]] = None,
+                 flush_interval: float = 1.0,
+                 max_pending: int = 100_000):
+        """
+        Create a client.
+
+        Args:
+            address: Address of the collector
+            authkey: The collector's authkey
+            on_counts: Called with global counts after each flush
+            flush_interval: Seconds between batches
+            max_pending: Maximum buffered records; further records are dropped
+        """
+        self.address = address
+        self.authkey = authkey
+        self.on_counts = on_counts
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.logger = logging.getLogger("error_learner.collector")
+        self.dropped = 0
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Buffer a record without blocking the caller."""
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append(record)
+        if self._thread is None:
+            self._start()
+
+    def flush(self) -> None:
+        """Send all buffered records to the collector."""
+        with self._lock:
+            counts = {}
+            if self._unacked is not None:
+                # Sent before without a reply; the collector may have merged it
+                counts.update(self._send(self._unacked))
+            if self._pending:
+                records = []
+                while self._pending:
+                    records.append(self._pending.popleft())
+                self._sequence += 1
+                counts.update(self._send((self._client_id, self._sequence, records)))
+        if counts and self.on_counts is not None:
+            self.on_counts(counts)
+
+    def history(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Flush, then fetch the merged history from the collector."""
+        self.flush()
+        with self._lock:
+            return self._request("history", None)
+
+    def close(self) -> None:
+        """Flush remaining records and disconnect."""
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _reset(self) -> None:
+        # Connections and threads do not survive a fork; each process starts fresh
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._client_id = os.urandom(8).hex()
+        self._sequence = 0
+        # (client id, sequence, records) of a batch awaiting its reply
+        self._unacked: Optional[Tuple[str, int, List[Dict[str, Any]]]] = None
+        self._conn: Optional[Connection] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="error-learner-collector-client", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            try:
+                self.flush()
+            except (OSError, EOFError) as e:
+                self.logger.error(f"Error sending errors to collector: {e}")
+
+    def _send(self, batch: Tuple[str, int, List[Dict[str, Any]]]) -> Dict[CountKey, int]:
+        # Kept until the collector replies, then sent again with the same
+        # sequence number, so it is neither lost nor counted twice
+        self._unacked = batch
+        counts = self._request("merge", batch)
+        self._unacked = None
+        return counts
+
+    def _request(self, command: str, payload: Any) -> Any:
+        if self._conn is None:
+            self._conn = Client(self.address, authkey=self.authkey)
+        try:
+            self._conn.send((command, payload))
+            return self._conn.recv()
+        except (OSError, EOFError):
+            self._conn = None
+            raise
@@ -5,61 +5,526 @@ This module provides the main decorator and classes for tracking errors
 in Python code execution.
 """
 
+import builtins
 import functools
 import logging
-from typing import Any, Callable, Dict, Optional, Type
-from dataclasses import dataclass
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from types import CodeType
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple, Type, Union
 from datetime import datetime
 
-@dataclass
+from . import monitoring
+from .fingerprint import Signature, call_path, entry_for, hash_path
+from .pipeline import LoopBuffer, RecordingPipeline
+from .policies import KeyEvictor, RetentionPolicy, WindowedCounter
+
+if TYPE_CHECKING:
+    import asyncio
+    from .store import ErrorStore
+
+# Exception groups exist from Python 3.11
+_BaseExceptionGroup = getattr(builtins, 'BaseExceptionGroup', None)
+
+# Code flags, as in inspect, which is slow to import
+_CO_GENERATOR = 0x20
+_CO_COROUTINE = 0x80
+_CO_ASYNC_GENERATOR = 0x200
+
+# Generators and coroutines raise from their own frames, after the call returns
+_DEFERRED_CODE = _CO_GENERATOR | _CO_COROUTINE | _CO_ASYNC_GENERATOR
+
+# Set on an exception to {tracker id: ids of the code objects global capture
+# recorded it in}: the excepthook and global capture skip what a tracker has
+# recorded, and @track skips only what global capture recorded in its own
+# function, so every tracked function the error leaves still records it
+_SEEN = "__error_learner_seen__"
+
+def _leaf_errors(error: BaseException) -> Iterator[BaseException]:
+    """Yield the errors inside (nested) exception groups, or the error itself."""
+    if _BaseExceptionGroup is not None and isinstance(error, _BaseExceptionGroup):
+        for inner in error.exceptions:
+            yield from _leaf_errors(inner)
+    elif isinstance(error, Exception):
+        yield error
+
 class ErrorInfo:
-    """Information about a tracked error."""
-    timestamp: datetime
-    error_type: Type[Exception]
-    error_message: str
-    function_name: str
-    line_number: int
-    fix_suggestion: Optional[str] = None
+    """
+    Information about a tracked error.
+    
+    Slotted, with the timestamp kept as epoch seconds and names interned,
+    since a tracker may hold one of these per occurrence.
+    """
+    __slots__ = ('epoch', 'error_type', 'error_message', 'function_name',
+                 'line_number', 'fix_suggestion', 'fingerprint', 'function_line')
+    
+    def __init__(self,
+                 timestamp: Union[datetime, float],
+                 error_type: Type[Exception],
+                 error_message: str,
+                 function_name: str,
+                 line_number: int,
+                 fix_suggestion: Optional[str] = None,
+                 fingerprint: Optional[int] = None,
+                 function_line: Optional[int] = None):
+        self.epoch = timestamp.timestamp() if isinstance(timestamp, datetime) else timestamp
+        self.error_type = error_type
+        self.error_message = error_message
+        self.function_name = sys.intern(function_name)
+        self.line_number = line_number
+        self.fix_suggestion = fix_suggestion
+        # Call path fingerprint, see fingerprint.py
+        self.fingerprint = fingerprint
+        # First line of the function's definition, to follow the error when code moves
+        self.function_line = function_line
+    
+    @property
+    def timestamp(self) -> datetime:
+        """When the error occurred."""
+        return datetime.fromtimestamp(self.epoch)
+    
+    def __repr__(self) -> str:
+        return (f"ErrorInfo(timestamp={self.timestamp!r}, error_type={self.error_type!r}, "
+                f"error_message={self.error_message!r}, function_name={self.function_name!r}, "
+                f"line_number={self.line_number!r}, fix_suggestion={self.fix_suggestion!r})")
+    
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ErrorInfo):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+class ShardedLocks:
+    """A fixed set of locks, picked by key, so unrelated keys rarely contend."""
+    
+    def __init__(self, shards: int = 32):
+        self._locks = [threading.Lock() for _ in range(shards)]
+    
+    def for_key(self, key: Hashable) -> threading.Lock:
+        """Get the lock guarding a key."""
+        return self._locks[hash(key) % len(self._locks)]
+    
+    @contextmanager
+    def all(self) -> Iterator[None]:
+        """Hold every shard, e.g. to read a consistent view of all keys."""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
 
 class ErrorTracker:
     """Tracks and analyzes errors in function execution."""
     
-    def __init__(self):
+    def __init__(self,
+                 store: Optional["ErrorStore"] = None,
+                 retention: Optional[RetentionPolicy] = None):
         self._error_history: Dict[str, list[ErrorInfo]] = {}
         self.logger = logging.getLogger(__name__)
+        self._store: Optional["ErrorStore"] = None
+        self._store_loaded = True
+        self._loader: Optional[threading.Thread] = None
+        # function name -> occurrences, including persisted ones
+        self._occurrences: Dict[str, int] = {}
+        # key -> {(error_type, fingerprint): signature}
+        self._signatures: Dict[str, Dict[Tuple[str, int], Signature]] = {}
+        self._windows: Dict[Hashable, WindowedCounter] = {}
+        self._pipeline: Optional[RecordingPipeline] = None
+        self._loop_buffers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LoopBuffer]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._locks = ShardedLocks()
+        self._retention: Optional[RetentionPolicy] = None
+        self._evictor: Optional[KeyEvictor] = None
+        self._evict_lock = threading.Lock()
+        # Track plain functions through sys.monitoring instead of a wrapper
+        self.use_monitoring = monitoring.AVAILABLE
+        # Releases this tracker's registrations when it is collected
+        self._monitoring_finalizer: Optional[weakref.finalize] = None
+        if store is not None:
+            self.attach_store(store)
+        if retention is not None:
+            self.set_retention(retention)
     
     @property
     def error_history(self) -> Dict[str, list[ErrorInfo]]:
+        self._ensure_loaded()
         return self._error_history
     
+    def attach_store(self, store: "ErrorStore") -> None:
+        """
+        Persist tracked errors to an on-disk store.
+        
+        The stored history is loaded on a background thread, so recording
+        never waits for it: errors recorded meanwhile are counted at once
+        and the loaded counts are added when the load finishes. Reading the
+        history waits for the load.
+        
+        Args:
+            store: Store to load history from and append new errors to
+        """
+        self._store = store
+        self._store_loaded = False
+        # Errors recorded before the load must not be in what it returns
+        store.hold()
+        self._loader = threading.Thread(
+            target=self._load_store, args=(store,), name="error-learner-load", daemon=True
+        )
+        self._loader.start()
+    
+    def set_retention(self, retention: Optional[RetentionPolicy]) -> None:
+        """
+        Bound the history kept by this tracker.
+        
+        Limits apply to errors recorded from now on.
+        
+        Args:
+            retention: Policy to apply, or None for unbounded history
+        """
+        self._retention = retention
+        if retention is not None and retention.max_keys is not None:
+            self._evictor = KeyEvictor(retention.eviction)
+        else:
+            self._evictor = None
+    
+    def _count_in_window(self, count_key: Hashable, epoch: float, count: int = 1) -> int:
+        """Count occurrences in the retention window and return the window's total."""
+        window = self._windows.get(count_key)
+        if window is None:
+            window = self._windows[count_key] = WindowedCounter(
+                self._retention.window_seconds, self._retention.window_buckets
+            )
+        return window.add(epoch, count)
+    
+    def _evict_keys(self, key: str) -> None:
+        """Note a use of a key and evict keys beyond the retention limit."""
+        with self._evict_lock:
+            self._evictor.touch(key)
+            victims = self._evictor.evict_over(self._retention.max_keys)
+        for victim in victims:
+            with self._locks.for_key(victim):
+                self._drop_key(victim)
+    
+    def _drop_key(self, key: str) -> None:
+        """Forget everything recorded under a key."""
+        self._error_history.pop(key, None)
+        self._occurrences.pop(key, None)
+        self._windows.pop(key, None)
+        self._signatures.pop(key, None)
+    
+    def _ensure_loaded(self) -> None:
+        """Wait for the persisted history to be loaded if a store was attached."""
+        loader = self._loader
+        if (not self._store_loaded and loader is not None
+                and loader is not threading.current_thread()):
+            loader.join()
+    
+    def _load_store(self, store: "ErrorStore") -> None:
+        """Add a store's history to the counts."""
+        try:
+            history = store.load()
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.error(f"Error loading error history from {store.path}: {e}")
+            history = {}
+        with self._locks.all():
+            self._load_history(history)
+        self._store_loaded = True
+    
+    def _load_history(self, history: Dict[str, Dict]) -> None:
+        """Seed recurrence counts from persisted history."""
+        for key, entries in history.items():
+            self._occurrences[key] = (
+                self._occurrences.get(key, 0)
+                + sum(e['count'] for e in entries.values())
+            )
+    
     def track(self, func: Callable) -> Callable:
-        """Decorator to track errors in function execution."""
+        """
+        Decorator to track errors in function execution.
+        
+        Where sys.monitoring is available, plain functions are returned
+        unchanged and their exceptions are caught as they unwind, so
+        successful calls cost nothing; otherwise the function is wrapped.
+        Coroutine functions and async generators are tracked while they
+        run, and their errors are recorded off the event loop.
+        """
+        # Partials and callable instances have neither; they are wrapped
+        code = getattr(func, '__code__', None)
+        function_name = getattr(func, '__name__', type(func).__name__)
+        
+        if isinstance(code, CodeType):
+            flags = code.co_flags
+            is_coroutine = bool(flags & _CO_COROUTINE)
+            is_async_generator = bool(flags & _CO_ASYNC_GENERATOR)
+        else:
+            # Partials and other callables; inspect unwraps them
+            import inspect
+            is_coroutine = inspect.iscoroutinefunction(func)
+            is_async_generator = inspect.isasyncgenfunction(func)
+        if is_coroutine:
+            return self._track_coroutine(func, function_name, code)
+        if is_async_generator:
+            return self._track_async_generator(func, function_name, code)
+        
+        if (self.use_monitoring and isinstance(code, CodeType)
+                and not code.co_flags & _DEFERRED_CODE):
+            # The registry outlives the tracker; it must not keep it alive
+            tracker_ref = weakref.ref(self)
+            
+            def on_unwind(e: BaseException) -> None:
+                tracker = tracker_ref()
+                if tracker is not None:
+                    tracker._capture(e, function_name, code)
+            
+            if monitoring.register(code, id(self), on_unwind):
+                if self._monitoring_finalizer is None:
+                    self._monitoring_finalizer = weakref.finalize(self, monitoring.release, id(self))
+                return func
+        
         @functools.wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
             try:
                 return func(*args, **kwargs)
             except Exception as e:
-                error_info = ErrorInfo(
-                    timestamp=datetime.now(),
-                    error_type=type(e),
-                    error_message=str(e),
-                    function_name=func.__name__,
-                    line_number=e.__traceback__.tb_lineno
-                )
-                
-                if func.__name__ not in self._error_history:
-                    self._error_history[func.__name__] = []
-                
-                self._error_history[func.__name__].append(error_info)
-                self._analyze_error(error_info)
-                
+                self._capture(e, function_name, code)
                 raise
         return wrapper
     
-    def _analyze_error(self, error_info: ErrorInfo) -> None:
+    def _track_coroutine(self, func: Callable, function_name: str,
+                         code: Optional[CodeType]) -> Callable:
+        """Wrap a coroutine function, so errors raised while it runs are tracked."""
+        import asyncio
+        
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                self._capture(e, function_name, code, asyncio.get_running_loop())
+                raise
+        return wrapper
+    
+    def _track_async_generator(self, func: Callable, function_name: str,
+                               code: Optional[CodeType]) -> Callable:
+        """Wrap an async generator function, forwarding asend() and athrow()."""
+        import asyncio
+        
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            agen = func(*args, **kwargs)
+            step = agen.asend(None)
+            try:
+                while True:
+                    try:
+                        item = await step
+                    except StopAsyncIteration:
+                        return
+                    try:
+                        value = yield item
+                    except GeneratorExit:
+                        await agen.aclose()
+                        raise
+                    except BaseException as thrown:
+                        step = agen.athrow(thrown)
+                    else:
+                        step = agen.asend(value)
+            except Exception as e:
+                self._capture(e, function_name, code, asyncio.get_running_loop())
+                raise
+        return wrapper
+    
+    def _capture(self, error: BaseException, function_name: str,
+                 code: Optional[CodeType],
+                 loop: Optional["asyncio.AbstractEventLoop"] = None) -> None:
+        """
+        Record an error raised by a tracked function.
+        
+        Exception groups, as raised by asyncio.TaskGroup, are recorded as
+        the errors they contain.
+        
+        Args:
+            error: The error
+            function_name: Name of the tracked function
+            code: Code object of the tracked function
+            loop: Event loop the error was raised on; its errors are
+                recorded in the loop's executor
+        """
+        for leaf in _leaf_errors(error):
+            if code is not None and self._captured_in(leaf, code):
+                # Already recorded where it was raised, in this function
+                continue
+            self._mark_seen(leaf)
+            tb = leaf.__traceback__ or error.__traceback__
+            if tb is not None:
+                line_number = entry_for(tb, code).tb_lineno
+                # Hashed by the recorder, which may be a background thread
+                path = call_path(tb)
+            else:
+                line_number, path = 0, None
+            # Only the type and message: the error itself would keep its
+            # traceback, and every frame's locals, alive in the queue
+            record = (type(leaf), str(leaf), function_name, code, line_number, time.time(), path)
+            pipeline = self._pipeline
+            if pipeline is not None:
+                # Keep the hot path cheap; the worker does the rest
+                pipeline.submit(record)
+            elif loop is not None:
+                buffer = self._loop_buffers.get(loop)
+                if buffer is None:
+                    buffer = self._loop_buffers[loop] = LoopBuffer(self._record_background)
+                buffer.add(loop, record)
+            else:
+                self._record_background(record)
+    
+    def _seen(self, error: BaseException) -> bool:
+        """Whether this tracker has recorded an error."""
+        seen = getattr(error, _SEEN, None)
+        return seen is not None and id(self) in seen
+    
+    def _mark_seen(self, error: BaseException, captured_in: Optional[CodeType] = None) -> None:
+        """Note that this tracker recorded an error, by global capture in `captured_in` if given."""
+        seen = getattr(error, _SEEN, None)
+        if seen is None:
+            seen = {}
+            try:
+                setattr(error, _SEEN, seen)
+            except (AttributeError, TypeError):
+                return
+        codes = seen.setdefault(id(self), [])
+        if captured_in is not None:
+            codes.append(id(captured_in))
+    
+    def _captured_in(self, error: BaseException, code: CodeType) -> bool:
+        """Whether global capture recorded an error in a code object; each record matches once."""
+        seen = getattr(error, _SEEN, None)
+        codes = seen.get(id(self)) if seen is not None else None
+        if codes and id(code) in codes:
+            codes.remove(id(code))
+            return True
+        return False
+    
+    def enable_background_recording(self,
+                                    max_queue: int = 10_000,
+                                    overflow: str = 'drop',
+                                    sample_every: int = 10) -> None:
+        """
+        Record errors on a background thread instead of in the failing call.
+        
+        Args:
+            max_queue: Maximum number of errors waiting to be recorded
+            overflow: 'drop', 'sample' or 'block' when the queue is under pressure
+            sample_every: Keep one in this many errors under the 'sample' policy
+        """
+        if self._pipeline is not None:
+            self.disable_background_recording()
+        self._pipeline = RecordingPipeline(
+            self._record_background,
+            max_queue=max_queue,
+            overflow=overflow,
+            sample_every=sample_every
+        )
+    
+    def disable_background_recording(self) -> None:
+        """Record any queued errors and return to synchronous recording."""
+        pipeline, self._pipeline = self._pipeline, None
+        if pipeline is not None:
+            pipeline.close()
+    
+    def _record_background(self, record: tuple) -> None:
+        """Turn a queued record into an ErrorInfo and record it."""
+        error_type, message, function_name, code, line_number, timestamp, path = record
+        error_info = ErrorInfo(
+            timestamp=timestamp,
+            error_type=error_type,
+            error_message=message,
+            function_name=function_name,
+            line_number=line_number,
+            fingerprint=hash_path(path) if path is not None else None,
+            function_line=getattr(code, 'co_firstlineno', None)
+        )
+        self._record(error_info, getattr(code, 'co_filename', ''))
+    
+    def _record(self, error_info: ErrorInfo, file_path: str) -> None:
+        """Add an error to the history and analyze it."""
+        name = error_info.function_name
+        retention = self._retention
+        with self._locks.for_key(name):
+            func_errors = self._error_history.get(name)
+            if func_errors is None:
+                if retention is not None and retention.max_entries_per_key is not None:
+                    func_errors = deque(maxlen=retention.max_entries_per_key)
+                else:
+                    func_errors = []
+                self._error_history[name] = func_errors
+            func_errors.append(error_info)
+            if error_info.fingerprint is not None:
+                self._count_signature(name, error_info.error_type.__name__,
+                                      error_info.fingerprint, error_info.line_number)
+            
+            if retention is not None and retention.window_seconds is not None:
+                occurrences = self._count_in_window(name, error_info.epoch)
+            else:
+                occurrences = self._occurrences[name] = self._occurrences.get(name, 0) + 1
+        
+        if self._evictor is not None:
+            self._evict_keys(name)
+        self._analyze_error(error_info, occurrences)
+        if self._store is not None:
+            self._store.append({
+                'key': error_info.function_name,
+                'error_type': error_info.error_type.__name__,
+                'message': error_info.error_message,
+                'line': error_info.line_number,
+                'file': file_path,
+                'timestamp': error_info.timestamp.isoformat(),
+                'count': 1,
+                'function_line': error_info.function_line
+            })
+    
+    def _count_signature(self, key: str, type_name: str, path: int, line_number: int,
+                         count: int = 1) -> Signature:
+        """Count an error under its call path; the caller holds the key's lock."""
+        signatures = self._signatures.get(key)
+        if signatures is None:
+            signatures = self._signatures[key] = {}
+        signature = signatures.get((type_name, path))
+        if signature is None:
+            signature = signatures[(type_name, path)] = Signature(type_name, path, line_number)
+        signature.count += count
+        return signature
+    
+    def get_signatures(self, key: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get errors grouped by call path, most frequent first.
+        
+        Args:
+            key: Only the signatures of this function (for ExtensionTracker,
+                "file:function"); all if omitted
+            
+        Returns:
+            Dicts with key, error_type, fingerprint (hex), line and count
+        """
+        with self._locks.all():
+            grouped = [(k, signature) for k, signatures in self._signatures.items()
+                       if key is None or k == key
+                       for signature in signatures.values()]
+            result = [dict(signature.as_dict(), key=k) for k, signature in grouped]
+        result.sort(key=lambda s: s['count'], reverse=True)
+        return result
+    
+    def signature_count(self, key: str, error_type: str, path: int) -> int:
+        """Count the errors of a type that reached a function through one call path."""
+        signature = self._signatures.get(key, {}).get((error_type, path))
+        return signature.count if signature is not None else 0
+    
+    def _analyze_error(self, error_info: ErrorInfo, occurrences: int) -> None:
         """Analyze the error and suggest fixes if possible."""
-        func_errors = self._error_history[error_info.function_name]
-        if len(func_errors) >= 3:
+        if occurrences >= 3:
             # After 3 occurrences, try to suggest a fix
             error_info.fix_suggestion = self._generate_fix_suggestion(error_info)
             self.logger.info(f"Fix suggestion for {error_info.function_name}: {error_info.fix_suggestion}")
@@ -0,0 +1,218 @@
+"""
+Correlation of analyzer issues with the errors actually seen in a file.
+
+A file's error history is indexed once into error counts per function and
+per line, so ranking a file's issues costs a few dict lookups per issue.
+
+Errors are placed in the current source through the function they were
+raised in: an error recorded N lines below the first line of its function
+is placed N lines below that function's first line today, so it follows
+the function when code above it is added or removed. Errors recorded
+without the function's first line, or whose function no longer exists,
+stay at their recorded line.
+
+Issues are ranked by how often their error type was seen at their line,
+then anywhere in their function. Issues whose type was never seen in
+either are dropped: a rule flags every division, but only the divisions
+in code that has divided by zero are worth showing first.
+"""
+
+import ast
+import heapq
+from bisect import bisect_right
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# (name, first line including decorators, last line)
+FunctionSpan = Tuple[str, int, int]
+
+# error type -> count
+TypeCounts = Dict[str, int]
+
+_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+# Statements that may hold nested statements, and the fields holding them
+_COMPOUND = {
+    node_type: tuple(name for name in ("body", "orelse", "finalbody", "handlers", "cases")
+                     if name in node_type._fields)
+    for node_type in (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.If, ast.For,
+                      ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try,
+                      ast.ExceptHandler, getattr(ast, "TryStar", None),
+                      getattr(ast, "Match", None), getattr(ast, "match_case", None))
+    if node_type is not None
+}
+
+
+def first_line(node: ast.stmt) -> int:
+    """Get a statement's first line, including decorators, like a code object's co_firstlineno."""
+    decorators = getattr(node, "decorator_list", None)
+    if decorators:
+        return min(node.lineno, min(d.lineno for d in decorators))
+    return node.lineno
+
+
+def function_spans(body: Iterable[ast.stmt], delta: int = 0) -> List[FunctionSpan]:
+    """
+    Find the functions and methods defined in statements, at any depth.
+
+    Only statements are walked, not expressions, so this is much cheaper
+    than a full traversal.
+
+    Args:
+        body: Statements, such as a module's body
+        delta: Added to every line number
+
+    Returns:
+        Spans in source order, enclosing functions before nested ones
+    """
+    spans: List[FunctionSpan] = []
+    compound = _COMPOUND
+    # Simple statements are never pushed
+    stack = [node for node in body if type(node) in compound]
+    stack.reverse()
+    while stack:
+        node = stack.pop()
+        if isinstance(node, _FUNCTIONS):
+            spans.append((node.name, first_line(node) + delta, node.end_lineno + delta))
+        children: List[Any] = []
+        for name in compound[type(node)]:
+            children.extend(child for child in getattr(node, name) if type(child) in compound)
+        if children:
+            children.reverse()
+            stack.extend(children)
+    return spans
+
+
+def _add(counts: Dict[Any, TypeCounts], key: Any, error_type: str, count: int) -> None:
+    types = counts.get(key)
+    if types is None:
+        types = counts[key] = {}
+    types[error_type] = types.get(error_type, 0) + count
+
+
+class ErrorCorrelation:
+    """A file's errors by function and line, precomputed from its history."""
+
+    def __init__(self, file_errors: Iterable[Dict[str, Any]]):
+        """
+        Index a file's errors.
+
+        Args:
+            file_errors: History entries of the file; those with 'function'
+                and 'function_line' follow their function when it moves
+        """
+        # function -> its first line when the error was seen -> offset -> counts
+        self._anchored: Dict[str, Dict[int, Dict[int, TypeCounts]]] = {}
+        # line -> counts, for errors located by line alone
+        self._lines: Dict[int, TypeCounts] = {}
+        self.total = 0
+        for error in file_errors:
+            count = error.get("count", 1)
+            self.total += count
+            function = error.get("function")
+            function_line = error.get("function_line")
+            if function and function_line is not None:
+                offsets = self._anchored.setdefault(function, {}).setdefault(function_line, {})
+                _add(offsets, error["line"] - function_line, error["error_type"], count)
+            else:
+                _add(self._lines, error["line"], error["error_type"], count)
+
+    def __bool__(self) -> bool:
+        return self.total > 0
+
+    def locate(self, spans: List[FunctionSpan]) -> Dict[int, TypeCounts]:
+        """
+        Place the errors in the current source.
+
+        Args:
+            spans: The source's functions, from function_spans()
+
+        Returns:
+            Error counts by line of the current source
+        """
+        located = {line: dict(types) for line, types in self._lines.items()}
+        anchored = self._anchored
+        starts: Dict[str, List[int]] = {}
+        for name, start, _ in spans:
+            if name in anchored:
+                starts.setdefault(name, []).append(start)
+        for function, anchors in anchored.items():
+            candidates = starts.get(function)
+            for function_line, offsets in anchors.items():
+                if candidates is None:
+                    start = function_line
+                else:
+                    # Of functions sharing a name, the one that moved least
+                    start = min(candidates, key=lambda s: abs(s - function_line))
+                for offset, types in offsets.items():
+                    for error_type, count in types.items():
+                        _add(located, start + offset, error_type, count)
+        return located
+
+    def rank(self, issues: List[Dict[str, Any]], spans: List[FunctionSpan],
+             top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Rank issues by the failures of their error type around them.
+
+        Args:
+            issues: Issues of the current source
+            spans: The source's functions, from function_spans()
+            top: Maximum number of issues to return; all if omitted
+
+        Returns:
+            Copies of the issues whose type failed at their line or in their
+            function, most failures first, with 'failures' (at the line) and
+            'function_failures' (in the innermost enclosing function) added
+        """
+        located = self.locate(spans)
+        starts = [start for _, start, _ in spans]
+        # Index of each span's enclosing span, or -1
+        parents: List[int] = []
+        enclosing: List[int] = []
+        for i, (_, start, _) in enumerate(spans):
+            while enclosing and spans[enclosing[-1]][2] < start:
+                enclosing.pop()
+            parents.append(enclosing[-1] if enclosing else -1)
+            enclosing.append(i)
+
+        def innermost(line: int) -> Optional[int]:
+            # The last span starting at or before the line, or one enclosing it
+            i = bisect_right(starts, line) - 1
+            while i >= 0 and spans[i][2] < line:
+                i = parents[i]
+            return i if i >= 0 else None
+
+        functions: Dict[Optional[int], TypeCounts] = {}
+        for line, types in located.items():
+            span = innermost(line)
+            if span is not None:
+                for error_type, count in types.items():
+                    _add(functions, span, error_type, count)
+
+        # Issues only count failures inside their function, so lines of
+        # functions without failures can be skipped without a lookup
+        failing = [spans[i] for i in functions if i is not None]
+        failing_lines = set()
+        for _, start, end in failing:
+            failing_lines.update(range(start, end + 1))
+        failing_lines.update(located)
+
+        candidates = []
+        for issue in issues:
+            line = issue["line"]
+            if line not in failing_lines:
+                continue
+            error_type = issue["type"]
+            types = located.get(line)
+            at_line = types.get(error_type, 0) if types is not None else 0
+            types = functions.get(innermost(line))
+            in_function = types.get(error_type, 0) if types is not None else 0
+            if at_line or in_function:
+                candidates.append((at_line, in_function, issue))
+
+        key = itemgetter(0, 1)
+        if top is None:
+            ranked = sorted(candidates, key=key, reverse=True)
+        else:
+            ranked = heapq.nlargest(top, candidates, key=key)
+        return [dict(issue, failures=at_line, function_failures=in_function)
+                for at_line, in_function, issue in ranked] 
\ No newline at end of file
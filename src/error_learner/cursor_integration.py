@@ -5,16 +5,38 @@ Cursor integration for code analysis and error pattern detection.
 import json
 import logging
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Union
 
-from .analyzer import analyzer
-from .extension import tracker
+from .analyzer import get_analyzer
+
+if TYPE_CHECKING:
+    from .daemon import AnalysisDaemon, DaemonClient
 
 class CursorAnalyzer:
     """Integrates error pattern analysis with Cursor's code analysis."""
     
-    def __init__(self):
+    def __init__(self, top: Optional[int] = None):
+        """
+        Create an integration.
+        
+        Args:
+            top: Report only a file's issues most likely to fail, at most
+                this many, ranked by error history (see
+                PatternAnalyzer.top_issues); all issues if None. An
+                attached daemon ranks with its own setting.
+        """
         self.logger = logging.getLogger("error_learner.cursor")
+        self.daemon: Optional[Union["AnalysisDaemon", "DaemonClient"]] = None
+        self.top = top
+    
+    def attach_daemon(self, daemon: Union["AnalysisDaemon", "DaemonClient"]) -> None:
+        """
+        Get results from an analysis daemon instead of analyzing on each event.
+        
+        Args:
+            daemon: A running AnalysisDaemon, or a client connected to one
+        """
+        self.daemon = daemon
     
     def analyze_current_file(self, file_path: str) -> List[Dict]:
         """
@@ -27,7 +49,7 @@ class CursorAnalyzer:
             List of potential issues with suggestions
         """
         self.logger.info("Analyzing current file: %s", file_path)
-        return analyzer.analyze_file(file_path)
+        return self._analyze(file_path)
     
     def analyze_on_save(self, file_path: str) -> None:
         """
@@ -36,8 +58,12 @@ class CursorAnalyzer:
         Args:
             file_path: Path to the saved file
         """
+        if self.daemon is not None:
+            # Debounced; the daemon re-analyzes once the saves stop
+            self.daemon.notify(file_path)
+            return
         self.logger.info("Analyzing file on save: %s", file_path)
-        issues = analyzer.analyze_file(file_path)
+        issues = self._analyze(file_path)
         self._report_issues(file_path, issues)
     
     def analyze_on_open(self, file_path: str) -> None:
@@ -47,8 +73,13 @@ class CursorAnalyzer:
         Args:
             file_path: Path to the opened file
         """
+        if self.daemon is not None:
+            issues = self.daemon.issues(file_path)
+            if issues is not None:
+                self._report_issues(file_path, issues)
+                return
         self.logger.info("Analyzing file on open: %s", file_path)
-        issues = analyzer.analyze_file(file_path)
+        issues = self._analyze(file_path)
         self._report_issues(file_path, issues)
     
     def analyze_workspace(self, workspace_path: str) -> None:
@@ -59,10 +90,17 @@ class CursorAnalyzer:
             workspace_path: Path to the workspace directory
         """
         self.logger.info("Analyzing workspace: %s", workspace_path)
-        issues = analyzer.analyze_workspace(workspace_path)
-        for file_path, file_issues in issues.items():
+        analyzer = get_analyzer()
+        for file_path, file_issues in analyzer.iter_workspace(workspace_path):
+            if self.top is not None:
+                file_issues = analyzer.rank_issues(file_path, file_issues, self.top)
             self._report_issues(file_path, file_issues)
     
+    def _analyze(self, file_path: str) -> List[Dict]:
+        if self.top is not None:
+            return get_analyzer().top_issues(file_path, self.top)
+        return get_analyzer().analyze_file(file_path)
+    
     def _report_issues(self, file_path: str, issues: List[Dict]) -> None:
         """Report issues found in a file."""
         for issue in issues:
@@ -0,0 +1,372 @@
+"""
+Long-running analysis daemon for a workspace.
+
+The daemon watches a workspace and keeps the analysis of every Python file
+up to date, so the IDE asks it for results instead of running a full
+analysis on every save or open. Changes are debounced per file: a burst of
+events for the same file (a format-on-save, a git checkout) schedules one
+analysis, once the file has been quiet for `debounce` seconds. Each event
+bumps the file's generation; a queued analysis of an older generation is
+skipped and a result that finished after a newer event is discarded, so
+stale analyses never reach the IDE.
+
+Files are re-analyzed when their content changes or when their error
+history does. Changes are found by polling file stats, which needs no
+platform-specific watcher; directories whose mtime has not changed are
+not listed again, so a poll costs a stat per directory and per file. The
+IDE can report saves directly through notify() to skip the poll delay.
+Results are served to the IDE over a local socket (see DaemonClient).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .analyzer import PatternAnalyzer
+from .cache import errors_digest
+from .discovery import WorkspaceScanner
+from .extension import get_tracker
+from .index import ErrorIndex
+
+# Called with a file path and its issues after each analysis
+ResultCallback = Callable[[str, List[Dict]], None]
+
+
+class AnalysisDaemon:
+    """Keeps a workspace's analysis results current and serves them."""
+
+    def __init__(self,
+                 workspace: str,
+                 analyzer: Optional[PatternAnalyzer] = None,
+                 store: Optional[str] = None,
+                 debounce: float = 0.3,
+                 poll_interval: float = 1.0,
+                 on_result: Optional[ResultCallback] = None,
+                 top: Optional[int] = None):
+        """
+        Create a daemon; call start() to begin watching.
+
+        Args:
+            workspace: Directory to watch
+            analyzer: Analyzer to use, switched to incremental re-analysis;
+                defaults to a new one, leaving the global analyzer as it is
+            store: Error store directory to read error history from; if
+                omitted, history comes from the global tracker
+            debounce: Seconds a file must be quiet before it is analyzed
+            poll_interval: Seconds between scans of the workspace
+            on_result: Called with each fresh result
+            top: Keep only a file's issues most likely to fail, at most this
+                many, ranked by error history (see PatternAnalyzer.top_issues);
+                all issues if None
+        """
+        self.workspace = os.path.abspath(workspace)
+        self.analyzer = analyzer if analyzer is not None else PatternAnalyzer()
+        if not self.analyzer.incremental:
+            # A save re-analyzes only the top-level blocks it changed
+            self.analyzer.enable_incremental()
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.on_result = on_result
+        self.top = top
+        # Walks rather than running git on every poll; unchanged directories are not listed again
+        self.scanner = WorkspaceScanner(self.workspace, self.analyzer.exclude, use_git=False)
+        self.logger = logging.getLogger("error_learner.daemon")
+        self.analyses = 0
+
+        self._index = ErrorIndex(store) if store is not None else None
+        self._index_lock = threading.Lock()
+
+        # path -> time the file may be analyzed at
+        self._pending: Dict[str, float] = {}
+        # path -> generation, bumped on every event for the file
+        self._generations: Dict[str, int] = {}
+        # path -> (generation, issues)
+        self._results: Dict[str, Tuple[int, List[Dict]]] = {}
+        # path -> digest of the error history the result was computed with
+        self._digests: Dict[str, str] = {}
+        # path -> (mtime_ns, size) seen by the last scan
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self._busy = False
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads: List[threading.Thread] = []
+        self._listener: Optional[Listener] = None
+        self.address: Optional[Any] = None
+        self.authkey: Optional[bytes] = None
+
+    def start(self) -> "AnalysisDaemon":
+        """Scan the workspace and start watching it and analyzing changes."""
+        self.poll()
+        for target, name in ((self._watch, "error-learner-watcher"),
+                             (self._work, "error-learner-analysis")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def serve(self, address: Optional[Any] = None,
+              authkey: Optional[bytes] = None) -> "AnalysisDaemon":
+        """
+        Serve results on a local socket.
+
+        Args:
+            address: Listener address; defaults to a fresh Unix socket where
+                available
+            authkey: Key clients must present; a random one is generated
+                if omitted
+        """
+        self.authkey = authkey if authkey is not None else os.urandom(16)
+        self._listener = Listener(address, authkey=self.authkey)
+        self.address = self._listener.address
+        threading.Thread(target=self._accept, name="error-learner-daemon", daemon=True).start()
+        return self
+
+    def write_info(self, path: str) -> None:
+        """Write the address and authkey clients need to a file only the owner can read."""
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"address": self.address, "authkey": self.authkey.hex(), "pid": os.getpid()}, f)
+
+    def close(self) -> None:
+        """Stop watching, analyzing and serving."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._listener is not None:
+            # Like the collector's, the accept thread is left to exit with the process
+            self._listener.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=5.0)
+        if self._index is not None:
+            self._index.close()
+
+    def notify(self, file_path: str, delay: Optional[float] = None) -> None:
+        """
+        Report a change to a file, scheduling its analysis.
+
+        Args:
+            file_path: Changed file
+            delay: Seconds to wait for further changes; defaults to the
+                debounce interval
+        """
+        file_path = os.path.abspath(file_path)
+        with self._cond:
+            self._generations[file_path] = self._generations.get(file_path, 0) + 1
+            self._pending[file_path] = time.monotonic() + (
+                self.debounce if delay is None else delay
+            )
+            self._cond.notify_all()
+
+    def issues(self, file_path: str) -> Optional[List[Dict]]:
+        """
+        Get the latest issues of a file.
+
+        Returns:
+            The issues, or None if the file has not been analyzed yet
+        """
+        result = self._results.get(os.path.abspath(file_path))
+        return result[1] if result is not None else None
+
+    def status(self) -> Dict[str, Any]:
+        """Get counts of watched, pending and analyzed files."""
+        with self._cond:
+            return {
+                "workspace": self.workspace,
+                "files": len(self._stats),
+                "pending": len(self._pending),
+                "analyzed": len(self._results),
+                "analyses": self.analyses,
+            }
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until no analysis is pending or running.
+
+        Returns:
+            False if the timeout expired first
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def poll(self) -> None:
+        """Scan the workspace once, scheduling changed files and files with new errors."""
+        stats: Dict[str, Tuple[int, int]] = {}
+        for file_path in self.scanner.files():
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            stats[file_path] = (st.st_mtime_ns, st.st_size)
+
+        previous = self._stats
+        self._stats = stats
+        for file_path, stat in stats.items():
+            if previous.get(file_path) != stat:
+                self.notify(file_path)
+        for file_path in previous.keys() - stats.keys():
+            self._forget(file_path)
+
+        for file_path in self._history_changes(stats):
+            self.notify(file_path, delay=0.0)
+
+    def _history_changes(self, files: Dict[str, Tuple[int, int]]) -> List[str]:
+        """Files already analyzed whose error history changed since."""
+        if self._index is not None:
+            with self._index_lock:
+                try:
+                    candidates = self._index.refresh().changed_files
+                except Exception as e:
+                    self.logger.error(f"Error reading error history: {e}")
+                    return []
+        else:
+            candidates = self._results.keys()
+        return [file_path for file_path in list(candidates)
+                if file_path in files and file_path in self._digests
+                and errors_digest(self._file_errors(file_path)) != self._digests[file_path]]
+
+    def _file_errors(self, file_path: str) -> List[Dict]:
+        if self._index is not None:
+            with self._index_lock:
+                return self._index.file_errors(file_path)
+        return get_tracker().get_file_errors(file_path)
+
+    def _forget(self, file_path: str) -> None:
+        with self._cond:
+            self._generations[file_path] = self._generations.get(file_path, 0) + 1
+            self._pending.pop(file_path, None)
+            self._results.pop(file_path, None)
+            self._digests.pop(file_path, None)
+        self.analyzer.forget(file_path)
+
+    def _watch(self) -> None:
+        while True:
+            with self._cond:
+                if self._cond.wait_for(lambda: self._closed, self.poll_interval):
+                    return
+            try:
+                self.poll()
+            except Exception as e:
+                self.logger.error(f"Error scanning {self.workspace}: {e}")
+
+    def _next_due(self) -> Optional[Tuple[str, int]]:
+        """Wait for the next file to become due, under the condition's lock."""
+        while not self._closed:
+            now = time.monotonic()
+            due = None
+            for file_path, deadline in self._pending.items():
+                if deadline <= now and (due is None or deadline < self._pending[due]):
+                    due = file_path
+            if due is not None:
+                del self._pending[due]
+                return due, self._generations.get(due, 0)
+            timeout = min(self._pending.values()) - now if self._pending else None
+            self._cond.wait(timeout)
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+                item = self._next_due()
+                if item is None:
+                    return
+                self._busy = True
+            file_path, generation = item
+            try:
+                file_errors = self._file_errors(file_path)
+                if self.top is not None:
+                    issues = self.analyzer.top_issues(file_path, self.top, file_errors)
+                else:
+                    issues = self.analyzer.analyze_file(file_path, file_errors)
+            except Exception as e:
+                self.logger.error(f"Error analyzing {file_path}: {e}")
+                continue
+            with self._cond:
+                self.analyses += 1
+                if self._generations.get(file_path, 0) != generation:
+                    # Changed while it was analyzed; a newer analysis is scheduled
+                    continue
+                self._results[file_path] = (generation, issues)
+                self._digests[file_path] = errors_digest(file_errors)
+            if self.on_result is not None:
+                self.on_result(file_path, issues)
+
+    def _accept(self) -> None:
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                if self._closed:
+                    return
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: Connection) -> None:
+        with conn:
+            while True:
+                try:
+                    command, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if command == "issues":
+                    conn.send(self.issues(payload))
+                elif command == "notify":
+                    self.notify(payload)
+                    conn.send(None)
+                elif command == "status":
+                    conn.send(self.status())
+                else:
+                    self.logger.error(f"Unknown daemon command: {command!r}")
+                    return
+
+
+class DaemonClient:
+    """Connection from the IDE to an AnalysisDaemon."""
+
+    def __init__(self, address: Any, authkey: bytes):
+        """
+        Connect to a daemon.
+
+        Args:
+            address: Address the daemon serves on
+            authkey: The daemon's authkey
+        """
+        self._conn = Client(address, authkey=authkey)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_info(cls, path: str) -> "DaemonClient":
+        """Connect to the daemon described by an info file written by `error-learner daemon`."""
+        with open(path, "r") as f:
+            info = json.load(f)
+        address = info["address"]
+        # TCP addresses come back from JSON as lists
+        return cls(tuple(address) if isinstance(address, list) else address,
+                   bytes.fromhex(info["authkey"]))
+
+    def issues(self, file_path: str) -> Optional[List[Dict]]:
+        """Get the latest issues of a file, or None if it was not analyzed yet."""
+        return self._request("issues", os.path.abspath(file_path))
+
+    def notify(self, file_path: str) -> None:
+        """Report a change to a file."""
+        self._request("notify", os.path.abspath(file_path))
+
+    def status(self) -> Dict[str, Any]:
+        """Get the daemon's counts of watched, pending and analyzed files."""
+        return self._request("status", None)
+
+    def close(self) -> None:
+        """Disconnect."""
+        self._conn.close()
+
+    def _request(self, command: str, payload: Any) -> Any:
+        with self._lock:
+            self._conn.send((command, payload))
+            return self._conn.recv() 
\ No newline at end of file
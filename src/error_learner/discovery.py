@@ -0,0 +1,384 @@
+"""
+Discovery of the Python files in a workspace.
+
+Directories are walked with os.scandir, and ignored ones are pruned before
+they are entered, so node_modules, build outputs and virtualenvs (any
+directory with a pyvenv.cfg, whatever its name) cost one check instead of
+a full descent. What is ignored follows .gitignore files, with git's
+pattern syntax, and a list of exclude patterns in the same syntax.
+
+Each directory's listing is kept along with the directory's mtime; on a
+rescan, a directory whose mtime has not changed is not listed again, so a
+rescan of an unchanged tree costs one stat per directory. Listings made
+within a second of a directory's last change are not kept, as a change in
+the same mtime tick would go unnoticed.
+
+When the workspace is in a git repository, `git ls-files` can be used
+instead: it applies every ignore source git knows (including
+.git/info/exclude and global excludes), from git's own index.
+"""
+
+import logging
+import os
+import re
+import shutil
+import subprocess
+import time
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+# Excluded unless the exclude patterns are given explicitly
+DEFAULT_EXCLUDES: Tuple[str, ...] = (
+    "__pycache__/",
+    ".hg/",
+    ".svn/",
+    ".tox/",
+    ".nox/",
+    ".venv/",
+    "venv/",
+    ".mypy_cache/",
+    ".pytest_cache/",
+    ".ruff_cache/",
+    "*.egg-info/",
+    "node_modules/",
+    "site-packages/",
+    "build/",
+    "dist/",
+)
+
+# Seconds a directory must be unchanged for its listing to be kept
+_RACY = 1.0
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore pattern, without its leading and trailing slashes, to a regex."""
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i) and (i == 0 or pattern[i - 1] == "/"):
+                if i + 2 == n:
+                    parts.append(".*")
+                    i += 2
+                    continue
+                if pattern[i + 2] == "/":
+                    # Any number of directories, including none
+                    parts.append("(?:.*/)?")
+                    i += 3
+                    continue
+            parts.append("[^/]*")
+            while i < n and pattern[i] == "*":
+                i += 1
+            continue
+        if c == "?":
+            parts.append("[^/]")
+        elif c == "[":
+            # A ']' right after the opening bracket is part of the set
+            end = pattern.find("]", i + 3 if pattern.startswith(("[!", "[^"), i) else i + 2)
+            if end == -1:
+                parts.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                parts.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return "".join(parts)
+
+
+class IgnoreRules:
+    """Ordered gitignore-style patterns; the last matching pattern decides."""
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Compile patterns.
+
+        Args:
+            patterns: Lines in .gitignore syntax; blank lines and comments
+                are skipped
+        """
+        # (regex, negated, directories only, matched against the name only)
+        self._rules: List[Tuple[Pattern[str], bool, bool, bool]] = []
+        for line in patterns:
+            line = line.rstrip("\n")
+            if not line.endswith("\\ "):
+                line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated or line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            # A slash anywhere but at the end anchors the pattern to its directory
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if not line:
+                continue
+            regex = re.compile(_translate(line) + r"\Z", re.DOTALL)
+            self._rules.append((regex, negated, dir_only, not anchored))
+        self._rules.reverse()
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    @classmethod
+    def from_file(cls, path: str) -> "IgnoreRules":
+        """Read a .gitignore file."""
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return cls(f.read().splitlines())
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Match a path against the patterns.
+
+        Args:
+            rel_path: Path relative to the patterns' directory, with '/' separators
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if ignored, False if re-included by a negated pattern,
+            None if no pattern matches
+        """
+        name = rel_path.rpartition("/")[2]
+        for regex, negated, dir_only, basename in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(name if basename else rel_path):
+                return not negated
+        return None
+
+
+# (directory relative to the root, its .gitignore), outermost first
+_Chain = Tuple[Tuple[str, IgnoreRules], ...]
+
+
+class _Directory:
+    """A directory's listing and the files and subdirectories it yields under a chain of rules."""
+
+    __slots__ = ("mtime", "py_files", "subdirs", "gitignore", "venv", "chain", "files", "dirs")
+
+    def __init__(self, mtime: Optional[int], py_files: List[str], subdirs: List[str],
+                 gitignore: bool, venv: bool):
+        # None if the listing may be stale by the next scan
+        self.mtime = mtime
+        self.py_files = py_files
+        self.subdirs = subdirs
+        self.gitignore = gitignore
+        self.venv = venv
+        self.chain: Optional[_Chain] = None
+        self.files: List[str] = []
+        self.dirs: List[str] = []
+
+
+class WorkspaceScanner:
+    """Finds a workspace's Python files, keeping listings between scans."""
+
+    def __init__(self,
+                 root: str,
+                 exclude: Optional[Iterable[str]] = None,
+                 use_git: bool = True,
+                 gitignore: bool = True):
+        """
+        Create a scanner.
+
+        Args:
+            root: Workspace directory
+            exclude: Patterns in .gitignore syntax, relative to the root, of
+                paths never to yield; defaults to DEFAULT_EXCLUDES
+            use_git: List files with `git ls-files` when the root is in a git
+                repository; the directory walk is used otherwise
+            gitignore: Honour .gitignore files in the directory walk
+        """
+        self.root = os.path.abspath(root)
+        self.exclude = IgnoreRules(DEFAULT_EXCLUDES if exclude is None else exclude)
+        self.use_git = use_git and shutil.which("git") is not None
+        self.gitignore = gitignore
+        self.logger = logging.getLogger("error_learner.discovery")
+        # Directory path -> listing
+        self._directories: Dict[str, _Directory] = {}
+        # .gitignore path -> ((mtime_ns, size), rules)
+        self._rules: Dict[str, Tuple[Tuple[int, int], IgnoreRules]] = {}
+
+    def files(self) -> List[str]:
+        """
+        Find the workspace's Python files.
+
+        Returns:
+            Absolute paths, in the same order from one scan to the next
+        """
+        if self.use_git:
+            files = self._git_files()
+            if files is not None:
+                return files
+            # Not a repository; don't ask again
+            self.use_git = False
+        return self._walk()
+
+    def ignored(self, rel_path: str, is_dir: bool, chain: _Chain = ()) -> bool:
+        """
+        Check a path against the exclude patterns, then the .gitignore files in chain.
+
+        Args:
+            rel_path: Path relative to the root, with '/' separators
+            is_dir: Whether the path is a directory
+            chain: (directory relative to the root, rules) pairs, outermost first
+        """
+        excluded = self.exclude.match(rel_path, is_dir)
+        if excluded is not None:
+            return excluded
+        # Rules of deeper .gitignore files take precedence
+        for base, rules in reversed(chain):
+            matched = rules.match(rel_path[len(base) + 1:] if base else rel_path, is_dir)
+            if matched is not None:
+                return matched
+        return False
+
+    def _walk(self) -> List[str]:
+        files: List[str] = []
+        racy = time.time() - _RACY
+        seen = set()
+        # (path, path relative to the root, chain of the parent's rules)
+        stack: List[Tuple[str, str, _Chain]] = [(self.root, "", ())]
+        while stack:
+            path, rel, chain = stack.pop()
+            seen.add(path)
+            directory = self._directory(path, racy)
+            if directory is None or (directory.venv and rel):
+                continue
+            if directory.gitignore and self.gitignore:
+                rules = self._gitignore(os.path.join(path, ".gitignore"))
+                if rules:
+                    chain = chain + ((rel, rules),)
+            if directory.chain != chain:
+                self._filter(directory, path, rel, chain)
+            files.extend(directory.files)
+            for name in reversed(directory.dirs):
+                stack.append((os.path.join(path, name), f"{rel}/{name}" if rel else name, chain))
+        if len(seen) < len(self._directories):
+            # Drop listings of directories removed or now ignored
+            self._directories = {p: d for p, d in self._directories.items() if p in seen}
+        return files
+
+    def _directory(self, path: str, racy: float) -> Optional[_Directory]:
+        """Get a directory's listing, from the cache if its mtime is unchanged."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        directory = self._directories.get(path)
+        if directory is not None and directory.mtime == mtime:
+            return directory
+        py_files, subdirs = [], []
+        gitignore = venv = False
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    name = entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if name != ".git":
+                                subdirs.append(name)
+                        elif name.endswith(".py"):
+                            if entry.is_file():
+                                py_files.append(name)
+                        elif name == ".gitignore":
+                            gitignore = True
+                        elif name == "pyvenv.cfg":
+                            venv = True
+                    except OSError:
+                        continue
+        except OSError as e:
+            self.logger.debug(f"Cannot list {path}: {e}")
+            return None
+        py_files.sort()
+        subdirs.sort()
+        directory = _Directory(mtime if mtime < racy * 1e9 else None, py_files, subdirs, gitignore, venv)
+        self._directories[path] = directory
+        return directory
+
+    def _filter(self, directory: _Directory, path: str, rel: str, chain: _Chain) -> None:
+        prefix = f"{rel}/" if rel else ""
+        directory.files = [os.path.join(path, name) for name in directory.py_files
+                           if not self.ignored(prefix + name, False, chain)]
+        directory.dirs = [name for name in directory.subdirs
+                          if not self.ignored(prefix + name, True, chain)]
+        directory.chain = chain
+
+    def _gitignore(self, path: str) -> Optional[IgnoreRules]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        stat = (st.st_mtime_ns, st.st_size)
+        cached = self._rules.get(path)
+        if cached is not None and cached[0] == stat:
+            return cached[1]
+        try:
+            rules = IgnoreRules.from_file(path)
+        except OSError as e:
+            self.logger.warning(f"Cannot read {path}: {e}")
+            return None
+        self._rules[path] = (stat, rules)
+        return rules
+
+    def _git_files(self) -> Optional[List[str]]:
+        """List files with git, or None if the root is not in a repository."""
+        try:
+            result = subprocess.run(
+                ["git", "ls-files", "-z", "-t", "--cached", "--deleted", "--others",
+                 "--exclude-standard", "--", "*.py"],
+                cwd=self.root, capture_output=True, timeout=60,
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            self.logger.debug(f"git ls-files failed in {self.root}: {e}")
+            return None
+        if result.returncode != 0:
+            return None
+
+        listed, deleted = set(), set()
+        for entry in result.stdout.decode("utf-8", "surrogateescape").split("\0"):
+            if not entry:
+                continue
+            # "<tag> <path>"; R marks a tracked file deleted from the work tree
+            (deleted if entry[0] == "R" else listed).add(entry[2:])
+
+        files = []
+        # Directory relative to the root -> ignored
+        directories: Dict[str, bool] = {"": False}
+        for rel in sorted(listed - deleted):
+            if self._git_dir_ignored(rel.rpartition("/")[0], directories) or self.ignored(rel, False):
+                continue
+            files.append(os.path.join(self.root, rel.replace("/", os.sep)))
+        return files
+
+    def _git_dir_ignored(self, rel: str, directories: Dict[str, bool]) -> bool:
+        """Whether a directory, or one above it, is excluded or a virtualenv."""
+        ignored = directories.get(rel)
+        if ignored is None:
+            parent, _, _ = rel.rpartition("/")
+            ignored = (self._git_dir_ignored(parent, directories)
+                       or self.ignored(rel, True)
+                       or os.path.exists(os.path.join(self.root, rel, "pyvenv.cfg")))
+            directories[rel] = ignored
+        return ignored
+
+
+def find_python_files(root: str, exclude: Optional[Iterable[str]] = None,
+                      use_git: bool = True) -> List[str]:
+    """
+    Find the Python files in a workspace once; see WorkspaceScanner.
+
+    Args:
+        root: Workspace directory
+        exclude: Patterns in .gitignore syntax of paths never to yield;
+            defaults to DEFAULT_EXCLUDES
+        use_git: List files with `git ls-files` when the root is in a git repository
+    """
+    return WorkspaceScanner(root, exclude, use_git).files() 
\ No newline at end of file
@@ -3,23 +3,130 @@ Extension for automatic error tracking in Cursor IDE.
 """
 
 import sys
+import time
 import logging
-import traceback
+import threading
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Type
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Tuple, Type
 from pathlib import Path
+from types import TracebackType
 
-from .core import ErrorTracker, ErrorInfo
+from .core import ErrorTracker, ErrorInfo, ShardedLocks
+from .fingerprint import fingerprint
+from .store import ErrorStore
+from .policies import AdaptiveSampler, RateLimiter, RetentionPolicy, SamplingPolicy
+from .sketch import ErrorSketch
+from .utils import get_error_stats as get_error_stats_of
+
+if TYPE_CHECKING:
+    from .capture import GlobalCapture
+    from .collector import CollectorClient
+
+class HistoryEntry:
+    """
+    One (error type, line) aggregate in an ExtensionTracker's history.
+    
+    Slotted, with interned names and an epoch timestamp; the dict form is
+    only built when the history is read.
+    """
+    __slots__ = ('error_type', 'message', 'line', 'file', 'count', 'epoch',
+                 'function', 'function_line')
+    
+    def __init__(self, error_type: str, message: str, line: int, file: str,
+                 count: int = 1, epoch: float = 0.0, function: str = '',
+                 function_line: Optional[int] = None):
+        self.error_type = sys.intern(error_type)
+        self.message = message
+        self.line = line
+        self.file = sys.intern(file)
+        self.count = count
+        self.epoch = epoch
+        self.function = sys.intern(function)
+        # First line of the function when the error was last seen, if known
+        self.function_line = function_line
+    
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any], function: str = '') -> "HistoryEntry":
+        """Build an entry from its dict form."""
+        return cls(
+            entry['error_type'],
+            entry['message'],
+            entry['line'],
+            entry['file'],
+            entry['count'],
+            datetime.fromisoformat(entry['timestamp']).timestamp(),
+            entry.get('function', function),
+            entry.get('function_line')
+        )
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the entry in the error_history format."""
+        return {
+            'timestamp': datetime.fromtimestamp(self.epoch).isoformat(),
+            'error_type': self.error_type,
+            'message': self.message,
+            'line': self.line,
+            'file': self.file,
+            'count': self.count,
+            'function': self.function,
+            'function_line': self.function_line
+        }
 
 class ExtensionTracker(ErrorTracker):
     """Extended error tracker with Cursor-specific functionality."""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self,
+                 store: Optional[ErrorStore] = None,
+                 retention: Optional[RetentionPolicy] = None,
+                 sketch: Optional[ErrorSketch] = None,
+                 sampling: Optional[SamplingPolicy] = None):
+        super().__init__(None, retention)
         self.logger = logging.getLogger("error_learner.extension")
         self.setup_logging()
         self.setup_exception_hook()
-        self._error_history: Dict[str, List[Dict[str, Any]]] = {}
+        # error_key -> {(error_type, line): entry}, so lookups are O(1)
+        self._error_history: Dict[str, Dict[Tuple[str, int], HistoryEntry]] = {}
+        # (error_key, error_type) -> running total used for the threshold check
+        self._type_counts: Dict[Tuple[str, str], int] = {}
+        # (error_key, error_type) -> errors seen by other processes
+        self._remote_offsets: Dict[Tuple[str, str], int] = {}
+        # (error_key, error_type) -> entries, so dropping the last one of a type
+        # is O(1); only types with more than one entry, the rest have one
+        self._type_entries: Dict[Tuple[str, str], int] = {}
+        self._collector: Optional["CollectorClient"] = None
+        # file_path -> entries in insertion order, and file_path -> {line: the
+        # error type of each entry at the line}, for the analyzer; built on
+        # the first per-file query, so trackers nobody queries never pay for
+        # them. Functions of one file share these, so they are guarded per file
+        self._file_index: Optional[Dict[str, Dict[HistoryEntry, None]]] = None
+        self._line_index: Optional[Dict[str, Dict[int, Tuple[str, ...]]]] = None
+        self._file_locks = ShardedLocks()
+        # message -> the same message, so entries with equal messages share one string
+        self._messages: Dict[str, str] = {}
+        # Approximate mode: counts come from a fixed-size sketch instead
+        self._sketch = sketch
+        self._sampler: Optional[AdaptiveSampler] = None
+        self._suggest_limiter = RateLimiter(SamplingPolicy.suggest_interval)
+        self._global_capture: Optional["GlobalCapture"] = None
+        if sampling is not None:
+            self.set_sampling(sampling)
+        if store is not None:
+            # Loads in the background, so the history above must exist first
+            self.attach_store(store)
+    
+    def set_sampling(self, sampling: SamplingPolicy) -> None:
+        """
+        Sample repeated errors and rate-limit fix suggestions.
+        
+        Args:
+            sampling: How many occurrences to record exactly, and how often
+                to repeat a suggestion
+        """
+        self._sampler = (
+            AdaptiveSampler(sampling.exact_first, sampling.max_rate)
+            if sampling.exact_first is not None else None
+        )
+        self._suggest_limiter = RateLimiter(sampling.suggest_interval)
     
     def setup_logging(self):
         """Set up logging configuration."""
@@ -35,10 +142,13 @@ class ExtensionTracker(ErrorTracker):
     def setup_exception_hook(self):
         """Set up global exception hook to track all unhandled exceptions."""
         self.original_hook = sys.excepthook
+        if self.original_hook is _deferred_excepthook:
+            self.original_hook = _previous_excepthook
         
         def exception_hook(exc_type, exc_value, exc_traceback):
             """Custom exception hook that tracks errors before handling them."""
-            if exc_traceback:
+            if exc_traceback and not self._seen(exc_value):
+                self._mark_seen(exc_value)
                 # Get the actual error location
                 tb = exc_traceback
                 while tb.tb_next:
@@ -51,46 +161,164 @@ class ExtensionTracker(ErrorTracker):
                     str(exc_value), 
                     func_name, 
                     tb.tb_lineno,
-                    str(file_path)
+                    str(file_path),
+                    tb=exc_traceback,
+                    function_line=tb.tb_frame.f_code.co_firstlineno
                 )
             self.original_hook(exc_type, exc_value, exc_traceback)
         
         sys.excepthook = exception_hook
     
+    def enable_global_capture(self,
+                              include: Optional[List[str]] = None,
+                              exclude: Optional[List[str]] = None,
+                              modules: Optional[List[str]] = None) -> "GlobalCapture":
+        """
+        Track exceptions raised anywhere in the process, even if they are handled.
+        
+        Needs Python 3.12+. Older versions cannot see handled exceptions at
+        all: they only add uncaught exceptions in threads to what the
+        exception hook already tracks, and a warning says so. Combine with a
+        SamplingPolicy in servers that raise often. Several trackers can
+        capture at once; disabling one leaves the others running.
+        
+        Args:
+            include: Path prefixes to capture; everything if omitted
+            exclude: Path prefixes never to capture; defaults to the standard
+                library, installed packages and error_learner itself
+            modules: Module or package names to capture, added to include
+            
+        Returns:
+            The capture, for per-code-object enable() and disable()
+        """
+        from .capture import GlobalCapture
+        
+        self.disable_global_capture()
+        capture = GlobalCapture(self, include, exclude, modules)
+        if capture.start() == "hooks":
+            self.logger.warning(
+                "Global capture needs sys.monitoring (Python 3.12+); handled exceptions "
+                "are not seen, only uncaught ones"
+            )
+        self._global_capture = capture
+        return capture
+    
+    def disable_global_capture(self) -> None:
+        """Stop tracking exceptions process-wide."""
+        capture, self._global_capture = self._global_capture, None
+        if capture is not None:
+            capture.stop()
+    
     def _track_error(self, 
                     error_type: Type[Exception], 
                     error_msg: str, 
                     func_name: str, 
                     line_no: int,
-                    file_path: str) -> None:
-        """Track an error and provide suggestions if needed."""
-        error_key = f"{file_path}:{func_name}"
-        if error_key not in self._error_history:
-            self._error_history[error_key] = []
-        
-        error_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'error_type': error_type.__name__,
-            'message': str(error_msg),
-            'line': line_no,
-            'file': file_path,
-            'count': 1
-        }
+                    file_path: str,
+                    path: Optional[int] = None,
+                    tb: Optional[TracebackType] = None,
+                    function_line: Optional[int] = None) -> None:
+        """
+        Track an error and provide suggestions if needed.
         
-        # Check for similar errors and update count
-        for existing in self._error_history[error_key]:
-            if (existing['error_type'] == error_entry['error_type'] and 
-                existing['line'] == error_entry['line']):
-                existing['count'] += 1
-                existing['timestamp'] = error_entry['timestamp']
-                break
-        else:
-            self._error_history[error_key].append(error_entry)
+        Args:
+            path: Call path fingerprint, to group the error by call path
+            tb: Traceback to compute the fingerprint from, if `path` is not
+                given; only done if the error is recorded
+            function_line: First line of the function's definition, so the
+                error can be located again after the code around it moves
+        """
+        # Interned like the names it is made of, so the many dicts keyed by
+        # it share one string per function
+        error_key = sys.intern(f"{file_path}:{func_name}")
+        type_name = error_type.__name__
+        weight = 1
+        if self._sampler is not None:
+            # In a storm, most occurrences stop here; recorded ones carry
+            # the count of those skipped since
+            weight = self._sampler.offer((error_key, type_name, line_no))
+            if not weight:
+                return
+        now = time.time()
+        
+        if self._store is not None or self._collector is not None:
+            record = {
+                'key': error_key,
+                'error_type': type_name,
+                'message': str(error_msg),
+                'line': line_no,
+                'file': file_path,
+                'timestamp': datetime.fromtimestamp(now).isoformat(),
+                'count': weight,
+                'function_line': function_line
+            }
+            if self._store is not None:
+                self._store.append(record)
+            if self._collector is not None:
+                self._collector.append(record)
+        
+        if self._sketch is not None:
+            total_count = self._sketch.record(
+                file_path, func_name, line_no, type_name, str(error_msg), now, weight
+            )
+            self._suggest_fix(error_type, func_name, line_no, file_path, total_count, now)
+            return
+        count_key = (error_key, type_name)
+        
+        retention = self._retention
+        with self._locks.for_key(error_key):
+            entries = self._error_history.get(error_key)
+            if entries is None:
+                entries = self._error_history[error_key] = {}
+            
+            # Update the count of a similar error, or record a new one
+            entry_key = (type_name, line_no)
+            existing = entries.get(entry_key)
+            if existing is not None:
+                existing.count += weight
+                existing.epoch = now
+                if function_line is not None:
+                    existing.function_line = function_line
+                if retention is not None and retention.max_entries_per_key is not None:
+                    # Keep entries in least recently seen order
+                    del entries[entry_key]
+                    entries[entry_key] = existing
+            else:
+                entry = entries[entry_key] = HistoryEntry(
+                    type_name, self._shared_message(str(error_msg)), line_no, file_path,
+                    weight, now, func_name, function_line
+                )
+                self._index_entry(entry)
+                self._count_type_entry(count_key)
+                if retention is not None and retention.max_entries_per_key is not None:
+                    while len(entries) > retention.max_entries_per_key:
+                        self._drop_entry(error_key, entries, next(iter(entries)))
+            
+            if path is None and tb is not None:
+                path = fingerprint(tb)
+            if path is not None:
+                self._count_signature(error_key, type_name, path, line_no, weight)
+            
+            local_count = self._type_counts.get(count_key, 0) + weight
+            self._type_counts[count_key] = local_count
+            if retention is not None and retention.window_seconds is not None:
+                total_count = self._count_in_window(count_key, now, weight)
+            else:
+                total_count = local_count + self._remote_offsets.get(count_key, 0)
+        
+        if self._evictor is not None:
+            self._evict_keys(error_key)
         
+        self._suggest_fix(error_type, func_name, line_no, file_path, total_count, now, count_key)
+    
+    def _suggest_fix(self, error_type: Type[Exception], func_name: str, line_no: int,
+                     file_path: str, total_count: int, now: float,
+                     count_key: Optional[Tuple[str, str]] = None) -> None:
+        """Log a fix suggestion for a recurring error, at most once per interval."""
+        if count_key is None:
+            count_key = (f"{file_path}:{func_name}", error_type.__name__)
         # After 3 occurrences, suggest a fix
-        total_count = sum(e['count'] for e in self._error_history[error_key] 
-                         if e['error_type'] == error_type.__name__)
-        if total_count >= 3:
+        if total_count >= 3 and self._suggest_limiter.allow(count_key, now):
             suggestion = self._generate_fix_suggestion(error_type)
             if suggestion:
                 self.logger.info(
@@ -98,6 +326,166 @@ class ExtensionTracker(ErrorTracker):
                     f"Fix suggestion: {suggestion}"
                 )
     
+    def _shared_message(self, message: str) -> str:
+        """Get an equal message already held by an entry, to store it once."""
+        messages = self._messages
+        shared = messages.get(message)
+        if shared is None:
+            if len(messages) >= 4096:
+                # Bounded, since entries may be evicted; sharing starts over
+                messages.clear()
+            shared = messages.setdefault(message, message)
+        return shared
+    
+    def _file_indexes(self) -> Tuple[Dict[str, Dict[HistoryEntry, None]],
+                                     Dict[str, Dict[int, Tuple[str, ...]]]]:
+        """Get the per-file indexes, building them on first use."""
+        if self._file_index is None:
+            # No entry can be added or dropped while every key is held
+            with self._locks.all():
+                if self._file_index is None:
+                    self._line_index = {}
+                    self._file_index = {}
+                    for entries in self._error_history.values():
+                        for entry in entries.values():
+                            self._index_entry_locked(entry)
+        return self._file_index, self._line_index
+    
+    def _index_entry(self, entry: HistoryEntry) -> None:
+        """Add a new entry to the per-file indexes, once they are built."""
+        if self._file_index is None:
+            return
+        with self._file_locks.for_key(entry.file):
+            self._index_entry_locked(entry)
+    
+    def _index_entry_locked(self, entry: HistoryEntry) -> None:
+        file_entries = self._file_index.get(entry.file)
+        if file_entries is None:
+            file_entries = self._file_index[entry.file] = {}
+        file_entries[entry] = None
+        # Lines rarely hold more than one entry; tuples are much smaller than
+        # dicts, and repeating a type counts the entries that have it
+        lines = self._line_index.setdefault(entry.file, {})
+        lines[entry.line] = lines.get(entry.line, ()) + (entry.error_type,)
+    
+    def _unindex_entry(self, entry: HistoryEntry) -> None:
+        """Remove an entry from the per-file indexes, once they are built."""
+        if self._file_index is None:
+            return
+        with self._file_locks.for_key(entry.file):
+            self._unindex_entry_locked(entry)
+    
+    def _unindex_entry_locked(self, entry: HistoryEntry) -> None:
+        file_entries = self._file_index.get(entry.file)
+        if file_entries is None or entry not in file_entries:
+            return
+        del file_entries[entry]
+        lines = self._line_index[entry.file]
+        types = lines[entry.line]
+        if len(types) > 1:
+            i = types.index(entry.error_type)
+            lines[entry.line] = types[:i] + types[i + 1:]
+        else:
+            del lines[entry.line]
+        if not file_entries:
+            del self._file_index[entry.file]
+            del self._line_index[entry.file]
+    
+    def _count_type_entry(self, count_key: Tuple[str, str]) -> None:
+        """Count a new entry of a type, before the type's occurrences are counted."""
+        if count_key in self._type_counts:
+            self._type_entries[count_key] = self._type_entries.get(count_key, 1) + 1
+    
+    def _drop_entry(self, error_key: str, entries: Dict[Tuple[str, int], HistoryEntry],
+                    entry_key: Tuple[str, int]) -> None:
+        """Forget one entry; its type's counters go with the last entry of that type."""
+        entry = entries.pop(entry_key)
+        self._unindex_entry(entry)
+        if self._sampler is not None:
+            self._sampler.forget((error_key, entry.error_type, entry.line))
+        count_key = (error_key, entry.error_type)
+        remaining = self._type_entries.pop(count_key, 1) - 1
+        if remaining > 1:
+            self._type_entries[count_key] = remaining
+        elif not remaining:
+            self._type_counts.pop(count_key, None)
+            self._windows.pop(count_key, None)
+            self._remote_offsets.pop(count_key, None)
+            self._suggest_limiter.forget(count_key)
+    
+    def _drop_key(self, key: str) -> None:
+        """Forget everything recorded for a function."""
+        self._signatures.pop(key, None)
+        entries = self._error_history.pop(key, None)
+        if entries is None:
+            return
+        for entry_key in list(entries):
+            self._drop_entry(key, entries, entry_key)
+    
+    def get_file_errors(self, file_path: str) -> List[Dict[str, Any]]:
+        """
+        Get the errors recorded in a file, across all of its functions.
+        
+        Args:
+            file_path: Path of the file
+            
+        Returns:
+            Copies of the file's history entries; always empty in sketch
+            mode, which keeps no per-file history
+        """
+        self._ensure_loaded()
+        file_index, _ = self._file_indexes()
+        with self._file_locks.for_key(file_path):
+            entries = list(file_index.get(file_path, ()))
+        return [e.as_dict() for e in entries]
+    
+    def has_error(self, file_path: str, line_no: int, error_type: str) -> bool:
+        """Check whether an error type was recorded at a line of a file; never in sketch mode."""
+        self._ensure_loaded()
+        _, line_index = self._file_indexes()
+        return error_type in line_index.get(file_path, {}).get(line_no, ())
+    
+    def connect_collector(self, address: Any, authkey: bytes, flush_interval: float = 1.0) -> None:
+        """
+        Share error counts with other processes through an ErrorCollector.
+        
+        Errors are buffered locally and sent in batches, so the recurrence
+        threshold counts errors from every connected process.
+        
+        Args:
+            address: Address of the collector
+            authkey: The collector's authkey
+            flush_interval: Seconds between batches
+        """
+        from .collector import CollectorClient
+        
+        self._collector = CollectorClient(
+            address,
+            authkey,
+            on_counts=self._apply_global_counts,
+            flush_interval=flush_interval
+        )
+    
+    def _apply_global_counts(self, counts: Dict[Tuple[str, str], int]) -> None:
+        """Update what other processes contributed to each count."""
+        for count_key, global_count in counts.items():
+            with self._locks.for_key(count_key[0]):
+                self._remote_offsets[count_key] = (
+                    global_count - self._type_counts.get(count_key, 0)
+                )
+    
+    def _record(self, error_info: ErrorInfo, file_path: str) -> None:
+        """Record an error from the track decorator."""
+        self._track_error(
+            error_info.error_type,
+            error_info.error_message,
+            error_info.function_name,
+            error_info.line_number,
+            file_path,
+            path=error_info.fingerprint,
+            function_line=error_info.function_line
+        )
+    
     def _generate_fix_suggestion(self, error_type: Type[Exception]) -> str:
         """Generate fix suggestions based on error type."""
         suggestions = {
@@ -114,21 +502,114 @@ class ExtensionTracker(ErrorTracker):
         }
         return suggestions.get(error_type.__name__, "Review the error context and add appropriate validation")
     
+    def _load_history(self, history: Dict[str, Dict[Tuple[str, int], Dict[str, Any]]]) -> None:
+        """Merge persisted entries into the in-memory history."""
+        for error_key, stored in history.items():
+            error_key = sys.intern(error_key)
+            entries = self._error_history.setdefault(error_key, {})
+            for entry_key, stored_entry in stored.items():
+                # Keys are "<file>:<function>"
+                entry = HistoryEntry.from_dict(stored_entry, error_key[len(stored_entry['file']) + 1:])
+                existing = entries.get(entry_key)
+                if existing is not None:
+                    existing.count += entry.count
+                else:
+                    entry.message = self._shared_message(entry.message)
+                    entries[entry_key] = entry
+                    self._index_entry(entry)
+                count_key = (error_key, entry.error_type)
+                if existing is None:
+                    self._count_type_entry(count_key)
+                self._type_counts[count_key] = (
+                    self._type_counts.get(count_key, 0) + entry.count
+                )
+    
     @property
     def error_history(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Get the error history."""
-        return self._error_history.copy()
+        """Get the error history; in approximate mode, the most frequent errors."""
+        if self._sketch is not None:
+            return self._sketch.error_history()
+        self._ensure_loaded()
+        with self._locks.all():
+            return {key: [e.as_dict() for e in entries.values()]
+                    for key, entries in self._error_history.items()}
+    
+    @property
+    def sketch(self) -> Optional[ErrorSketch]:
+        """The sketch counting errors in approximate mode, or None."""
+        return self._sketch
+    
+    def get_error_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the errors tracked by this tracker.
+        
+        Returns:
+            Total errors and errors per type, in the utils.get_error_stats
+            format; in sketch mode, with the most frequent errors as
+            'top_errors'
+        """
+        if self._sketch is not None:
+            return self._sketch.stats()
+        return get_error_stats_of(self.error_history)
+
+_tracker: Optional[ExtensionTracker] = None
+_tracker_lock = threading.Lock()
+
+def get_tracker() -> ExtensionTracker:
+    """Get the global tracker, creating it on first use."""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = ExtensionTracker()
+                globals()["tracker"] = _tracker
+    return _tracker
+
+def __getattr__(name: str) -> Any:
+    if name == "tracker":
+        return get_tracker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_previous_excepthook = sys.excepthook
+
+def _deferred_excepthook(exc_type, exc_value, exc_traceback):
+    """Create the global tracker on the first unhandled exception and let it track it."""
+    get_tracker()
+    hook = sys.excepthook
+    if hook is _deferred_excepthook:
+        hook = _previous_excepthook
+    hook(exc_type, exc_value, exc_traceback)
+
+# Unhandled exceptions are tracked from import on, without building the
+# tracker until one happens
+sys.excepthook = _deferred_excepthook
 
-# Create global instance
-tracker = ExtensionTracker()
+__all__ = ["ExtensionTracker", "get_tracker", "tracker"]
 
-__all__ = ["ExtensionTracker", "tracker"]
+def _collector_history(tracker: ExtensionTracker) -> Optional[Dict[str, List[dict]]]:
+    """Get the history of every process, or None if no collector is connected or reachable."""
+    if tracker._collector is None:
+        return None
+    try:
+        return tracker._collector.history()
+    except (OSError, EOFError) as e:
+        tracker.logger.warning(f"Collector unreachable, using this process's errors only: {e}")
+        return None
 
 def get_error_stats() -> Dict[str, List[dict]]:
-    """Get all tracked errors."""
+    """Get all tracked errors, from every process if a collector is connected."""
+    tracker = get_tracker()
+    history = _collector_history(tracker)
+    if history is not None:
+        return history
     return tracker.error_history.copy()
 
 def get_error_count(file_path: str, function_name: str) -> int:
     """Get error count for a specific function in a file."""
     error_key = f"{file_path}:{function_name}"
-    return len(tracker.error_history.get(error_key, [])) 
\ No newline at end of file
+    tracker = get_tracker()
+    history = _collector_history(tracker)
+    if history is not None:
+        return len(history.get(error_key, []))
+    tracker._ensure_loaded()
+    return len(tracker._error_history.get(error_key, {})) 
\ No newline at end of file
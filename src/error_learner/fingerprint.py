@@ -0,0 +1,147 @@
+"""
+Cheap, stable fingerprints of the call path an error was raised through.
+
+A fingerprint mixes, for every frame from the outermost caller to the
+frame the error was raised in, a hash of the frame's code location and
+the frame's current line. The location hash of a code object (file,
+qualified name, first line) is computed once and memoized while the code
+object lives, so fingerprinting a stack is integer arithmetic per frame:
+no string formatting, no traceback.extract_tb, no source lookups.
+
+Collecting a call path (call_path) is separate from hashing it
+(hash_path), so a background recorder can take the path on the raising
+thread, without keeping any frame alive, and hash it later.
+
+Fingerprints are stable across processes and runs of the same code, so
+errors can be grouped by full call path, and a storm of identical errors
+collapses into a single bucket.
+"""
+
+import weakref
+from types import CodeType, FrameType, TracebackType
+from typing import Any, Dict, List, Optional, Tuple
+
+# FNV-1a parameters, 64 bits
+_OFFSET = 0xCBF29CE484222325
+_PRIME = 0x100000001B3
+_MASK = (1 << 64) - 1
+
+# Caller frames mixed in above the traceback; bounds the cost in deep recursion
+MAX_CALLERS = 64
+
+# (code, line) of every frame on a call path, outermost first
+CallPath = List[Tuple[CodeType, int]]
+
+# id(code) -> (weak reference to the code, location hash). Entries go when
+# their code object dies, so exec- and eval-generated code is not kept
+# alive, and an id is never reused while its entry exists
+_locations: Dict[int, Tuple["weakref.ref[CodeType]", int]] = {}
+
+
+def location_hash(code: CodeType) -> int:
+    """Get the memoized hash of a code object's location."""
+    code_id = id(code)
+    entry = _locations.get(code_id)
+    if entry is not None and entry[0]() is code:
+        return entry[1]
+    # Imported on first use; hashlib is slow to import
+    import hashlib
+    name = getattr(code, "co_qualname", code.co_name)
+    key = f"{code.co_filename}\0{name}\0{code.co_firstlineno}".encode()
+    value = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+    _locations[code_id] = (weakref.ref(code, lambda _: _locations.pop(code_id, None)), value)
+    return value
+
+
+def call_path(tb: TracebackType, callers: bool = True) -> CallPath:
+    """
+    Collect the call path of an error, to hash with hash_path().
+
+    Only code objects and line numbers are kept, not frames, so the path
+    does not keep the frames' locals alive.
+
+    Args:
+        tb: The error's traceback
+        callers: Also include the callers of the traceback's first frame,
+            up to MAX_CALLERS, so errors caught at the same place but
+            reached through different paths are told apart
+    """
+    path: CallPath = []
+    if callers:
+        frame: Optional[FrameType] = tb.tb_frame.f_back
+        while frame is not None and len(path) < MAX_CALLERS:
+            path.append((frame.f_code, frame.f_lineno))
+            frame = frame.f_back
+        path.reverse()
+    while tb is not None:
+        path.append((tb.tb_frame.f_code, tb.tb_lineno))
+        tb = tb.tb_next
+    return path
+
+
+def hash_path(path: CallPath) -> int:
+    """Get the 64-bit fingerprint of a call path."""
+    h = _OFFSET
+    for code, line in path:
+        h = (((h ^ location_hash(code)) * _PRIME) ^ line) * _PRIME & _MASK
+    return h
+
+
+def fingerprint(tb: TracebackType, callers: bool = True) -> int:
+    """
+    Fingerprint the call path of an error.
+
+    Args:
+        tb: The error's traceback
+        callers: See call_path()
+
+    Returns:
+        A 64-bit fingerprint
+    """
+    return hash_path(call_path(tb, callers))
+
+
+def innermost(tb: TracebackType) -> TracebackType:
+    """Get the last traceback entry: the frame the error was raised in."""
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    return tb
+
+
+def entry_for(tb: TracebackType, code: Optional[CodeType]) -> TracebackType:
+    """
+    Get the traceback entry for a code object's frame.
+
+    Returns the innermost entry running `code`, so a tracked function's
+    error is located in the function rather than in a wrapper around it,
+    or the innermost entry overall if `code` is not on the traceback.
+    """
+    found = None
+    last = tb
+    while tb is not None:
+        if tb.tb_frame.f_code is code:
+            found = tb
+        last = tb
+        tb = tb.tb_next
+    return found if found is not None else last
+
+
+class Signature:
+    """Occurrences of one error type reached through one call path."""
+
+    __slots__ = ("error_type", "fingerprint", "line", "count")
+
+    def __init__(self, error_type: str, fingerprint: int, line: int, count: int = 0):
+        self.error_type = error_type
+        self.fingerprint = fingerprint
+        self.line = line
+        self.count = count
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the signature as a dict."""
+        return {
+            "error_type": self.error_type,
+            "fingerprint": f"{self.fingerprint:016x}",
+            "line": self.line,
+            "count": self.count,
+        }
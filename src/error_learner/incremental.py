@@ -0,0 +1,218 @@
+"""
+Incremental re-analysis of edited source.
+
+A document is split into blocks, one per top-level statement (a function
+or class with its decorators, an import, an assignment...), each running
+up to the next one so comments and blank lines belong to the block above.
+Each block's issues and functions are kept with lines relative to the
+block's start, under a fingerprint of the block's text.
+
+On an edit, the lines shared with the previous version at the start and
+at the end are skipped, and only the blocks touching the changed lines
+are re-parsed and visited by the rules. Blocks above the edit keep their
+issues; blocks below keep them too, shifted by the number of lines added
+or removed. So the cost of re-analyzing an edit to one function is
+proportional to that function, not to the file.
+
+If the changed region does not parse on its own (an edit that opens a
+string or bracket spanning later blocks, say), the whole document is
+parsed, and only blocks whose fingerprint is new are visited. A change to
+the file's error history re-visits every block, since rules may depend
+on it.
+"""
+
+import ast
+from typing import Any, Dict, List, Optional
+
+from .correlation import FunctionSpan, first_line, function_spans
+from .rules import RuleContext, RuleEngine
+
+# Lines compared at once when looking for the edited region
+_CHUNK = 256
+
+
+class Block:
+    """A top-level statement's lines, its issues and its functions."""
+
+    __slots__ = ("start", "end", "fingerprint", "issues", "functions", "_absolute")
+
+    def __init__(self, start: int, end: int, fingerprint: int, issues: List[Dict[str, Any]],
+                 functions: List[FunctionSpan]):
+        # 1-based, inclusive
+        self.start = start
+        self.end = end
+        self.fingerprint = fingerprint
+        # Issues with 'line' relative to start
+        self.issues = issues
+        # Functions defined in the block, with lines relative to start
+        self.functions = functions
+        self._absolute: Optional[List[Dict[str, Any]]] = None
+
+    def absolute(self) -> List[Dict[str, Any]]:
+        """Get the block's issues with absolute line numbers, built once per position."""
+        if self._absolute is None:
+            start = self.start
+            absolute = []
+            for issue in self.issues:
+                issue = dict(issue)
+                issue["line"] += start
+                absolute.append(issue)
+            self._absolute = absolute
+        return self._absolute
+
+
+def _common_prefix(a: List[str], b: List[str]) -> int:
+    limit = min(len(a), len(b))
+    i = 0
+    # Compare slices first; list equality runs in C
+    while i + _CHUNK <= limit and a[i:i + _CHUNK] == b[i:i + _CHUNK]:
+        i += _CHUNK
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _common_suffix(a: List[str], b: List[str], limit: int) -> int:
+    n, m = len(a), len(b)
+    i = 0
+    while i + _CHUNK <= limit and a[n - i - _CHUNK:n - i] == b[m - i - _CHUNK:m - i]:
+        i += _CHUNK
+    while i < limit and a[n - i - 1] == b[m - i - 1]:
+        i += 1
+    return i
+
+
+class DocumentAnalysis:
+    """Analysis state of one document, updated edit by edit."""
+
+    def __init__(self, engine: RuleEngine):
+        self.engine = engine
+        self.lines: List[str] = []
+        self.blocks: List[Block] = []
+        self.errors_digest: Optional[Any] = None
+        # Number of blocks visited by the rules in the last update
+        self.visited = 0
+
+    def update(self, source: str, context: RuleContext, errors_digest: Any = None) -> List[Dict[str, Any]]:
+        """
+        Analyze a new version of the document.
+
+        Args:
+            source: The document's text
+            context: The file being analyzed
+            errors_digest: Digest of the file's error history; a change
+                re-visits every block
+
+        Returns:
+            Issues, as PatternAnalyzer.analyze_source returns them
+
+        Raises:
+            SyntaxError: If the source does not parse
+        """
+        lines = source.split("\n")
+        self.visited = 0
+        if not self.blocks or errors_digest != self.errors_digest:
+            known: Dict[int, Block] = {}
+            blocks = self._parse(lines, 1, len(lines), known, context)
+        else:
+            blocks = self._update(lines, context)
+        self.lines = lines
+        self.blocks = blocks
+        self.errors_digest = errors_digest
+        return self.issues()
+
+    def issues(self) -> List[Dict[str, Any]]:
+        """
+        Get the current issues with absolute line numbers.
+
+        Issue dicts of blocks that did not move are shared between calls
+        and must not be modified.
+        """
+        issues: List[Dict[str, Any]] = []
+        for block in self.blocks:
+            issues.extend(block.absolute())
+        return issues
+
+    def functions(self) -> List[FunctionSpan]:
+        """Get the functions of the current version, as function_spans() returns them."""
+        spans: List[FunctionSpan] = []
+        for block in self.blocks:
+            start = block.start
+            spans.extend((name, first + start, last + start) for name, first, last in block.functions)
+        return spans
+
+    def _update(self, lines: List[str], context: RuleContext) -> List[Block]:
+        old = self.lines
+        if lines == old:
+            return self.blocks
+        prefix = _common_prefix(old, lines)
+        suffix = _common_suffix(old, lines, min(len(old), len(lines)) - prefix)
+        delta = len(lines) - len(old)
+
+        # Old lines touching the change, widened by one line on each side so
+        # text inserted at a block boundary is parsed with its neighbours
+        first_line = max(prefix, 1)
+        last_line = min(len(old) - suffix + 1, len(old))
+        blocks = self.blocks
+        first = 0
+        while first < len(blocks) - 1 and blocks[first].end < first_line:
+            first += 1
+        last = first
+        while last < len(blocks) - 1 and blocks[last].end < last_line:
+            last += 1
+
+        start = blocks[first].start
+        end = blocks[last].end + delta
+        known = {block.fingerprint: block for block in blocks[first:last + 1]}
+        try:
+            region = self._parse(lines, start, end, known, context)
+        except SyntaxError:
+            # The edit reaches beyond its blocks; reuse what still matches
+            known = {block.fingerprint: block for block in blocks}
+            return self._parse(lines, 1, len(lines), known, context)
+
+        after = blocks[last + 1:]
+        if delta:
+            after = [Block(b.start + delta, b.end + delta, b.fingerprint, b.issues, b.functions)
+                     for b in after]
+        return blocks[:first] + region + after
+
+    def _parse(self, lines: List[str], start: int, end: int,
+               known: Dict[int, Block], context: RuleContext) -> List[Block]:
+        """Parse lines start..end (1-based, inclusive) into blocks, visiting new ones."""
+        tree = ast.parse("\n".join(lines[start - 1:end]))
+        offset = start - 1
+        # Statements of each block; several if they share a line (a = 1; b = 2)
+        starts: List[int] = []
+        groups: List[List[ast.stmt]] = []
+        for node in tree.body:
+            node_start = first_line(node) + offset
+            if starts and starts[-1] == node_start:
+                groups[-1].append(node)
+            else:
+                starts.append(node_start)
+                groups.append([node])
+        if not starts or starts[0] != start:
+            # Comments or blank lines before the first statement
+            starts.insert(0, start)
+            groups.insert(0, [])
+
+        blocks = []
+        for i, nodes in enumerate(groups):
+            block_start = starts[i]
+            block_end = starts[i + 1] - 1 if i + 1 < len(starts) else end
+            fingerprint = hash(tuple(lines[block_start - 1:block_end]))
+            block = known.get(fingerprint)
+            if block is not None:
+                blocks.append(Block(block_start, block_end, fingerprint, block.issues, block.functions))
+                continue
+            issues = []
+            if nodes:
+                self.visited += 1
+            for node in nodes:
+                for issue in self.engine.run(node, context):
+                    issue["line"] += offset - block_start
+                    issues.append(issue)
+            functions = function_spans(nodes, offset - block_start)
+            blocks.append(Block(block_start, block_end, fingerprint, issues, functions))
+        return blocks 
\ No newline at end of file
@@ -0,0 +1,438 @@
+"""
+Query index over an on-disk error store.
+
+The index is an SQLite database next to the store's snapshot, with one
+row per (function, error type, line) and its counts per hour and per day.
+It remembers how far into the log it has read, so bringing it up to date
+reads only records appended since the last query, and queries are answered
+from indexed tables: their cost depends on how many distinct errors match,
+not on how long the history is. Time ranges are counted from whole days
+plus the hours at either edge, to the hour.
+
+The store keeps compacted log segments until the index has read them, so
+the index goes on reading the log across a compaction. If segments it had
+not read are gone, it is rebuilt from the snapshot, where each error's
+count is attributed to the hour it was last seen.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .store import SEGMENT_PREFIX, SEGMENT_SUFFIX, SNAPSHOT_NAME, default_store_path
+
+INDEX_NAME = "index.sqlite3"
+INDEX_VERSION = 2
+
+HOUR = 3600
+
+# (key, error_type, line)
+EntryKey = Tuple[str, str, int]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS errors (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    file TEXT NOT NULL,
+    function TEXT NOT NULL,
+    error_type TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    first REAL NOT NULL,
+    last REAL NOT NULL,
+    function_line INTEGER,
+    UNIQUE (key, error_type, line)
+);
+CREATE INDEX IF NOT EXISTS errors_count ON errors (count);
+CREATE INDEX IF NOT EXISTS errors_file ON errors (file);
+CREATE INDEX IF NOT EXISTS errors_function ON errors (function);
+CREATE INDEX IF NOT EXISTS errors_type ON errors (error_type);
+CREATE TABLE IF NOT EXISTS hours (
+    hour INTEGER NOT NULL, error_id INTEGER NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (hour, error_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS days (
+    day INTEGER NOT NULL, error_id INTEGER NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (day, error_id)
+) WITHOUT ROWID;
+"""
+
+
+class _Batch:
+    """Records aggregated in memory before they are written to the index."""
+
+    def __init__(self):
+        # entry key -> [file, message, count, first, last, function_line]
+        self.entries: Dict[EntryKey, List[Any]] = {}
+        # (entry key, hour) -> count
+        self.hours: Dict[Tuple[EntryKey, int], int] = {}
+        self._last_timestamp: Optional[str] = None
+        self._last_epoch = 0.0
+
+    def add(self, record: Dict[str, Any]) -> None:
+        timestamp = record["timestamp"]
+        if timestamp != self._last_timestamp:
+            self._last_epoch = datetime.fromisoformat(timestamp).timestamp()
+            self._last_timestamp = timestamp
+        epoch = self._last_epoch
+        count = record["count"]
+        entry_key = (record["key"], record["error_type"], record["line"])
+        entry = self.entries.get(entry_key)
+        function_line = record.get("function_line")
+        if entry is None:
+            self.entries[entry_key] = [record["file"], record["message"], count, epoch, epoch,
+                                       function_line]
+        else:
+            entry[2] += count
+            entry[3] = min(entry[3], epoch)
+            entry[4] = max(entry[4], epoch)
+            if function_line is not None:
+                entry[5] = function_line
+        hour_key = (entry_key, int(epoch // HOUR))
+        self.hours[hour_key] = self.hours.get(hour_key, 0) + count
+
+
+class ErrorIndex:
+    """Indexed, incrementally updated view of an error store for queries."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open the index of a store.
+
+        Args:
+            path: Directory of the store; defaults to the default store path
+        """
+        self.path = Path(path) if path is not None else default_store_path()
+        self.logger = logging.getLogger("error_learner.index")
+        self._conn: Optional[sqlite3.Connection] = None
+        # Files with errors added by the last refresh
+        self.changed_files: Set[str] = set()
+
+    def refresh(self) -> "ErrorIndex":
+        """Bring the index up to date with the store."""
+        self.changed_files = set()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            snapshot = self._snapshot_stat()
+            if self._get("snapshot") != snapshot:
+                if self._segments_kept():
+                    # Compacted, but what the index has not read is still there
+                    self._set("snapshot", snapshot)
+                else:
+                    self._rebuild()
+            self._read_segments()
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return self
+
+    def query(self,
+              file: Optional[str] = None,
+              function: Optional[str] = None,
+              error_type: Optional[str] = None,
+              since: Optional[float] = None,
+              until: Optional[float] = None,
+              top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Find errors, most frequent first.
+
+        Args:
+            file: File path, path suffix or glob pattern
+            function: Function name
+            error_type: Error type name
+            since: Count only errors at or after this epoch time
+            until: Count only errors before this epoch time
+            top: Maximum number of errors to return
+
+        Returns:
+            Dicts with file, function, line, error_type, message, count,
+            first_seen and last_seen; counts cover the time range, to the
+            hour
+        """
+        where, params = self._filters(file, function, error_type)
+        limit = ""
+        if top is not None:
+            limit = " LIMIT ?"
+            params.append(top)
+
+        if since is None and until is None:
+            sql = (f"SELECT file, function, line, error_type, message, count, first, last "
+                   f"FROM errors e{where} ORDER BY count DESC{limit}")
+            rows = self._connect().execute(sql, params).fetchall()
+        else:
+            ranged, range_params = self._range(since, until)
+            sql = (f"SELECT file, function, line, error_type, message, r.total, first, last "
+                   f"FROM ({ranged}) r JOIN errors e ON e.id = r.error_id{where} "
+                   f"ORDER BY r.total DESC{limit}")
+            rows = self._connect().execute(sql, range_params + params).fetchall()
+
+        return [{
+            "file": row[0],
+            "function": row[1],
+            "line": row[2],
+            "error_type": row[3],
+            "message": row[4],
+            "count": row[5],
+            "first_seen": datetime.fromtimestamp(row[6]).isoformat(),
+            "last_seen": datetime.fromtimestamp(row[7]).isoformat(),
+        } for row in rows]
+
+    def stats(self, top: Optional[int] = None, **filters: Any) -> Dict[str, Any]:
+        """
+        Get statistics in the utils.get_error_stats format.
+
+        Args:
+            top: Maximum number of errors in 'top_errors'
+            **filters: Any of query()'s other arguments
+
+        Returns:
+            Dictionary with total_errors, error_types and top_errors
+        """
+        where, params = self._filters(
+            filters.get("file"), filters.get("function"), filters.get("error_type")
+        )
+        if filters.get("since") is None and filters.get("until") is None:
+            sql = f"SELECT error_type, SUM(count) FROM errors e{where} GROUP BY error_type"
+            rows = self._connect().execute(sql, params).fetchall()
+        else:
+            ranged, range_params = self._range(filters.get("since"), filters.get("until"))
+            sql = (f"SELECT error_type, SUM(r.total) FROM ({ranged}) r "
+                   f"JOIN errors e ON e.id = r.error_id{where} GROUP BY error_type")
+            rows = self._connect().execute(sql, range_params + params).fetchall()
+
+        error_types = {error_type: count for error_type, count in rows}
+        return {
+            "total_errors": sum(error_types.values()),
+            "error_types": error_types,
+            "top_errors": self.query(top=top, **filters),
+        }
+
+    def file_errors(self, file_path: str) -> List[Dict[str, Any]]:
+        """
+        Get the errors recorded in a file, in the tracker's history format.
+
+        Args:
+            file_path: Path of the file
+
+        Returns:
+            Entries with timestamp (last seen), error_type, message, line,
+            file, count, function and function_line
+        """
+        rows = self._connect().execute(
+            "SELECT last, error_type, message, line, file, count, function, function_line "
+            "FROM errors WHERE file = ?",
+            (file_path,)
+        ).fetchall()
+        return [{
+            "timestamp": datetime.fromtimestamp(row[0]).isoformat(),
+            "error_type": row[1],
+            "message": row[2],
+            "line": row[3],
+            "file": row[4],
+            "count": row[5],
+            "function": row[6],
+            "function_line": row[7],
+        } for row in rows]
+
+    def mark_compacted(self, segment: int) -> None:
+        """
+        Note that the store folded segments up to `segment` into a new snapshot.
+
+        The index must have read those segments first.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._get("segment") <= segment:
+                self._set("segment", segment + 1)
+                self._set("offset", 0)
+            self._set("snapshot", self._snapshot_stat())
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self) -> None:
+        """Close the database."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path / INDEX_NAME), timeout=30.0,
+                                   isolation_level=None, check_same_thread=False)
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            if self._get("version") != INDEX_VERSION:
+                # Never built, or built by another version: recreated, and
+                # rebuilt on refresh
+                conn.executescript("DROP TABLE errors; DROP TABLE hours; DROP TABLE days;" + _SCHEMA)
+                self._set("version", INDEX_VERSION)
+                self._set("snapshot", None)
+        return self._conn
+
+    def _get(self, name: str) -> Any:
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def _set(self, name: str, value: Any) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, json.dumps(value)))
+
+    def _snapshot_stat(self) -> List[int]:
+        try:
+            st = os.stat(self.path / SNAPSHOT_NAME)
+        except FileNotFoundError:
+            # Unlike the None of an index never built
+            return []
+        return [st.st_mtime_ns, st.st_size]
+
+    @staticmethod
+    def _filters(file: Optional[str], function: Optional[str],
+                 error_type: Optional[str]) -> Tuple[str, List[Any]]:
+        clauses = []
+        params: List[Any] = []
+        if file is not None:
+            if any(c in file for c in "*?["):
+                clauses.append("e.file GLOB ?")
+                params.append(file)
+            else:
+                # The path itself, or a suffix of it starting at a separator
+                clauses.append("(e.file = ? OR substr(e.file, -length(?) - 1) IN (?, ?))")
+                params.extend([file, file, "/" + file, "\\" + file])
+        if function is not None:
+            clauses.append("e.function = ?")
+            params.append(function)
+        if error_type is not None:
+            clauses.append("e.error_type = ?")
+            params.append(error_type)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    @staticmethod
+    def _range(since: Optional[float], until: Optional[float]) -> Tuple[str, List[Any]]:
+        """Build a query of (error_id, total) over a time range, to the hour."""
+        low = int(since // HOUR) if since is not None else -(1 << 40)
+        high = int(-(-until // HOUR)) if until is not None else 1 << 40
+        # Whole days inside the range come from the day rollup
+        first_day = -(-low // 24)
+        last_day = high // 24
+        if first_day >= last_day:
+            parts = ["SELECT error_id, count FROM hours WHERE hour >= ? AND hour < ?"]
+            params = [low, high]
+        else:
+            parts = [
+                "SELECT error_id, count FROM days WHERE day >= ? AND day < ?",
+                "SELECT error_id, count FROM hours WHERE hour >= ? AND hour < ?",
+                "SELECT error_id, count FROM hours WHERE hour >= ? AND hour < ?",
+            ]
+            params = [first_day, last_day, low, first_day * 24, last_day * 24, high]
+        sql = ("SELECT error_id, SUM(count) AS total FROM ("
+               + " UNION ALL ".join(parts) + ") GROUP BY error_id")
+        return sql, params
+
+    def _segments_kept(self) -> bool:
+        """Whether the segment the index stopped in is still on disk."""
+        if self._get("snapshot") is None:
+            return False
+        segment = self._get("segment")
+        return (self._get("offset") == 0
+                or (self.path / f"{SEGMENT_PREFIX}{segment:06d}{SEGMENT_SUFFIX}").exists())
+
+    def _rebuild(self) -> None:
+        for table in ("errors", "hours", "days"):
+            self._conn.execute(f"DELETE FROM {table}")
+        segment = 0
+        if (self.path / SNAPSHOT_NAME).exists():
+            with open(self.path / SNAPSHOT_NAME, "r") as f:
+                data = json.load(f)
+            batch = _Batch()
+            for key, entries in data.get("history", {}).items():
+                for entry in entries:
+                    batch.add(dict(entry, key=key))
+            self._write(batch)
+            segment = data.get("segment", 0) + 1
+        self._set("segment", segment)
+        self._set("offset", 0)
+        self._set("snapshot", self._snapshot_stat())
+
+    def _read_segments(self) -> None:
+        start = self._get("segment")
+        offset = self._get("offset")
+        segments = []
+        for path in self.path.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"):
+            try:
+                segment = int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            if segment >= start:
+                segments.append(segment)
+
+        for segment in sorted(segments):
+            if segment != start:
+                offset = 0
+            with open(self.path / f"{SEGMENT_PREFIX}{segment:06d}{SEGMENT_SUFFIX}", "rb") as f:
+                f.seek(offset)
+                data = f.read()
+            # Stop at the last complete line; the rest may still be being written
+            end = data.rfind(b"\n") + 1
+            batch = _Batch()
+            for line in data[:end].splitlines():
+                try:
+                    batch.add(json.loads(line))
+                except (ValueError, KeyError):
+                    # A torn write at the end of a segment
+                    continue
+            self._write(batch)
+            self._set("segment", segment)
+            self._set("offset", offset + end)
+
+    def _write(self, batch: _Batch) -> None:
+        if not batch.entries:
+            return
+        conn = self._conn
+        self.changed_files.update(entry[0] for entry in batch.entries.values())
+        conn.executemany(
+            "INSERT INTO errors (key, file, function, error_type, line, message, count, first, last, "
+            "function_line) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (key, error_type, line) DO UPDATE SET "
+            "count = count + excluded.count, "
+            "first = min(first, excluded.first), last = max(last, excluded.last), "
+            "function_line = coalesce(excluded.function_line, function_line)",
+            [(key, file, key.rsplit(":", 1)[-1], error_type, line, message, count, first, last,
+              function_line)
+             for (key, error_type, line), (file, message, count, first, last, function_line)
+             in batch.entries.items()]
+        )
+        ids = {
+            entry_key: conn.execute(
+                "SELECT id FROM errors WHERE key = ? AND error_type = ? AND line = ?", entry_key
+            ).fetchone()[0]
+            for entry_key in batch.entries
+        }
+
+        hours = []
+        days: Dict[Tuple[int, int], int] = {}
+        for (entry_key, hour), count in batch.hours.items():
+            error_id = ids[entry_key]
+            hours.append((hour, error_id, count))
+            day_key = (hour // 24, error_id)
+            days[day_key] = days.get(day_key, 0) + count
+        conn.executemany(
+            "INSERT INTO hours VALUES (?, ?, ?) "
+            "ON CONFLICT (hour, error_id) DO UPDATE SET count = count + excluded.count",
+            hours
+        )
+        conn.executemany(
+            "INSERT INTO days VALUES (?, ?, ?) "
+            "ON CONFLICT (day, error_id) DO UPDATE SET count = count + excluded.count",
+            [(day, error_id, count) for (day, error_id), count in days.items()]
+        ) 
\ No newline at end of file
@@ -0,0 +1,416 @@
+"""
+Language server publishing the analyzer's issues as diagnostics.
+
+The server speaks the Language Server Protocol over stdio, so any LSP
+client can show the analyzer's issues inline. Open documents are kept in
+memory and updated from incremental edits, never re-read from disk.
+Each edit bumps the document's version and schedules an analysis after a
+short debounce; analyses made stale by a newer edit are skipped, or
+discarded if already running. Diagnostics of all documents analyzed in a
+pass are written out together, in one flush.
+
+Supported: initialize, shutdown, exit, and textDocument/didOpen,
+didChange (full and incremental), didSave and didClose.
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+from .analyzer import PatternAnalyzer
+from .extension import get_tracker
+from .index import ErrorIndex
+
+SERVER_NAME = "error-learner"
+
+# LSP constants
+SYNC_INCREMENTAL = 2
+SEVERITY_WARNING = 2
+PARSE_ERROR = -32700
+INVALID_PARAMS = -32602
+METHOD_NOT_FOUND = -32601
+SERVER_NOT_INITIALIZED = -32002
+
+
+def uri_to_path(uri: str) -> str:
+    """Convert a file:// URI to a local path."""
+    parsed = urlparse(uri)
+    # url2pathname decodes percent-escapes itself
+    return url2pathname(parsed.path)
+
+
+def _utf16_offset(line: str, character: int) -> int:
+    """Convert an LSP character offset (UTF-16 code units) to a str index."""
+    if line.isascii():
+        return min(character, len(line))
+    units = 0
+    for index, char in enumerate(line):
+        if units >= character:
+            return index
+        units += 2 if ord(char) > 0xFFFF else 1
+    return len(line)
+
+
+def _utf16_length(line: str) -> int:
+    if line.isascii():
+        return len(line)
+    return sum(2 if ord(char) > 0xFFFF else 1 for char in line)
+
+
+class TextDocument:
+    """An open document, stored as lines so edits only touch the lines they span."""
+
+    __slots__ = ("uri", "path", "version", "lines")
+
+    def __init__(self, uri: str, text: str, version: int = 0):
+        self.uri = uri
+        self.path = uri_to_path(uri)
+        self.version = version
+        self.lines = text.split("\n")
+
+    @property
+    def text(self) -> str:
+        """The document's current text."""
+        return "\n".join(self.lines)
+
+    def apply(self, change: Dict[str, Any]) -> None:
+        """
+        Apply a content change from didChange.
+
+        Args:
+            change: A change with a range and its replacement text, or
+                the full text if it has no range
+        """
+        if "range" not in change:
+            self.lines = change["text"].split("\n")
+            return
+        start = change["range"]["start"]
+        end = change["range"]["end"]
+        lines = self.lines
+        last = len(lines) - 1
+        start_line = min(start["line"], last)
+        end_line = min(end["line"], last)
+        prefix = lines[start_line][:_utf16_offset(lines[start_line], start["character"])]
+        suffix = lines[end_line][_utf16_offset(lines[end_line], end["character"]):]
+        lines[start_line:end_line + 1] = (prefix + change["text"] + suffix).split("\n")
+
+
+class LanguageServer:
+    """Serves diagnostics for open documents over the Language Server Protocol."""
+
+    def __init__(self,
+                 analyzer: Optional[PatternAnalyzer] = None,
+                 store: Optional[str] = None,
+                 debounce: float = 0.2,
+                 top: Optional[int] = None):
+        """
+        Create a server; call run() to serve.
+
+        Args:
+            analyzer: Analyzer to use, switched to incremental re-analysis;
+                defaults to a new one, leaving the global analyzer as it is
+            store: Error store directory to read error history from; if
+                omitted, history comes from the global tracker
+            debounce: Seconds a document must be unchanged before it is analyzed
+            top: Publish only a document's issues most likely to fail, at
+                most this many, ranked by error history (see
+                PatternAnalyzer.top_issues); all issues if None
+        """
+        self.analyzer = analyzer if analyzer is not None else PatternAnalyzer()
+        if not self.analyzer.incremental:
+            # Each edit re-analyzes only the top-level blocks it touched
+            self.analyzer.enable_incremental()
+        self.debounce = debounce
+        self.top = top
+        self.logger = logging.getLogger("error_learner.lsp")
+        self.documents: Dict[str, TextDocument] = {}
+        self._index = ErrorIndex(store) if store is not None else None
+        # uri -> time the document may be analyzed at
+        self._pending: Dict[str, float] = {}
+        self._busy = False
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._output: Optional[BinaryIO] = None
+        self._initialized = False
+        self._shutdown = False
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+
+    def run(self, input: Optional[BinaryIO] = None, output: Optional[BinaryIO] = None) -> int:
+        """
+        Serve until the client sends exit or closes the input.
+
+        Args:
+            input: Stream of client messages; defaults to stdin
+            output: Stream for server messages; defaults to stdout
+
+        Returns:
+            The exit code: 0 after a shutdown request, 1 otherwise
+        """
+        input = input if input is not None else sys.stdin.buffer
+        self.start(output if output is not None else sys.stdout.buffer)
+        try:
+            while True:
+                message = self._read(input)
+                if message is None:
+                    break
+                if message.get("method") == "exit":
+                    break
+                self.handle(message)
+        finally:
+            self.close()
+        return 0 if self._shutdown else 1
+
+    def start(self, output: BinaryIO) -> "LanguageServer":
+        """
+        Start the analysis thread, for feeding messages to handle() directly.
+
+        Args:
+            output: Stream for server messages
+        """
+        self._output = output
+        self._worker = threading.Thread(target=self._work, name="error-learner-lsp", daemon=True)
+        self._worker.start()
+        return self
+
+    def close(self) -> None:
+        """Stop the analysis thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._worker is not None and self._worker is not threading.current_thread():
+            self._worker.join(timeout=5.0)
+        if self._index is not None:
+            self._index.close()
+
+    def handle(self, message: Dict[str, Any]) -> None:
+        """
+        Handle one client message.
+
+        A malformed message gets an error reply if it is a request and is
+        logged if it is a notification; either way the server keeps going.
+        """
+        try:
+            self._dispatch(message)
+        except Exception as e:
+            method = message.get("method")
+            request_id = message.get("id")
+            if request_id is not None:
+                self._error(request_id, INVALID_PARAMS, f"Invalid params for {method}: {e!r}")
+            else:
+                self.logger.error(f"Error handling {method}: {e!r}")
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        method = message.get("method")
+        params = message.get("params") or {}
+        request_id = message.get("id")
+
+        if method == "initialize":
+            self._initialized = True
+            self._respond(request_id, {
+                "capabilities": {
+                    "textDocumentSync": {
+                        "openClose": True,
+                        "change": SYNC_INCREMENTAL,
+                        "save": {"includeText": False},
+                    },
+                },
+                "serverInfo": {"name": SERVER_NAME},
+            })
+        elif not self._initialized:
+            if request_id is not None:
+                self._error(request_id, SERVER_NOT_INITIALIZED, "Server not initialized")
+        elif method == "shutdown":
+            self._shutdown = True
+            self._respond(request_id, None)
+        elif method == "textDocument/didOpen":
+            item = params["textDocument"]
+            with self._cond:
+                self.documents[item["uri"]] = TextDocument(
+                    item["uri"], item["text"], item.get("version", 0)
+                )
+            self._schedule(item["uri"], 0.0)
+        elif method == "textDocument/didChange":
+            uri = params["textDocument"]["uri"]
+            with self._cond:
+                document = self.documents.get(uri)
+                if document is None:
+                    return
+                for change in params["contentChanges"]:
+                    document.apply(change)
+                document.version = params["textDocument"].get("version", document.version + 1)
+            self._schedule(uri, self.debounce)
+        elif method == "textDocument/didSave":
+            # Saving may be followed by new errors for the file; look again
+            self._schedule(params["textDocument"]["uri"], 0.0)
+        elif method == "textDocument/didClose":
+            uri = params["textDocument"]["uri"]
+            with self._cond:
+                document = self.documents.pop(uri, None)
+                self._pending.pop(uri, None)
+            if document is not None:
+                self.analyzer.forget(document.path)
+            self._write([self._notification(uri, [])])
+        elif request_id is not None:
+            self._error(request_id, METHOD_NOT_FOUND, f"Unsupported method: {method}")
+        # Other notifications ($/cancelRequest, initialized, ...) need no reply
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until no analysis is pending or running; False if the timeout expired first."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    @staticmethod
+    def diagnostics(lines: List[str], issues: List[Dict]) -> List[Dict[str, Any]]:
+        """Turn analyzer issues into LSP diagnostics spanning each issue's line."""
+        diagnostics = []
+        for issue in issues:
+            line = max(issue["line"] - 1, 0)
+            length = _utf16_length(lines[line]) if line < len(lines) else 0
+            diagnostics.append({
+                "range": {
+                    "start": {"line": line, "character": 0},
+                    "end": {"line": line, "character": length},
+                },
+                "severity": SEVERITY_WARNING,
+                "source": SERVER_NAME,
+                "code": issue["type"],
+                "message": f"{issue['message']}\n{issue['suggestion']}",
+            })
+        return diagnostics
+
+    def _schedule(self, uri: str, delay: float) -> None:
+        with self._cond:
+            if uri in self.documents:
+                self._pending[uri] = time.monotonic() + delay
+                self._cond.notify_all()
+
+    def _due(self) -> Optional[List[Tuple[TextDocument, int, str]]]:
+        """Wait for documents to become due; returns (document, version, text) snapshots."""
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                due = [uri for uri, deadline in self._pending.items() if deadline <= now]
+                if due:
+                    self._busy = True
+                    snapshots = []
+                    for uri in due:
+                        del self._pending[uri]
+                        document = self.documents[uri]
+                        snapshots.append((document, document.version, document.text))
+                    return snapshots
+                timeout = min(self._pending.values()) - now if self._pending else None
+                self._cond.wait(timeout)
+        return None
+
+    def _work(self) -> None:
+        while True:
+            snapshots = self._due()
+            if snapshots is None:
+                return
+            batch = []
+            for document, version, text in snapshots:
+                if self._stale(document, version):
+                    continue
+                try:
+                    issues = self._analyze(document, text)
+                except SyntaxError:
+                    # Mid-edit; keep the last diagnostics until it parses again
+                    continue
+                except Exception as e:
+                    self.logger.error(f"Error analyzing {document.uri}: {e}")
+                    continue
+                if self._stale(document, version):
+                    continue
+                notification = self._notification(
+                    document.uri, self.diagnostics(text.split("\n"), issues)
+                )
+                notification["params"]["version"] = version
+                batch.append(notification)
+            if batch:
+                self._write(batch)
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _stale(self, document: TextDocument, version: int) -> bool:
+        """Whether the document was edited or closed since the version was taken."""
+        with self._cond:
+            return (document.version != version
+                    or self.documents.get(document.uri) is not document
+                    or document.uri in self._pending)
+
+    def _analyze(self, document: TextDocument, text: str) -> List[Dict]:
+        file_errors = self._file_errors(document.path)
+        if self.top is not None:
+            return self.analyzer.top_issues(document.path, self.top, file_errors, text)
+        return self.analyzer.analyze_source(text, document.path, file_errors)
+
+    def _file_errors(self, file_path: str) -> List[Dict]:
+        if self._index is not None:
+            return self._index.refresh().file_errors(file_path)
+        return get_tracker().get_file_errors(file_path)
+
+    @staticmethod
+    def _notification(uri: str, diagnostics: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "jsonrpc": "2.0",
+            "method": "textDocument/publishDiagnostics",
+            "params": {"uri": uri, "diagnostics": diagnostics},
+        }
+
+    def _respond(self, request_id: Any, result: Any) -> None:
+        self._write([{"jsonrpc": "2.0", "id": request_id, "result": result}])
+
+    def _error(self, request_id: Any, code: int, message: str) -> None:
+        self._write([{"jsonrpc": "2.0", "id": request_id,
+                      "error": {"code": code, "message": message}}])
+
+    def _write(self, messages: List[Dict[str, Any]]) -> None:
+        """Frame messages and write them with a single flush."""
+        chunks = []
+        for message in messages:
+            body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+            chunks.append(b"Content-Length: %d\r\n\r\n" % len(body))
+            chunks.append(body)
+        with self._write_lock:
+            self._output.write(b"".join(chunks))
+            self._output.flush()
+
+    def _read(self, input: BinaryIO) -> Optional[Dict[str, Any]]:
+        """Read one framed message; None at end of input, {} if it is unreadable."""
+        length = None
+        while True:
+            header = input.readline()
+            if not header:
+                return None
+            header = header.strip()
+            if not header:
+                break
+            name, _, value = header.partition(b":")
+            if name.strip().lower() == b"content-length":
+                try:
+                    length = int(value.strip())
+                except ValueError:
+                    pass
+        if length is None:
+            self.logger.error("Message without Content-Length")
+            return {}
+        body = input.read(length)
+        if len(body) < length:
+            return None
+        try:
+            message = json.loads(body)
+        except ValueError as e:
+            # Including UnicodeDecodeError; the id is unknown, so reply to null
+            self._error(None, PARSE_ERROR, f"Parse error: {e}")
+            return {}
+        if not isinstance(message, dict):
+            self._error(None, PARSE_ERROR, "Parse error: expected a JSON object")
+            return {}
+        return message 
\ No newline at end of file
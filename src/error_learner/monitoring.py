@@ -0,0 +1,191 @@
+"""
+Error tracking without wrapper functions, using sys.monitoring (PEP 669).
+
+On Python 3.12 and later, the track decorator registers a function's code
+object here instead of wrapping the function. A PY_UNWIND callback sees
+every exception leaving a Python frame and hands the ones leaving a
+registered code object to their tracker. Successful calls run the
+original function directly, with no extra frame or argument repacking.
+
+PY_UNWIND cannot be enabled per code object, so the callback runs for
+every frame an exception unwinds, in any code; it is a single dict lookup
+for code nobody tracks. On older Pythons, or when every tool id is taken,
+register() returns False and the decorator falls back to a wrapper.
+
+The same tool id also delivers RAISE events to the process-wide handlers
+of every active global capture (see capture.py).
+"""
+
+import sys
+import threading
+from types import CodeType
+from typing import Callable, Dict, Hashable, Optional, Set, Tuple
+
+AVAILABLE = hasattr(sys, "monitoring")
+
+TOOL_NAME = "error_learner"
+
+# Ids not reserved by CPython for debuggers, coverage, profilers or optimizers first
+_PREFERRED_TOOL_IDS = (3, 4, 2, 5, 1, 0)
+
+# Called with the exception leaving a registered code object
+Handler = Callable[[BaseException], None]
+
+# Called with the code object an exception was raised in, and the exception
+RaiseHandler = Callable[[CodeType, BaseException], None]
+
+# id(code object) -> owner -> handler. Keyed by identity, since equal code
+# objects can come from different files; registered code is kept alive
+# in _codes, so ids are not reused
+_handlers: Dict[int, Dict[Hashable, Handler]] = {}
+_codes: Dict[int, CodeType] = {}
+# owner -> ids of the code objects it registered, for release()
+_owned: Dict[Hashable, Set[int]] = {}
+# owner -> handler for RAISE events, and the handlers as called
+_raise_handlers: Dict[Hashable, RaiseHandler] = {}
+_raise_dispatch: Tuple[RaiseHandler, ...] = ()
+_tool_id: Optional[int] = None
+# Reentrant: release() runs from finalizers, which the garbage collector
+# may call on a thread that already holds the lock
+_lock = threading.RLock()
+
+
+def _on_unwind(code: CodeType, instruction_offset: int, exception: BaseException) -> None:
+    handlers = _handlers.get(id(code))
+    if handlers is not None and isinstance(exception, Exception):
+        for handler in list(handlers.values()):
+            handler(exception)
+
+
+def _on_raise(code: CodeType, instruction_offset: int, exception: BaseException) -> None:
+    for handler in _raise_dispatch:
+        handler(code, exception)
+
+
+def _start() -> bool:
+    """Claim a tool id and enable the unwind callback; False if none is free."""
+    global _tool_id
+    monitoring = sys.monitoring
+    for tool_id in _PREFERRED_TOOL_IDS:
+        if monitoring.get_tool(tool_id) is None:
+            monitoring.use_tool_id(tool_id, TOOL_NAME)
+            monitoring.register_callback(tool_id, monitoring.events.PY_UNWIND, _on_unwind)
+            monitoring.set_events(tool_id, monitoring.events.PY_UNWIND)
+            _tool_id = tool_id
+            return True
+    return False
+
+
+def register(code: CodeType, owner: Hashable, handler: Handler) -> bool:
+    """
+    Report exceptions leaving a code object to a handler.
+
+    Args:
+        code: Code object of the function to watch
+        owner: Key of the registering object, such as its id(); registering
+            again for the same owner replaces its handler
+        handler: Called with each exception leaving the code object; it is
+            kept until unregister() or release(), so it should not hold
+            its owner strongly
+
+    Returns:
+        False if sys.monitoring is unavailable or has no free tool id
+    """
+    if not AVAILABLE:
+        return False
+    with _lock:
+        if _tool_id is None and not _start():
+            return False
+        _codes[id(code)] = code
+        _handlers.setdefault(id(code), {})[owner] = handler
+        _owned.setdefault(owner, set()).add(id(code))
+    return True
+
+
+def is_registered(code: CodeType, owner: Hashable) -> bool:
+    """Check whether an owner watches a code object."""
+    handlers = _handlers.get(id(code))
+    return handlers is not None and owner in handlers
+
+
+def set_raise_handler(owner: Hashable, handler: Optional[RaiseHandler]) -> bool:
+    """
+    Call a handler for every exception raised in Python code, or stop.
+
+    RAISE events, like PY_UNWIND, can only be enabled process-wide; each
+    handler does its own filtering. Handlers of different owners are all
+    called, and RAISE events stay on until the last one is removed.
+
+    Args:
+        owner: Key of the installing object; installing again for the
+            same owner replaces its handler
+        handler: Handler to install, or None to remove the owner's
+
+    Returns:
+        False if sys.monitoring is unavailable or has no free tool id
+    """
+    global _raise_dispatch
+    if not AVAILABLE:
+        return False
+    with _lock:
+        if handler is None:
+            _raise_handlers.pop(owner, None)
+        else:
+            if _tool_id is None and not _start():
+                return False
+            _raise_handlers[owner] = handler
+        _raise_dispatch = tuple(_raise_handlers.values())
+        if _tool_id is not None:
+            events = sys.monitoring.events
+            sys.monitoring.register_callback(
+                _tool_id, events.RAISE, _on_raise if _raise_handlers else None
+            )
+            sys.monitoring.set_events(
+                _tool_id, events.PY_UNWIND | (events.RAISE if _raise_handlers else 0)
+            )
+    return True
+
+
+def unregister(code: CodeType, owner: Hashable) -> None:
+    """Stop reporting a code object's exceptions to an owner."""
+    with _lock:
+        codes = _owned.get(owner)
+        if codes is not None:
+            codes.discard(id(code))
+            if not codes:
+                del _owned[owner]
+        _unregister(id(code), owner)
+
+
+def release(owner: Hashable) -> None:
+    """Drop every registration of an owner, e.g. from a finalizer when it dies."""
+    with _lock:
+        for code_id in _owned.pop(owner, ()):
+            _unregister(code_id, owner)
+
+
+def _unregister(code_id: int, owner: Hashable) -> None:
+    handlers = _handlers.get(code_id)
+    if handlers is not None:
+        handlers.pop(owner, None)
+        if not handlers:
+            del _handlers[code_id]
+            del _codes[code_id]
+
+
+def shutdown() -> None:
+    """Forget every registration and release the tool id."""
+    global _tool_id, _raise_dispatch
+    with _lock:
+        _handlers.clear()
+        _codes.clear()
+        _owned.clear()
+        _raise_handlers.clear()
+        _raise_dispatch = ()
+        if _tool_id is not None:
+            monitoring = sys.monitoring
+            monitoring.set_events(_tool_id, monitoring.events.NO_EVENTS)
+            monitoring.register_callback(_tool_id, monitoring.events.PY_UNWIND, None)
+            monitoring.register_callback(_tool_id, monitoring.events.RAISE, None)
+            monitoring.free_tool_id(_tool_id)
+            _tool_id = None
@@ -0,0 +1,142 @@
+"""
+Background recording pipeline for tracked errors.
+
+The raising thread only enqueues a minimal record; a worker thread turns
+it into an ErrorInfo, updates the history and logs suggestions.
+
+Errors raised in coroutines go through a LoopBuffer instead, which
+batches them per event loop iteration and records them in the loop's
+default executor, so the loop itself only appends to a list.
+"""
+
+import logging
+import queue
+import threading
+from typing import TYPE_CHECKING, Any, Callable, List, Optional
+
+if TYPE_CHECKING:
+    import asyncio
+
+OVERFLOW_POLICIES = ("drop", "sample", "block")
+
+_STOP = object()
+
+
+class RecordingPipeline:
+    """Bounded queue drained by a background worker thread."""
+
+    def __init__(self,
+                 handler: Callable[[Any], None],
+                 max_queue: int = 10_000,
+                 overflow: str = "drop",
+                 sample_every: int = 10):
+        """
+        Create and start a pipeline.
+
+        Args:
+            handler: Called on the worker thread for every accepted record
+            max_queue: Maximum number of queued records
+            overflow: What to do when the queue is under pressure:
+                'drop' discards new records once the queue is full,
+                'sample' keeps one in every `sample_every` records once the
+                queue is half full, 'block' waits for room
+            sample_every: Sampling interval for the 'sample' policy
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow!r}")
+        self.handler = handler
+        self.overflow = overflow
+        self.sample_every = max(1, sample_every)
+        self.logger = logging.getLogger("error_learner.pipeline")
+        self.dropped = 0
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._high_water = max_queue // 2
+        self._pressured = 0
+        self._worker = threading.Thread(
+            target=self._run, name="error-learner-pipeline", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, record: Any) -> bool:
+        """
+        Queue a record for processing.
+
+        Args:
+            record: Record passed to the handler
+
+        Returns:
+            True if the record was accepted, False if it was dropped
+        """
+        if self.overflow == "block":
+            self._queue.put(record)
+            return True
+
+        if self.overflow == "sample" and self._queue.qsize() >= self._high_water:
+            self._pressured += 1
+            if self._pressured % self.sample_every:
+                self.dropped += 1
+                return False
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self) -> None:
+        """Wait until every accepted record has been handled."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Handle the remaining records and stop the worker thread."""
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            try:
+                if record is _STOP:
+                    return
+                self.handler(record)
+            except Exception as e:
+                self.logger.error(f"Error recording tracked error: {e}")
+            finally:
+                self._queue.task_done()
+
+
+class LoopBuffer:
+    """Errors raised on one event loop, recorded off the loop in batches."""
+
+    def __init__(self, handler: Callable[[Any], None]):
+        """
+        Create a buffer.
+
+        Args:
+            handler: Called on an executor thread for every record
+        """
+        self.handler = handler
+        self.logger = logging.getLogger("error_learner.pipeline")
+        self._records: List[Any] = []
+        self._scheduled = False
+
+    def add(self, loop: "asyncio.AbstractEventLoop", record: Any) -> None:
+        """Buffer a record; must be called on the loop's thread."""
+        self._records.append(record)
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self._flush, loop)
+
+    def _flush(self, loop: "asyncio.AbstractEventLoop") -> None:
+        records, self._records = self._records, []
+        self._scheduled = False
+        loop.run_in_executor(None, self._drain, records)
+
+    def _drain(self, records: List[Any]) -> None:
+        for record in records:
+            try:
+                self.handler(record)
+            except Exception as e:
+                self.logger.error(f"Error recording tracked error: {e}")
@@ -0,0 +1,282 @@
+"""
+Policies bounding how much error history a tracker keeps.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+class _Policy:
+    """Equality and repr by field, as dataclasses give, without importing them (they import inspect)."""
+
+    _fields: Tuple[str, ...] = ()
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+
+class RetentionPolicy(_Policy):
+    """
+    Limits on a tracker's error history.
+
+    Attributes:
+        max_entries_per_key: Entries kept per function; the least recently
+            seen are dropped first
+        max_keys: Functions kept in total; others are evicted per `eviction`
+        eviction: 'lru' evicts the least recently seen function, 'lfu' the
+            least frequently seen one
+        window_seconds: If set, the recurrence threshold counts only errors
+            seen in this many seconds
+        window_buckets: Resolution of the window; 1 gives a tumbling window,
+            more give a sliding one
+    """
+    _fields = ("max_entries_per_key", "max_keys", "eviction", "window_seconds", "window_buckets")
+
+    max_entries_per_key: Optional[int] = None
+    max_keys: Optional[int] = None
+    eviction: str = "lru"
+    window_seconds: Optional[float] = None
+    window_buckets: int = 6
+
+    def __init__(self, max_entries_per_key: Optional[int] = None,
+                 max_keys: Optional[int] = None,
+                 eviction: str = "lru",
+                 window_seconds: Optional[float] = None,
+                 window_buckets: int = 6):
+        self.max_entries_per_key = max_entries_per_key
+        self.max_keys = max_keys
+        self.eviction = eviction
+        self.window_seconds = window_seconds
+        self.window_buckets = window_buckets
+        if self.eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {self.eviction!r}")
+        if self.window_buckets < 1:
+            raise ValueError("window_buckets must be at least 1")
+
+
+class SamplingPolicy(_Policy):
+    """
+    Limits on the work a tracker does for a frequently repeated error.
+
+    Attributes:
+        exact_first: Occurrences of an error recorded one by one; beyond
+            that, 1 in N occurrences is recorded with a count of N, N
+            doubling each time the occurrence count doubles. None records
+            every occurrence
+        max_rate: Largest N, so a storm still shows up every max_rate errors
+        suggest_interval: Seconds between fix suggestions for the same error
+    """
+    _fields = ("exact_first", "max_rate", "suggest_interval")
+
+    exact_first: Optional[int] = 100
+    max_rate: int = 1024
+    suggest_interval: float = 60.0
+
+    def __init__(self, exact_first: Optional[int] = 100, max_rate: int = 1024,
+                 suggest_interval: float = 60.0):
+        self.exact_first = exact_first
+        self.max_rate = max_rate
+        self.suggest_interval = suggest_interval
+        if self.exact_first is not None and self.exact_first < 1:
+            raise ValueError("exact_first must be at least 1")
+        if self.max_rate < 1:
+            raise ValueError("max_rate must be at least 1")
+
+
+class AdaptiveSampler:
+    """Decides which occurrences of each key to record, and with what weight."""
+
+    def __init__(self, exact_first: int = 100, max_rate: int = 1024):
+        self.exact_first = exact_first
+        self.max_rate = max_rate
+        # key -> [occurrences, occurrences not yet recorded]
+        self._state: Dict[Hashable, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def offer(self, key: Hashable) -> int:
+        """
+        Note an occurrence of a key.
+
+        Returns:
+            0 to skip the occurrence, otherwise the number of occurrences
+            recording it stands for
+        """
+        with self._lock:
+            state = self._state.get(key)
+            if state is None:
+                state = self._state[key] = [0, 0]
+            state[0] += 1
+            if state[0] <= self.exact_first:
+                return 1
+            # Rate: the largest power of two not above seen / exact_first
+            rate = min(1 << ((state[0] // self.exact_first).bit_length() - 1), self.max_rate)
+            state[1] += 1
+            if state[1] < rate:
+                return 0
+            weight, state[1] = state[1], 0
+            return weight
+
+    def forget(self, key: Hashable) -> None:
+        """Drop a key's state."""
+        with self._lock:
+            self._state.pop(key, None)
+
+
+class RateLimiter:
+    """Allows an action at most once per key per interval."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._last: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """Return whether the action may run for a key now, noting it if so."""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                return False
+            self._last[key] = now
+            return True
+
+    def forget(self, key: Hashable) -> None:
+        """Drop a key's state."""
+        with self._lock:
+            self._last.pop(key, None)
+
+
+class WindowedCounter:
+    """Counts events in a time window split into fixed buckets."""
+
+    __slots__ = ("bucket_seconds", "counts", "epochs")
+
+    def __init__(self, window_seconds: float, buckets: int = 6):
+        self.bucket_seconds = window_seconds / buckets
+        self.counts = [0] * buckets
+        self.epochs = [-1] * buckets
+
+    def add(self, now: Optional[float] = None, count: int = 1) -> int:
+        """
+        Record events and return the count in the current window.
+
+        Args:
+            now: Event time in epoch seconds; defaults to the current time
+            count: Number of events
+        """
+        if now is None:
+            now = time.time()
+        epoch = int(now // self.bucket_seconds)
+        slot = epoch % len(self.counts)
+        if self.epochs[slot] != epoch:
+            self.epochs[slot] = epoch
+            self.counts[slot] = 0
+        self.counts[slot] += count
+        return self.total(now)
+
+    def total(self, now: Optional[float] = None) -> int:
+        """Get the number of events in the window ending now."""
+        if now is None:
+            now = time.time()
+        oldest = int(now // self.bucket_seconds) - len(self.counts)
+        return sum(c for c, e in zip(self.counts, self.epochs) if e > oldest)
+
+
+class KeyEvictor:
+    """Picks which key to evict, by recency or by frequency, in O(1)."""
+
+    def __init__(self, policy: str = "lru"):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy!r}")
+        self.policy = policy
+        self._recent: "OrderedDict[Hashable, None]" = OrderedDict()
+        # LFU: key -> frequency, and frequency -> keys in recency order
+        self._frequency: Dict[Hashable, int] = {}
+        self._buckets: Dict[int, "OrderedDict[Hashable, None]"] = {}
+        # Frequencies with keys, linked in increasing order, so the next
+        # lowest one is found without stepping through the missing ones
+        self._lowest: Optional[int] = None
+        self._higher: Dict[int, Optional[int]] = {}
+        self._lower: Dict[int, Optional[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._recent) if self.policy == "lru" else len(self._frequency)
+
+    def touch(self, key: Hashable) -> None:
+        """Record a use of a key."""
+        if self.policy == "lru":
+            self._recent[key] = None
+            self._recent.move_to_end(key)
+            return
+
+        frequency = self._frequency.get(key, 0)
+        bucket = self._buckets.get(frequency + 1)
+        if bucket is None:
+            bucket = self._buckets[frequency + 1] = OrderedDict()
+            self._link(frequency + 1, frequency or None)
+        bucket[key] = None
+        self._frequency[key] = frequency + 1
+        if frequency:
+            bucket = self._buckets[frequency]
+            del bucket[key]
+            if not bucket:
+                self._unlink(frequency)
+
+    def evict(self) -> Hashable:
+        """Remove and return the key to evict."""
+        if self.policy == "lru":
+            key, _ = self._recent.popitem(last=False)
+            return key
+
+        frequency = self._lowest
+        if frequency is None:
+            raise KeyError("evict from an empty KeyEvictor")
+        bucket = self._buckets[frequency]
+        key, _ = bucket.popitem(last=False)
+        if not bucket:
+            self._unlink(frequency)
+        del self._frequency[key]
+        return key
+
+    def evict_over(self, limit: int) -> List[Hashable]:
+        """Evict keys until at most `limit` remain, returning them."""
+        evicted = []
+        while len(self) > limit:
+            evicted.append(self.evict())
+        return evicted
+
+    def _link(self, frequency: int, lower: Optional[int]) -> None:
+        """Insert a frequency after `lower`, or first if None."""
+        higher = self._higher[lower] if lower is not None else self._lowest
+        self._lower[frequency] = lower
+        self._higher[frequency] = higher
+        if lower is None:
+            self._lowest = frequency
+        else:
+            self._higher[lower] = frequency
+        if higher is not None:
+            self._lower[higher] = frequency
+
+    def _unlink(self, frequency: int) -> None:
+        """Drop an empty frequency."""
+        del self._buckets[frequency]
+        lower = self._lower.pop(frequency)
+        higher = self._higher.pop(frequency)
+        if lower is None:
+            self._lowest = higher
+        else:
+            self._higher[lower] = higher
+        if higher is not None:
+            self._lower[higher] = lower
@@ -0,0 +1,161 @@
+"""
+Rules used by the pattern analyzer.
+
+Each rule declares the AST node types it inspects. The rule engine walks
+the tree once and hands each node only to the rules registered for its
+type, so adding a rule does not slow down the other node types.
+"""
+
+import ast
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type
+
+
+class RuleContext:
+    """What a rule knows about the file being analyzed."""
+
+    def __init__(self, file_path: str, file_errors: List[Dict[str, Any]]):
+        self.file_path = file_path
+        self.file_errors = file_errors
+        self.error_types: Set[str] = {e["error_type"] for e in file_errors}
+
+
+class Rule:
+    """Base class for analysis rules."""
+
+    #: AST node classes this rule wants to see
+    node_types: Tuple[Type[ast.AST], ...] = ()
+
+    def check(self, node: ast.AST, context: RuleContext) -> Optional[Dict[str, Any]]:
+        """
+        Check a node.
+
+        Args:
+            node: A node of one of the rule's node types
+            context: The file being analyzed
+
+        Returns:
+            An issue dict, or None if the node is fine
+        """
+        raise NotImplementedError
+
+
+_registry: List[Rule] = []
+
+
+def register_rule(rule_class: Type[Rule]) -> Type[Rule]:
+    """Class decorator adding a rule to the default rule set."""
+    _registry.append(rule_class())
+    return rule_class
+
+
+def default_rules() -> List[Rule]:
+    """Get the registered rules."""
+    return list(_registry)
+
+
+@register_rule
+class KeyErrorRule(Rule):
+    """Flags subscripts of plain names, which may raise KeyError."""
+
+    node_types = (ast.Subscript,)
+
+    def check(self, node: ast.Subscript, context: RuleContext) -> Optional[Dict[str, Any]]:
+        if not isinstance(node.value, ast.Name):
+            return None
+        return {
+            'type': 'KeyError',
+            'line': node.lineno,
+            'message': "Potential KeyError: Consider using dict.get() or checking key existence",
+            'suggestion': f"Use dict.get() or check key existence: 'if key in {node.value.id}'"
+        }
+
+
+@register_rule
+class ZeroDivisionRule(Rule):
+    """Flags divisions, which may raise ZeroDivisionError."""
+
+    node_types = (ast.BinOp,)
+
+    def check(self, node: ast.BinOp, context: RuleContext) -> Optional[Dict[str, Any]]:
+        if not isinstance(node.op, ast.Div):
+            return None
+        return {
+            'type': 'ZeroDivisionError',
+            'line': node.lineno,
+            'message': "Potential division by zero",
+            'suggestion': "Add a check to prevent division by zero"
+        }
+
+
+@register_rule
+class TypeMismatchRule(Rule):
+    """Flags arithmetic in files that have raised TypeError before."""
+
+    node_types = (ast.BinOp,)
+
+    def check(self, node: ast.BinOp, context: RuleContext) -> Optional[Dict[str, Any]]:
+        if not isinstance(node.op, (ast.Add, ast.Sub, ast.Mult)):
+            return None
+        if 'TypeError' not in context.error_types:
+            return None
+        return {
+            'type': 'TypeError',
+            'line': node.lineno,
+            'message': "Potential type mismatch in operation",
+            'suggestion': "Verify types before operation or add type conversion"
+        }
+
+
+class RuleEngine:
+    """Runs rules over a tree in a single traversal."""
+
+    def __init__(self, rules: Optional[Iterable[Rule]] = None):
+        """
+        Build the dispatch table.
+
+        Args:
+            rules: Rules to run; defaults to the registered rules
+        """
+        self.rules = list(rules) if rules is not None else default_rules()
+        self._handlers: Dict[Type[ast.AST], List[Rule]] = {}
+        for rule in self.rules:
+            for node_type in rule.node_types:
+                self._handlers.setdefault(node_type, []).append(rule)
+
+    def run(self, tree: ast.AST, context: RuleContext) -> List[Dict[str, Any]]:
+        """
+        Run the rules over a tree.
+
+        Args:
+            tree: Parsed module
+            context: The file being analyzed
+
+        Returns:
+            Issues in pre-order traversal order of the nodes that produced them
+        """
+        issues = []
+        handlers = self._handlers
+        node_class = ast.AST
+        # Pre-order, depth-first, like ast.NodeVisitor.generic_visit, but
+        # iterative and without the generator overhead of iter_child_nodes
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            rules = handlers.get(type(node))
+            if rules is not None:
+                for rule in rules:
+                    issue = rule.check(node, context)
+                    if issue is not None:
+                        issues.append(issue)
+            children = []
+            for name in node._fields:
+                value = getattr(node, name, None)
+                if isinstance(value, node_class):
+                    children.append(value)
+                elif isinstance(value, list):
+                    for item in value:
+                        if isinstance(item, node_class):
+                            children.append(item)
+            children.reverse()
+            stack.extend(children)
+        return issues
@@ -0,0 +1,190 @@
+"""
+Approximate, fixed-memory error counting for high-cardinality workloads.
+
+A Count-Min sketch answers "how often has this error occurred" and a
+small heavy-hitters table keeps the most frequent error locations.
+
+Error bounds: with width w = ceil(e / epsilon) and depth d = ceil(ln(1 / delta)),
+an estimate never undercounts, and overcounts by more than epsilon * N
+(N = total errors recorded) with probability at most delta. Heavy hitters
+are tracked with those estimates, so any location seen more than
+epsilon * N times is kept once it is among the top_k most frequent.
+"""
+
+import math
+import random
+import threading
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+_PRIME = (1 << 61) - 1
+
+# (file_path, func_name, line_no, error_type)
+Location = Tuple[str, str, int, str]
+
+
+class CountMinSketch:
+    """Count-Min sketch over hashable keys."""
+
+    def __init__(self, width: int, depth: int, seed: Optional[int] = None):
+        """
+        Create a sketch.
+
+        Args:
+            width: Counters per row
+            depth: Number of rows (independent hash functions)
+            seed: Seed for the hash functions
+        """
+        self.width = width
+        self.depth = depth
+        rng = random.Random(seed)
+        self._hashes = [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(depth)]
+        self._rows = [[0] * width for _ in range(depth)]
+        self.total = 0
+
+    @classmethod
+    def from_error_bounds(cls, epsilon: float, delta: float,
+                          seed: Optional[int] = None) -> "CountMinSketch":
+        """
+        Size a sketch for an error of at most epsilon * N with probability 1 - delta.
+
+        Args:
+            epsilon: Maximum overcount, as a fraction of all recorded events
+            delta: Probability of exceeding that overcount
+            seed: Seed for the hash functions
+        """
+        if epsilon <= 0 or not 0 < delta < 1:
+            raise ValueError("epsilon must be positive and delta between 0 and 1")
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)), seed)
+
+    def add(self, key: Hashable, count: int = 1) -> int:
+        """Count a key and return its new estimate."""
+        h = hash(key)
+        width = self.width
+        estimate = None
+        for row, (a, b) in zip(self._rows, self._hashes):
+            i = ((a * h + b) % _PRIME) % width
+            row[i] += count
+            if estimate is None or row[i] < estimate:
+                estimate = row[i]
+        self.total += count
+        return estimate
+
+    def estimate(self, key: Hashable) -> int:
+        """Estimate how often a key was counted."""
+        h = hash(key)
+        width = self.width
+        return min(row[((a * h + b) % _PRIME) % width]
+                   for row, (a, b) in zip(self._rows, self._hashes))
+
+
+class ErrorSketch:
+    """Fixed-memory replacement for an ExtensionTracker's exact history."""
+
+    def __init__(self, epsilon: float = 0.001, delta: float = 0.01, top_k: int = 100,
+                 seed: Optional[int] = None):
+        """
+        Create a sketch.
+
+        Args:
+            epsilon: Maximum overcount, as a fraction of all recorded errors
+            delta: Probability of exceeding that overcount
+            top_k: Number of most frequent error locations to keep
+            seed: Seed for the hash functions
+        """
+        self.top_k = top_k
+        # Counts per location, and per (file, function, error type) for the threshold
+        self.locations = CountMinSketch.from_error_bounds(epsilon, delta, seed)
+        self.functions = CountMinSketch.from_error_bounds(
+            epsilon, delta, None if seed is None else seed + 1
+        )
+        # Error types are few, so their totals are kept exactly
+        self.type_totals: Dict[str, int] = {}
+        self._top: Dict[Location, Dict[str, Any]] = {}
+        self._min_location: Optional[Location] = None
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        """Total number of recorded errors."""
+        return self.locations.total
+
+    def record(self, file_path: str, func_name: str, line_no: int, error_type: str,
+               message: str, epoch: float, count: int = 1) -> int:
+        """
+        Record an error.
+
+        Args:
+            count: Occurrences this record stands for
+
+        Returns:
+            Estimated occurrences of this error type in this function
+        """
+        location = (file_path, func_name, line_no, error_type)
+        with self._lock:
+            self.type_totals[error_type] = self.type_totals.get(error_type, 0) + count
+            self._offer(location, self.locations.add(location, count), message, epoch)
+            return self.functions.add((file_path, func_name, error_type), count)
+
+    def estimate(self, file_path: str, func_name: str, error_type: str) -> int:
+        """Estimate occurrences of an error type in a function."""
+        with self._lock:
+            return self.functions.estimate((file_path, func_name, error_type))
+
+    def heavy_hitters(self, n: Optional[int] = None) -> List[Tuple[Location, int]]:
+        """
+        Get the most frequent error locations.
+
+        Args:
+            n: Number of locations to return; defaults to all kept
+
+        Returns:
+            (location, estimated count) pairs, most frequent first
+        """
+        with self._lock:
+            ranked = sorted(((loc, e["count"]) for loc, e in self._top.items()),
+                            key=lambda item: item[1], reverse=True)
+        return ranked[:n] if n is not None else ranked
+
+    def error_history(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the heavy hitters in the error_history format, with estimated counts."""
+        history: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock:
+            for (file_path, func_name, line_no, error_type), entry in self._top.items():
+                history.setdefault(f"{file_path}:{func_name}", []).append({
+                    'timestamp': datetime.fromtimestamp(entry["epoch"]).isoformat(),
+                    'error_type': error_type,
+                    'message': entry["message"],
+                    'line': line_no,
+                    'file': file_path,
+                    'count': entry["count"]
+                })
+        return history
+
+    def stats(self) -> Dict[str, Any]:
+        """Get statistics in the utils.get_error_stats format, plus the top errors."""
+        with self._lock:
+            stats = {"total_errors": self.total, "error_types": dict(self.type_totals)}
+        stats["top_errors"] = [
+            {"file": loc[0], "function": loc[1], "line": loc[2], "error_type": loc[3], "count": count}
+            for loc, count in self.heavy_hitters()
+        ]
+        return stats
+
+    def _offer(self, location: Location, count: int, message: str, epoch: float) -> None:
+        entry = self._top.get(location)
+        if entry is not None:
+            entry["count"] = count
+            entry["epoch"] = epoch
+            if location == self._min_location:
+                self._min_location = None
+            return
+
+        if len(self._top) >= self.top_k:
+            if self._min_location is None:
+                self._min_location = min(self._top, key=lambda loc: self._top[loc]["count"])
+            if count <= self._top[self._min_location]["count"]:
+                return
+            del self._top[self._min_location]
+            self._min_location = None
+        self._top[location] = {"count": count, "message": message, "epoch": epoch}
@@ -0,0 +1,335 @@
+"""
+Persistent on-disk storage for tracked errors.
+
+Errors are written to an append-only JSONL segment log by a background
+writer thread and periodically compacted into a snapshot, so a restarted
+process can load its history without replaying every recorded error.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+SNAPSHOT_NAME = "snapshot.json"
+SEGMENT_PREFIX = "errors-"
+SEGMENT_SUFFIX = ".log"
+
+
+def default_store_path() -> Path:
+    """Get the default directory for the on-disk error store."""
+    return Path(os.environ.get("ERROR_LEARNER_HOME", Path.home() / ".error_learner"))
+
+
+def merge_record(history: Dict[str, Dict[Tuple[str, int], Dict[str, Any]]],
+                 record: Dict[str, Any]) -> None:
+    """Merge one logged record into an aggregated history."""
+    entries = history.setdefault(record["key"], {})
+    entry_key = (record["error_type"], record["line"])
+    existing = entries.get(entry_key)
+    if existing is not None:
+        existing["count"] += record["count"]
+        existing["timestamp"] = record["timestamp"]
+        if record.get("function_line") is not None:
+            existing["function_line"] = record["function_line"]
+    else:
+        entries[entry_key] = {
+            "timestamp": record["timestamp"],
+            "error_type": record["error_type"],
+            "message": record["message"],
+            "line": record["line"],
+            "file": record["file"],
+            "count": record["count"],
+            "function_line": record.get("function_line"),
+        }
+
+
+class ErrorStore:
+    """Append-only error log with snapshot compaction."""
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 flush_interval: float = 1.0,
+                 compact_every: int = 100_000,
+                 max_pending: int = 100_000):
+        """
+        Create a store rooted at a directory.
+
+        Args:
+            path: Directory holding the snapshot and log segments
+            flush_interval: Seconds between batched writes
+            compact_every: Number of logged records before compacting
+            max_pending: Maximum queued records; further records are dropped
+        """
+        self.path = Path(path) if path is not None else default_store_path()
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.max_pending = max_pending
+        self.logger = logging.getLogger("error_learner.store")
+        self.dropped = 0
+
+        self._pending: Deque[Dict[str, Any]] = deque()
+        # Records kept out of the log until the next load(), see hold()
+        self._held: Optional[Deque[Dict[str, Any]]] = None
+        self._hold_lock = threading.Lock()
+        self._history: Optional[Dict[str, Dict[Tuple[str, int], Dict[str, Any]]]] = None
+        self._segment = 0
+        self._segment_file = None
+        self._records_since_compact = 0
+        # Last segment folded into the snapshot but kept for the query index
+        self._compacted: Optional[int] = None
+        self._io_lock = threading.Lock()
+        self._collect_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._writer: Optional[threading.Thread] = None
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Queue a record for writing without blocking the caller.
+
+        After close() there is no writer thread, so the record is written
+        before returning, as when another atexit handler records an error.
+
+        Args:
+            record: Dict with key, error_type, line, file, message,
+                timestamp and count
+        """
+        if self._closed:
+            self.logger.warning(f"Writing a record for {record['key']} to the closed store at {self.path}")
+            self._pending.append(record)
+            try:
+                self.flush()
+            except OSError as e:
+                self.logger.error(f"Error writing to {self.path}: {e}")
+            self._close_segment()
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        if self._held is not None:
+            with self._hold_lock:
+                if self._held is not None:
+                    if len(self._held) >= self.max_pending:
+                        self.dropped += 1
+                    else:
+                        self._held.append(record)
+                    return
+        self._pending.append(record)
+        if self._writer is None:
+            self._start_writer()
+
+    def hold(self) -> None:
+        """
+        Keep appended records out of the log until the next load().
+
+        A tracker loading the history on another thread counts its new
+        errors itself; holding them back keeps them out of what it loads.
+        """
+        with self._hold_lock:
+            if self._held is None:
+                self._held = deque()
+
+    def _release(self) -> None:
+        with self._hold_lock:
+            held, self._held = self._held, None
+        if held:
+            for record in held:
+                self.append(record)
+
+    def load(self) -> Dict[str, Dict[Tuple[str, int], Dict[str, Any]]]:
+        """
+        Load the aggregated history from the snapshot and the log tail.
+
+        Only segments written after the last compaction are replayed.
+
+        Returns:
+            Dictionary mapping error keys to {(error_type, line): entry}
+        """
+        try:
+            with self._io_lock:
+                self._load_locked()
+                return {key: {k: dict(e) for k, e in entries.items()}
+                        for key, entries in self._history.items()}
+        finally:
+            self._release()
+
+    def flush(self) -> None:
+        """Write all queued records to the current log segment."""
+        with self._io_lock:
+            compacted = self._flush_locked()
+        if compacted:
+            self._collect()
+
+    def compact(self) -> None:
+        """Fold all log segments into a new snapshot."""
+        with self._io_lock:
+            self._flush_locked()
+            self._compact_locked()
+        self._collect()
+
+    def close(self) -> None:
+        """Flush queued records and stop the writer thread."""
+        self._release()
+        self._closed = True
+        self._wakeup.set()
+        if self._writer is not None and self._writer is not threading.current_thread():
+            self._writer.join()
+        self.flush()
+        self._close_segment()
+
+    def _close_segment(self) -> None:
+        with self._io_lock:
+            if self._segment_file is not None:
+                self._segment_file.close()
+                self._segment_file = None
+
+    def _start_writer(self) -> None:
+        with self._io_lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(
+                target=self._run, name="error-learner-store", daemon=True
+            )
+            self._writer.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                self.logger.error(f"Error writing to {self.path}: {e}")
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.path / f"{SEGMENT_PREFIX}{segment:06d}{SEGMENT_SUFFIX}"
+
+    def _segments(self) -> List[int]:
+        segments = []
+        for path in self.path.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"):
+            try:
+                segments.append(int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+            except ValueError:
+                continue
+        return sorted(segments)
+
+    def _load_locked(self) -> None:
+        if self._history is not None:
+            return
+        history: Dict[str, Dict[Tuple[str, int], Dict[str, Any]]] = {}
+        compacted = 0
+        snapshot = self.path / SNAPSHOT_NAME
+        if snapshot.exists():
+            with open(snapshot, "r") as f:
+                data = json.load(f)
+            compacted = data.get("segment", 0)
+            for key, entries in data.get("history", {}).items():
+                history[key] = {(e["error_type"], e["line"]): e for e in entries}
+
+        segments = [s for s in self._segments() if s > compacted]
+        for segment in segments:
+            with open(self._segment_path(segment), "r") as f:
+                for line in f:
+                    try:
+                        merge_record(history, json.loads(line))
+                    except (ValueError, KeyError):
+                        # A torn write at the end of a segment
+                        continue
+                    self._records_since_compact += 1
+
+        self._history = history
+        self._segment = max([compacted] + segments) + 1
+
+    def _flush_locked(self) -> bool:
+        """Write queued records; returns whether the log was compacted."""
+        if not self._pending:
+            return False
+        self._load_locked()
+
+        # Coalesce repeats of the same error within the batch into one record
+        batch: Dict[Tuple[str, str, int], Dict[str, Any]] = {}
+        while self._pending:
+            record = self._pending.popleft()
+            batch_key = (record["key"], record["error_type"], record["line"])
+            existing = batch.get(batch_key)
+            if existing is not None:
+                existing["count"] += record["count"]
+                existing["timestamp"] = record["timestamp"]
+            else:
+                batch[batch_key] = dict(record)
+
+        if self._segment_file is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._segment_file = open(self._segment_path(self._segment), "a")
+        self._segment_file.write(
+            "".join(json.dumps(record) + "\n" for record in batch.values())
+        )
+        self._segment_file.flush()
+
+        for record in batch.values():
+            merge_record(self._history, record)
+        self._records_since_compact += len(batch)
+        if self._records_since_compact >= self.compact_every:
+            self._compact_locked()
+            return True
+        return False
+
+    def _compact_locked(self) -> None:
+        self._load_locked()
+        self.path.mkdir(parents=True, exist_ok=True)
+        if self._segment_file is not None:
+            self._segment_file.close()
+            self._segment_file = None
+
+        # Everything up to the current segment is folded into the snapshot
+        compacted = self._segment
+        self._segment += 1
+        tmp_path = self.path / (SNAPSHOT_NAME + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "segment": compacted,
+                "history": {key: list(entries.values())
+                            for key, entries in self._history.items()},
+            }, f)
+        os.replace(tmp_path, self.path / SNAPSHOT_NAME)
+        # The old segments go once the query index has read them, see _collect()
+        self._compacted = compacted
+        self._records_since_compact = 0
+
+    def _collect(self) -> None:
+        """Update the query index, then delete the compacted segments."""
+        # Outside the I/O lock: the index may have to wait for a reader's
+        # SQLite lock, and records must not wait with it
+        with self._collect_lock:
+            compacted = self._compacted
+            if compacted is None or not self._sync_index(compacted):
+                # Kept for the next compaction to try again
+                return
+            for segment in self._segments():
+                if segment <= compacted:
+                    try:
+                        self._segment_path(segment).unlink()
+                    except FileNotFoundError:
+                        pass
+            if self._compacted == compacted:
+                self._compacted = None
+
+    def _sync_index(self, compacted: int) -> bool:
+        import sqlite3
+        from .index import ErrorIndex
+
+        index = ErrorIndex(str(self.path))
+        try:
+            index.refresh()
+            index.mark_compacted(compacted)
+            return True
+        except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+            self.logger.warning(f"Could not update the query index in {self.path}: {e}")
+            return False
+        finally:
+            index.close() 
\ No newline at end of file
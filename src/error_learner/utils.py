@@ -3,7 +3,9 @@ Utility functions for error tracking and analysis.
 """
 
 import logging
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
+
+from .sketch import ErrorSketch
 
 def setup_logging(name: str) -> logging.Logger:
     """
@@ -26,16 +28,20 @@ def setup_logging(name: str) -> logging.Logger:
         logger.setLevel(logging.INFO)
     return logger
 
-def get_error_stats(error_history: Dict[str, List[Dict]]) -> Dict[str, Union[int, Dict[str, int]]]:
+def get_error_stats(error_history: Union[Dict[str, List[Dict]], ErrorSketch]) -> Dict[str, Any]:
     """
     Get statistics about tracked errors.
     
     Args:
-        error_history: Dictionary mapping function names to lists of error info
+        error_history: Dictionary mapping function names to lists of error info,
+            or the ErrorSketch of a tracker in approximate mode
         
     Returns:
-        Dictionary with error statistics
+        Dictionary with error statistics; from a sketch, totals are exact and
+        a 'top_errors' list of the most frequent errors is included
     """
+    if isinstance(error_history, ErrorSketch):
+        return error_history.stats()
     stats = {"total_errors": 0, "error_types": {}}
     for errors in error_history.values():
         for error in errors:
@@ -92,4 +92,62 @@ def risky_function():
         # Check results
         assert file_path in issues
         assert len(issues[file_path]) > 0
-        assert any(i['type'] == 'KeyError' for i in issues[file_path]) 
\ No newline at end of file
+        assert any(i['type'] == 'KeyError' for i in issues[file_path]) 
+
+def test_parallel_workspace_analysis_matches_serial(tmp_path):
+    """Test that the process pool produces the same results as the serial path."""
+    for i in range(10):
+        (tmp_path / f"module_{i}.py").write_text(
+            f"def f(data):\n    return data['k{i}'] / {i}\n"
+        )
+    (tmp_path / "clean.py").write_text("x = 1\n")
+    
+    try:
+        parallel = analyzer.analyze_workspace(str(tmp_path), workers=2, chunk_size=3)
+    finally:
+        analyzer.close()
+    serial = analyzer.analyze_workspace(str(tmp_path))
+    
+    assert parallel == serial
+    assert list(parallel) == list(serial)
+    assert len(parallel) == 10
+
+def test_file_error_lookups(tmp_path):
+    """Test the per-file and per-line error history lookups."""
+    file_path = str(tmp_path / 'indexed.py')
+    tracker._track_error(KeyError, "'a'", 'first', 4, file_path)
+    tracker._track_error(KeyError, "'a'", 'first', 4, file_path)
+    tracker._track_error(TypeError, "bad operand", 'second', 9, file_path)
+    
+    errors = analyzer._get_file_errors(file_path)
+    assert sorted((e['error_type'], e['line'], e['count']) for e in errors) == [
+        ('KeyError', 4, 2), ('TypeError', 9, 1)
+    ]
+    assert analyzer._has_key_errors(file_path, 4)
+    assert not analyzer._has_key_errors(file_path, 9)
+    assert analyzer._has_type_errors(file_path, 9)
+    assert analyzer._get_file_errors(str(tmp_path / 'other.py')) == []
+
+def test_iter_workspace_streams_results(tmp_path, capsys):
+    """Test that workspace results are streamed without debug output."""
+    for i in range(3):
+        (tmp_path / f"module_{i}.py").write_text("def f(x):\n    return 1 / x\n")
+    (tmp_path / "clean.py").write_text("x = 1\n")
+    
+    results = analyzer.iter_workspace(str(tmp_path))
+    file_path, issues = next(results)
+    assert file_path.endswith('.py')
+    assert issues[0]['type'] == 'ZeroDivisionError'
+    assert len(list(results)) == 2
+    assert capsys.readouterr().out == ""
+
+def test_aiter_workspace(tmp_path):
+    """Test the async variant of the streaming API."""
+    import asyncio
+    (tmp_path / "module.py").write_text("def f(x):\n    return 1 / x\n")
+    
+    async def collect():
+        return [item async for item in analyzer.aiter_workspace(str(tmp_path))]
+    
+    results = asyncio.run(collect())
+    assert [path for path, _ in results] == [str(tmp_path / "module.py")]
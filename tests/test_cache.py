@@ -0,0 +1,67 @@
+"""
+Tests for the analysis cache.
+"""
+
+import os
+import pytest
+from error_learner.analyzer import PatternAnalyzer
+from error_learner.cache import AnalysisCache
+
+@pytest.fixture
+def counting_analyzer(tmp_path, monkeypatch):
+    """Analyzer with a cache that counts how often files are parsed."""
+    analyzer = PatternAnalyzer(cache=AnalysisCache(str(tmp_path / 'cache.json')))
+    analyzer.parsed = 0
+    original = analyzer._analyze_ast
+    
+    def counting(*args, **kwargs):
+        analyzer.parsed += 1
+        return original(*args, **kwargs)
+    
+    monkeypatch.setattr(analyzer, '_analyze_ast', counting)
+    return analyzer
+
+def test_unchanged_file_is_not_reparsed(counting_analyzer, tmp_path):
+    """Test that a second analysis of an unchanged file uses the cache."""
+    source = tmp_path / 'module.py'
+    source.write_text("def f(x):\n    return 1 / x\n")
+    
+    first = counting_analyzer.analyze_file(str(source))
+    second = counting_analyzer.analyze_file(str(source))
+    assert first == second
+    assert counting_analyzer.parsed == 1
+    
+    # Touching the file without changing it is caught by the content hash
+    os.utime(source, ns=(0, 0))
+    assert counting_analyzer.analyze_file(str(source)) == first
+    assert counting_analyzer.parsed == 1
+
+def test_changed_file_or_errors_invalidate(counting_analyzer, tmp_path):
+    """Test that content and error history changes cause a re-parse."""
+    source = tmp_path / 'module.py'
+    source.write_text("def f(x):\n    return 1 / x\n")
+    counting_analyzer.analyze_file(str(source))
+    
+    source.write_text("def f(x):\n    return x['key'] / x\n")
+    issues = counting_analyzer.analyze_file(str(source))
+    assert counting_analyzer.parsed == 2
+    assert any(i['type'] == 'KeyError' for i in issues)
+    
+    errors = [{'error_type': 'TypeError', 'line': 2, 'count': 1}]
+    counting_analyzer.analyze_file(str(source), errors)
+    assert counting_analyzer.parsed == 3
+
+def test_cache_persists_and_evicts(tmp_path):
+    """Test that the cache survives a restart and stays bounded."""
+    cache_path = str(tmp_path / 'cache.json')
+    analyzer = PatternAnalyzer(cache=AnalysisCache(cache_path, max_entries=2))
+    for i in range(3):
+        source = tmp_path / f'module_{i}.py'
+        source.write_text("x = 1 / 2\n")
+        analyzer.analyze_file(str(source))
+    analyzer.close()
+    
+    reloaded = AnalysisCache(cache_path, max_entries=2)
+    assert len(reloaded) == 2
+    assert str(tmp_path / 'module_0.py') not in reloaded._entries
+    assert str(tmp_path / 'module_2.py') in reloaded._entries
@@ -0,0 +1,208 @@
+"""
+Tests for process-wide exception capture.
+"""
+
+import os
+import threading
+import pytest
+from error_learner import monitoring
+from error_learner.capture import GlobalCapture
+from error_learner.extension import ExtensionTracker
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+@pytest.fixture
+def tracker():
+    """Fixture providing a quiet ExtensionTracker."""
+    tracker = ExtensionTracker()
+    tracker.logger.disabled = True
+    yield tracker
+    tracker.disable_global_capture()
+
+def code_in(path):
+    """Compile a code object that claims to come from a path."""
+    return compile("x = 1", path, "exec")
+
+def test_filters(tracker):
+    """Test include and exclude prefixes, and per-code overrides."""
+    capture = GlobalCapture(tracker, include=["/srv/app"], exclude=["/srv/app/vendor"])
+    assert capture.wants(code_in("/srv/app/views.py"))
+    assert not capture.wants(code_in("/srv/app/vendor/lib.py"))
+    assert not capture.wants(code_in("/srv/other.py"))
+    assert not capture.wants(code_in("<string>"))
+    
+    noisy = code_in("/srv/app/noisy.py")
+    capture.disable(noisy)
+    assert not capture.wants(noisy)
+    assert capture.wants(code_in("/srv/app/noisy.py"))
+    
+    other = code_in("/srv/other.py")
+    capture.enable(other)
+    assert capture.wants(other)
+
+def test_default_excludes_stdlib(tracker):
+    """Test that the standard library is not captured by default."""
+    capture = GlobalCapture(tracker)
+    assert not capture.wants(os.path.join.__code__)
+    assert capture.wants(test_default_excludes_stdlib.__code__)
+
+def test_module_filter(tracker):
+    """Test capturing by package name."""
+    capture = GlobalCapture(tracker, modules=["error_learner"], exclude=[])
+    assert capture.wants(ExtensionTracker._track_error.__code__)
+    assert not capture.wants(test_module_filter.__code__)
+
+@pytest.mark.skipif(not monitoring.AVAILABLE, reason="sys.monitoring needs Python 3.12+")
+def test_handled_exceptions_are_captured(tracker):
+    """Test that caught exceptions are recorded once, where they were raised."""
+    def inner():
+        return {}['missing']
+    
+    def outer():
+        try:
+            inner()
+        except KeyError:
+            return None
+    
+    assert tracker.enable_global_capture(include=[HERE]).mode == "monitoring"
+    outer()
+    tracker.disable_global_capture()
+    outer()
+    
+    history = tracker.error_history
+    assert list(history) == [f"{__file__}:inner"]
+    assert history[f"{__file__}:inner"][0]['count'] == 1
+
+@pytest.mark.skipif(not monitoring.AVAILABLE, reason="sys.monitoring needs Python 3.12+")
+def test_library_exceptions_count_where_the_application_called(tracker):
+    """Test that exceptions raised in excluded code are recorded in the first wanted frame."""
+    import json
+    
+    def parse(text):
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+    
+    tracker.enable_global_capture(include=[HERE])
+    parse("{not json")
+    # Raised and handled inside the standard library: not the application's
+    os.path.exists("/nonexistent/file")
+    tracker.disable_global_capture()
+    
+    entries = tracker.error_history[f"{__file__}:parse"]
+    assert [(e['error_type'], e['count']) for e in entries] == [('JSONDecodeError', 1)]
+    assert entries[0]['line'] == parse.__code__.co_firstlineno + 2
+    assert list(tracker.error_history) == [f"{__file__}:parse"]
+
+@pytest.mark.skipif(monitoring.AVAILABLE, reason="fallback for Python < 3.12")
+def test_fallback_captures_thread_errors(tracker):
+    """Test that uncaught exceptions in threads are recorded without monitoring."""
+    def fail():
+        raise ValueError("in thread")
+    
+    previous = threading.excepthook
+    threading.excepthook = lambda args: None
+    try:
+        assert tracker.enable_global_capture(include=[HERE]).mode == "hooks"
+        thread = threading.Thread(target=fail)
+        thread.start()
+        thread.join()
+        tracker.disable_global_capture()
+    finally:
+        threading.excepthook = previous
+    
+    assert tracker.error_history[f"{__file__}:fail"][0]['error_type'] == 'ValueError'
+
+@pytest.mark.parametrize("use_monitoring", [False, True])
+def test_tracked_errors_are_recorded_once(tracker, use_monitoring):
+    """Test that capture, @track and the exception hook record an error once per function."""
+    import sys
+    
+    tracker.use_monitoring = use_monitoring and monitoring.AVAILABLE
+    hook = sys.excepthook
+    tracker.original_hook = lambda *args: None
+    
+    def inner():
+        raise KeyError("inner")
+    
+    @tracker.track
+    def direct():
+        raise ValueError("direct")
+    
+    @tracker.track
+    def nested():
+        inner()
+    
+    tracker.enable_global_capture(include=[HERE])
+    for func, error_type in ((direct, ValueError), (nested, KeyError)):
+        try:
+            func()
+        except error_type:
+            # As if uncaught in the main thread
+            hook(*sys.exc_info())
+    tracker.disable_global_capture()
+    
+    history = tracker.error_history
+    counts = {key.rsplit(":", 1)[1]: sum(e['count'] for e in entries)
+              for key, entries in history.items()}
+    if monitoring.AVAILABLE:
+        assert counts == {"direct": 1, "inner": 1, "nested": 1}
+    else:
+        assert counts == {"direct": 1, "nested": 1}
+
+def test_captures_of_two_trackers_are_independent(tracker):
+    """Test that stopping one tracker's capture leaves another's running."""
+    other = ExtensionTracker()
+    other.logger.disabled = True
+    
+    def fail():
+        try:
+            {}['missing']
+        except KeyError:
+            pass
+    
+    def run_in_thread():
+        # Uncaught in a thread, for the fallback without sys.monitoring
+        thread = threading.Thread(target=lambda: {}['missing'])
+        thread.start()
+        thread.join()
+    
+    raise_error = fail if monitoring.AVAILABLE else run_in_thread
+    previous = threading.excepthook
+    threading.excepthook = lambda args: None
+    try:
+        tracker.enable_global_capture(include=[HERE])
+        other.enable_global_capture(include=[HERE])
+        raise_error()
+        tracker.disable_global_capture()
+        raise_error()
+    finally:
+        other.disable_global_capture()
+        threading.excepthook = previous
+    
+    def count(t):
+        return sum(e['count'] for entries in t.error_history.values() for e in entries)
+    assert (count(tracker), count(other)) == (1, 2)
+
+
+@pytest.mark.skipif(monitoring.AVAILABLE, reason="fallback for Python < 3.12")
+def test_fallback_records_library_errors_in_the_caller(tracker):
+    """Test that the thread hook records an error in the innermost wanted frame."""
+    import json
+    
+    def load():
+        json.loads("{not json")
+    
+    previous = threading.excepthook
+    threading.excepthook = lambda args: None
+    try:
+        tracker.enable_global_capture(include=[HERE])
+        thread = threading.Thread(target=load)
+        thread.start()
+        thread.join()
+        tracker.disable_global_capture()
+    finally:
+        threading.excepthook = previous
+    
+    assert tracker.error_history[f"{__file__}:load"][0]['error_type'] == 'JSONDecodeError' 
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""
+Tests for the command-line interface.
+"""
+
+import argparse
+import json
+import pytest
+from error_learner.cli import main, parse_time
+from error_learner.store import ErrorStore
+
+@pytest.fixture
+def store_path(tmp_path):
+    store = ErrorStore(str(tmp_path))
+    for key, error_type, line, count in [('app.py:handler', 'KeyError', 3, 4),
+                                         ('app.py:load', 'ValueError', 8, 1)]:
+        store.append({
+            'key': key,
+            'error_type': error_type,
+            'message': 'boom',
+            'line': line,
+            'file': 'app.py',
+            'timestamp': '2024-04-13T12:00:00',
+            'count': count
+        })
+    store.close()
+    return str(tmp_path)
+
+def test_stats_json(store_path, capsys):
+    """Test that stats reads the persisted history."""
+    assert main(['--store', store_path, 'stats', '--json']) == 0
+    stats = json.loads(capsys.readouterr().out)
+    assert stats['total_errors'] == 5
+    assert stats['error_types'] == {'KeyError': 4, 'ValueError': 1}
+    assert stats['top_errors'][0]['function'] == 'handler'
+
+def test_stats_filters(store_path, capsys):
+    """Test filtering and listing the top errors as text."""
+    assert main(['--store', store_path, 'stats', '--type', 'ValueError', '--top', '1']) == 0
+    out = capsys.readouterr().out
+    assert 'Total errors: 1' in out
+    assert 'app.py:8 in load' in out
+    assert 'handler' not in out
+
+def test_stats_time_range(store_path, capsys):
+    """Test that a range without errors reports none."""
+    assert main(['--store', store_path, 'stats', '--since', '2024-05-01', '--json']) == 0
+    assert json.loads(capsys.readouterr().out)['total_errors'] == 0
+
+def test_parse_time():
+    """Test relative and absolute time arguments."""
+    assert parse_time('2h', now=10000.0) == 2800.0
+    assert parse_time('1d', now=100000.0) == 13600.0
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_time('yesterday')
+
+def test_no_command(capsys):
+    """Test that running without a command prints help."""
+    assert main([]) == 1
+    assert 'stats' in capsys.readouterr().out 
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Tests for cross-process error aggregation.
+"""
+
+import multiprocessing
+import pytest
+from multiprocessing.connection import Client
+from error_learner import collector as collector_module
+from error_learner.collector import CollectorClient, ErrorCollector
+from error_learner.extension import ExtensionTracker, get_error_count, get_error_stats, get_tracker
+
+def _worker(address, authkey, line):
+    tracker = ExtensionTracker()
+    tracker.connect_collector(address, authkey)
+    for _ in range(2):
+        tracker._track_error(KeyError, "'user'", 'handler', line, 'app.py')
+    tracker._collector.close()
+
+@pytest.fixture
+def collector():
+    collector = ErrorCollector().start()
+    yield collector
+    collector.close()
+
+def test_merges_errors_from_processes(collector):
+    """Test that errors from several processes end up in one history."""
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        pytest.skip("fork start method not available")
+    ctx = multiprocessing.get_context('fork')
+    workers = [ctx.Process(target=_worker, args=(collector.address, collector.authkey, line))
+               for line in (3, 3, 5)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    
+    entries = {e['line']: e['count'] for e in collector.error_history['app.py:handler']}
+    assert entries == {3: 4, 5: 2}
+
+def test_threshold_counts_other_processes(collector):
+    """Test that the recurrence threshold includes errors seen elsewhere."""
+    collector.merge([{
+        'key': 'app.py:handler',
+        'error_type': 'KeyError',
+        'message': "'user'",
+        'line': 3,
+        'file': 'app.py',
+        'timestamp': '2024-04-13T12:00:00',
+        'count': 5
+    }])
+    tracker = ExtensionTracker()
+    tracker.connect_collector(collector.address, collector.authkey)
+    tracker._track_error(KeyError, "'user'", 'handler', 3, 'app.py')
+    tracker._collector.flush()
+    
+    assert tracker._remote_offsets[('app.py:handler', 'KeyError')] == 5
+    assert tracker._collector.history()['app.py:handler'][0]['count'] == 6
+    tracker._collector.close()
+
+
+RECORD = {
+    'key': 'app.py:handler',
+    'error_type': 'KeyError',
+    'message': "'user'",
+    'line': 3,
+    'file': 'app.py',
+    'timestamp': '2024-04-13T12:00:00',
+    'count': 1
+}
+
+class _LostReply:
+    """A connection that loses the first reply of the test."""
+    lost = False
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def send(self, obj):
+        self.conn.send(obj)
+
+    def recv(self):
+        if not _LostReply.lost:
+            _LostReply.lost = True
+            self.conn.recv()
+            raise EOFError("connection lost")
+        return self.conn.recv()
+
+    def close(self):
+        self.conn.close()
+
+def test_resent_batch_is_merged_once(collector, monkeypatch):
+    """Test that a batch sent again after a lost reply is not counted twice."""
+    monkeypatch.setattr(_LostReply, 'lost', False)
+    monkeypatch.setattr(collector_module, 'Client',
+                        lambda *args, **kwargs: _LostReply(Client(*args, **kwargs)))
+    client = CollectorClient(collector.address, collector.authkey)
+    client.append(dict(RECORD))
+    with pytest.raises(EOFError):
+        client.flush()
+    client.append(dict(RECORD, line=5))
+    client.flush()
+    
+    entries = {e['line']: e['count'] for e in collector.error_history['app.py:handler']}
+    assert entries == {3: 1, 5: 1}
+    client.close()
+
+def test_stats_fall_back_when_collector_is_down(collector, monkeypatch, caplog):
+    """Test that the module helpers use local history if the collector is unreachable."""
+    tracker = ExtensionTracker()
+    monkeypatch.setattr(tracker.logger, 'disabled', False)
+    tracker.connect_collector(collector.address, collector.authkey)
+    tracker._track_error(KeyError, "'user'", 'handler', 3, 'app.py')
+    tracker._collector.flush()
+    collector.close()
+    tracker._collector._conn = None
+    monkeypatch.setattr('error_learner.extension._tracker', tracker)
+    
+    assert get_tracker() is tracker
+    assert get_error_count('app.py', 'handler') == 1
+    assert list(get_error_stats()) == ['app.py:handler']
+    assert 'Collector unreachable' in caplog.text
+ 
\ No newline at end of file
@@ -2,6 +2,8 @@
 Tests for the core error tracking functionality.
 """
 
+import functools
+import sys
 import pytest
 from datetime import datetime
 from error_learner.core import ErrorTracker, track, ErrorInfo, _tracker
@@ -60,4 +62,211 @@ def test_global_tracker():
         test_function()
     
     # The global tracker should have recorded the error
-    assert "test_function" in _tracker.error_history 
\ No newline at end of file
+    assert "test_function" in _tracker.error_history 
+
+def test_background_recording(tracker):
+    """Test that background recording produces the same history."""
+    tracker.enable_background_recording()
+    
+    @tracker.track
+    def divide_by_zero():
+        return 1/0
+    
+    for _ in range(3):
+        with pytest.raises(ZeroDivisionError):
+            divide_by_zero()
+    
+    tracker.disable_background_recording()
+    errors = tracker.error_history["divide_by_zero"]
+    assert len(errors) == 3
+    assert errors[0].error_type == ZeroDivisionError
+    assert errors[0].error_message == "division by zero"
+    assert errors[2].fix_suggestion is not None
+
+def test_background_recording_drops_on_overflow():
+    """Test that the drop policy never blocks the raising thread."""
+    from error_learner.pipeline import RecordingPipeline
+    import threading
+    
+    release = threading.Event()
+    pipeline = RecordingPipeline(lambda record: release.wait(), max_queue=2, overflow='drop')
+    accepted = [pipeline.submit(i) for i in range(10)]
+    release.set()
+    pipeline.close()
+    
+    assert accepted.count(False) == pipeline.dropped
+    assert pipeline.dropped >= 7
+
+def test_coroutine_errors_recorded_off_loop(tracker, monkeypatch):
+    """Test that errors raised while a coroutine runs are recorded, off the loop thread."""
+    import asyncio
+    import inspect
+    import threading
+    
+    threads = []
+    original = tracker._record
+    
+    def record(*args):
+        threads.append(threading.get_ident())
+        original(*args)
+    
+    monkeypatch.setattr(tracker, '_record', record)
+    
+    @tracker.track
+    async def fetch(fail):
+        await asyncio.sleep(0)
+        if fail:
+            raise ConnectionError("refused")
+        return "ok"
+    
+    async def main():
+        assert await fetch(False) == "ok"
+        with pytest.raises(ConnectionError):
+            await fetch(True)
+        return threading.get_ident()
+    
+    loop_thread = asyncio.run(main())
+    assert inspect.iscoroutinefunction(fetch)
+    assert [e.error_type for e in tracker.error_history["fetch"]] == [ConnectionError]
+    assert threads and loop_thread not in threads
+
+@pytest.mark.skipif(sys.version_info < (3, 11), reason="TaskGroup needs Python 3.11+")
+def test_task_group_errors_unpacked(tracker):
+    """Test that each error in an exception group is recorded."""
+    import asyncio
+    
+    async def fail(error):
+        raise error
+    
+    @tracker.track
+    async def run_all():
+        async with asyncio.TaskGroup() as group:
+            group.create_task(fail(KeyError("a")))
+            group.create_task(fail(ValueError("b")))
+    
+    with pytest.raises(BaseExceptionGroup):
+        asyncio.run(run_all())
+    assert sorted(e.error_type.__name__ for e in tracker.error_history["run_all"]) == ["KeyError", "ValueError"]
+
+def test_async_generator_errors(tracker):
+    """Test that async generators are tracked and still receive sent values."""
+    import asyncio
+    
+    @tracker.track
+    async def echo():
+        value = yield "ready"
+        while value is not None:
+            if value == "bad":
+                raise ValueError(value)
+            value = yield value.upper()
+    
+    async def main():
+        gen = echo()
+        assert await gen.asend(None) == "ready"
+        assert await gen.asend("hi") == "HI"
+        with pytest.raises(ValueError):
+            await gen.asend("bad")
+    
+    asyncio.run(main())
+    assert [e.error_type for e in tracker.error_history["echo"]] == [ValueError]
+
+def test_queued_errors_do_not_keep_frames_alive(tracker):
+    """Test that an error waiting in the queue does not pin its traceback's locals."""
+    import gc
+    import threading
+    import weakref
+    
+    class Payload:
+        pass
+    
+    release = threading.Event()
+    tracker.enable_background_recording()
+    tracker._pipeline.handler = lambda record: release.wait(5) and tracker._record_background(record)
+    
+    @tracker.track
+    def fail():
+        payload = Payload()
+        refs.append(weakref.ref(payload))
+        raise ValueError("queued")
+    
+    refs = []
+    with pytest.raises(ValueError):
+        fail()
+    gc.collect()
+    assert refs[0]() is None
+    
+    release.set()
+    tracker.disable_background_recording()
+    assert tracker.error_history["fail"][0].error_message == "queued"
+
+def test_error_info_timestamp():
+    """Test that ErrorInfo keeps epoch seconds and converts them on access."""
+    now = datetime(2024, 4, 13, 12, 0, 0, 250000)
+    from_datetime = ErrorInfo(now, KeyError, "'k'", 'lookup', 10, function_line=8)
+    from_epoch = ErrorInfo(now.timestamp(), KeyError, "'k'", 'lookup', 10, function_line=8)
+    assert from_datetime == from_epoch
+    assert from_epoch.epoch == now.timestamp()
+    assert from_epoch.timestamp == now
+    assert from_epoch.function_name is sys.intern('lookup')
+    assert from_epoch != ErrorInfo(now, KeyError, "'k'", 'lookup', 11)
+    assert not hasattr(from_epoch, '__dict__')
+
+
+@pytest.mark.parametrize("use_monitoring", [False, True])
+def test_nested_tracked_functions_each_record(tracker, use_monitoring):
+    """Test that an error is recorded by every tracked function it leaves."""
+    tracker.use_monitoring = use_monitoring
+    
+    @tracker.track
+    def inner():
+        raise KeyError('k')
+    
+    @tracker.track
+    def outer():
+        inner()
+    
+    for _ in range(3):
+        with pytest.raises(KeyError):
+            outer()
+    
+    assert len(tracker.error_history["inner"]) == 3
+    assert len(tracker.error_history["outer"]) == 3
+    assert tracker.error_history["outer"][-1].fix_suggestion is not None
+
+@pytest.mark.parametrize("use_monitoring", [False, True])
+def test_track_callables_without_code(tracker, use_monitoring):
+    """Test that partials and callable instances are wrapped and named."""
+    tracker.use_monitoring = use_monitoring
+    
+    def divide(a, b):
+        return a / b
+    
+    class Lookup:
+        def __call__(self, key):
+            return {}[key]
+    
+    half = tracker.track(functools.partial(divide, b=0))
+    lookup = tracker.track(Lookup())
+    with pytest.raises(ZeroDivisionError):
+        half(1)
+    with pytest.raises(KeyError):
+        lookup('k')
+    
+    assert len(tracker.error_history["partial"]) == 1
+    assert len(tracker.error_history["Lookup"]) == 1
+
+
+def test_track_coroutine_partial(tracker):
+    """Test that a partial of a coroutine function is tracked as a coroutine."""
+    import asyncio
+    
+    async def fetch(host):
+        await asyncio.sleep(0)
+        raise ConnectionError(host)
+    
+    fetch_local = tracker.track(functools.partial(fetch, 'localhost'))
+    with pytest.raises(ConnectionError):
+        asyncio.run(fetch_local())
+    
+    assert [e.error_type for e in tracker.error_history["partial"]] == [ConnectionError]
+ 
\ No newline at end of file
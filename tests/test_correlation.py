@@ -0,0 +1,124 @@
+"""
+Tests for correlating issues with error history.
+"""
+
+import ast
+import pytest
+from error_learner.analyzer import PatternAnalyzer
+from error_learner.correlation import ErrorCorrelation, function_spans
+from error_learner.extension import ExtensionTracker
+from error_learner.store import ErrorStore
+
+SOURCE = '''import os
+
+
+def load(d, k):
+    return d[k]
+
+
+@cached
+def ratio(a, b):
+    total = a / b
+    return total / 2
+
+
+class Report:
+    def mean(self, values):
+        def weight(v):
+            return v / 3
+        return sum(values) / len(values)
+'''
+
+# SOURCE with three lines added at the top
+MOVED = "import sys\nimport json\n\n" + SOURCE
+
+def _error(error_type, line, count, function=None, function_line=None):
+    return {'error_type': error_type, 'line': line, 'count': count,
+            'function': function, 'function_line': function_line}
+
+def test_function_spans():
+    """Test that functions are found at any depth, decorators included."""
+    spans = function_spans(ast.parse(SOURCE).body)
+    assert spans == [('load', 4, 5), ('ratio', 8, 11), ('mean', 15, 18), ('weight', 16, 17)]
+    assert function_spans(ast.parse(SOURCE).body, delta=10)[0] == ('load', 14, 15)
+
+def test_rank_prunes_and_orders_by_failures():
+    """Test that issues are ranked by failures at their line, then in their function."""
+    analyzer = PatternAnalyzer()
+    tree = ast.parse(SOURCE)
+    issues = analyzer._analyze_ast(tree, 'report.py', [])
+    correlation = ErrorCorrelation([
+        _error('ZeroDivisionError', 11, 5),
+        _error('ZeroDivisionError', 10, 2),
+        _error('ZeroDivisionError', 17, 9),
+    ])
+    ranked = correlation.rank(issues, function_spans(tree.body))
+    assert [(i['line'], i['failures'], i['function_failures']) for i in ranked] == [
+        (17, 9, 9), (11, 5, 7), (10, 2, 7),
+    ]
+    # The KeyError in load and the division in mean never failed
+    assert correlation.rank(issues, function_spans(tree.body), top=1)[0]['line'] == 17
+    assert ErrorCorrelation([_error('KeyError', 99, 1)]).rank(issues, function_spans(tree.body)) == []
+
+def test_errors_follow_moved_functions():
+    """Test that errors recorded relative to their function follow it to its new lines."""
+    correlation = ErrorCorrelation([
+        _error('KeyError', 5, 4, 'load', 4),
+        _error('ZeroDivisionError', 11, 1, 'ratio', 8),
+        # Recorded by line only, or for a function that is gone: stays put
+        _error('ZeroDivisionError', 10, 2),
+        _error('KeyError', 40, 3, 'removed', 38),
+    ])
+    located = correlation.locate(function_spans(ast.parse(MOVED).body))
+    assert located == {8: {'KeyError': 4}, 14: {'ZeroDivisionError': 1},
+                       10: {'ZeroDivisionError': 2}, 40: {'KeyError': 3}}
+
+def test_analyzer_top_issues(tmp_path):
+    """Test ranking through the analyzer, in both analysis modes."""
+    path = tmp_path / 'report.py'
+    path.write_text(MOVED)
+    errors = [_error('KeyError', 5, 4, 'load', 4), _error('ZeroDivisionError', 11, 1, 'ratio', 8)]
+
+    analyzer = PatternAnalyzer()
+    top = analyzer.top_issues(str(path), top=5, file_errors=errors)
+    assert [(i['type'], i['line'], i['failures']) for i in top] == [
+        ('KeyError', 8, 4), ('ZeroDivisionError', 14, 1), ('ZeroDivisionError', 13, 0),
+    ]
+    analyzer.enable_incremental()
+    assert analyzer.top_issues(str(path), top=5, file_errors=errors) == top
+    assert analyzer.top_issues(str(path), file_errors=[]) == []
+
+def test_analyzer_ranks_issues_without_running_rules(tmp_path, monkeypatch):
+    """Test that issues already found are ranked as top_issues() ranks them."""
+    path = tmp_path / 'report.py'
+    path.write_text(MOVED)
+    errors = [_error('KeyError', 5, 4, 'load', 4), _error('ZeroDivisionError', 11, 1, 'ratio', 8)]
+    analyzer = PatternAnalyzer()
+    issues = analyzer.analyze_file(str(path), file_errors=errors)
+    top = analyzer.top_issues(str(path), top=5, file_errors=errors)
+
+    def run(*args):
+        raise AssertionError("rules ran again")
+    monkeypatch.setattr(analyzer.engine, 'run', run)
+    assert analyzer.rank_issues(str(path), issues, top=5, file_errors=errors) == top
+    assert analyzer.rank_issues(str(path), issues, file_errors=[]) == []
+
+def test_tracked_errors_record_their_function(tmp_path):
+    """Test that tracked errors carry the function's first line through the store."""
+    store = ErrorStore(str(tmp_path))
+    tracker = ExtensionTracker(store=store)
+
+    @tracker.track
+    def lookup(data):
+        return data['missing']
+
+    with pytest.raises(KeyError):
+        lookup({})
+    store.close()
+
+    # The decorator's line, as in the code object
+    first_line = getattr(lookup, '__wrapped__', lookup).__code__.co_firstlineno
+    errors = ExtensionTracker(store=ErrorStore(str(tmp_path))).get_file_errors(__file__)
+    assert [(e['function'], e['function_line'], e['line'] - e['function_line']) for e in errors] == [
+        ('lookup', first_line, 2)
+    ] 
\ No newline at end of file
@@ -5,6 +5,7 @@ Tests for the Cursor integration module.
 import pytest
 import logging
 from pathlib import Path
+from error_learner.analyzer import get_analyzer
 from error_learner.cursor_integration import CursorAnalyzer
 
 @pytest.fixture
@@ -55,4 +56,45 @@ def test_analyze_workspace(cursor_analyzer, tmp_path, caplog):
     
     cursor_analyzer.analyze_workspace(str(workspace))
     assert any("Analyzing workspace" in record.message for record in caplog.records)
-    assert len([r for r in caplog.records if "Potential issue" in r.message]) == 2 
\ No newline at end of file
+    assert len([r for r in caplog.records if "Potential issue" in r.message]) == 2
+
+def test_analyze_workspace_top_ranks_without_analyzing_again(tmp_path, caplog, monkeypatch):
+    """Test that the top issues of a workspace are ranked from its one analysis."""
+    caplog.set_level(logging.INFO)
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    (workspace / "test1.py").write_text("def test1():\n    return 1/0")
+    analyzer = get_analyzer()
+    runs = []
+    run = analyzer.engine.run
+    monkeypatch.setattr(analyzer.engine, "run", lambda *args: runs.append(args) or run(*args))
+    errors = [{"error_type": "ZeroDivisionError", "line": 2, "count": 3,
+               "function": "test1", "function_line": 1}]
+    monkeypatch.setattr(analyzer, "_get_file_errors", lambda file_path: errors)
+    
+    CursorAnalyzer(top=1).analyze_workspace(str(workspace))
+    assert len(runs) == 1
+    assert len([r for r in caplog.records if "Potential issue" in r.message]) == 1
+
+def test_daemon_handles_save_and_open(cursor_analyzer, tmp_path, caplog):
+    """Test that an attached daemon replaces analysis on save and serves open."""
+    caplog.set_level(logging.INFO)
+    test_file = tmp_path / "test.py"
+    test_file.write_text("def test():\n    return 1/0")
+    
+    class FakeDaemon:
+        notified = []
+        def notify(self, file_path):
+            self.notified.append(file_path)
+        def issues(self, file_path):
+            return [{"line": 2, "type": "ZeroDivisionError", "message": "m", "suggestion": "s"}]
+    
+    daemon = FakeDaemon()
+    cursor_analyzer.attach_daemon(daemon)
+    cursor_analyzer.analyze_on_save(str(test_file))
+    assert daemon.notified == [str(test_file)]
+    assert not any("Analyzing file" in record.message for record in caplog.records)
+    
+    cursor_analyzer.analyze_on_open(str(test_file))
+    assert not any("Analyzing file" in record.message for record in caplog.records)
+    assert any("Potential issue" in record.message for record in caplog.records) 
\ No newline at end of file
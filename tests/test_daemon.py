@@ -0,0 +1,148 @@
+"""
+Tests for the analysis daemon.
+"""
+
+import os
+import threading
+import time
+import pytest
+from error_learner.analyzer import PatternAnalyzer
+from error_learner.daemon import AnalysisDaemon, DaemonClient
+from error_learner.store import ErrorStore
+
+class CountingAnalyzer(PatternAnalyzer):
+    """Analyzer that counts analyses and can be held mid-analysis."""
+    
+    def __init__(self):
+        super().__init__()
+        self.analyzed = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+    
+    def analyze_file(self, file_path, file_errors=None):
+        self.analyzed.append(file_path)
+        self.started.set()
+        self.gate.wait()
+        return super().analyze_file(file_path, file_errors)
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "app.py").write_text("def f(d):\n    return 1/0\n")
+    (tmp_path / "lib.py").write_text("x = 1\n")
+    return tmp_path
+
+@pytest.fixture
+def daemon_factory():
+    daemons = []
+    def create(workspace, **kwargs):
+        kwargs.setdefault("analyzer", CountingAnalyzer())
+        kwargs.setdefault("poll_interval", 3600)
+        daemon = AnalysisDaemon(str(workspace), **kwargs)
+        daemons.append(daemon)
+        return daemon
+    yield create
+    for daemon in daemons:
+        daemon.close()
+
+def test_initial_scan_analyzes_workspace(workspace, daemon_factory):
+    """Test that starting the daemon analyzes every file once."""
+    daemon = daemon_factory(workspace, debounce=0.0).start()
+    assert daemon.wait_idle(5)
+    assert sorted(daemon.analyzer.analyzed) == [str(workspace / "app.py"), str(workspace / "lib.py")]
+    issues = daemon.issues(str(workspace / "app.py"))
+    assert any(issue["type"] == "ZeroDivisionError" for issue in issues)
+
+def test_burst_of_events_is_coalesced(workspace, daemon_factory):
+    """Test that repeated changes to one file schedule a single analysis."""
+    daemon = daemon_factory(workspace, debounce=0.2).start()
+    assert daemon.wait_idle(5)
+    daemon.analyzer.analyzed.clear()
+    
+    for _ in range(20):
+        daemon.notify(str(workspace / "app.py"))
+    assert daemon.wait_idle(5)
+    assert daemon.analyzer.analyzed == [str(workspace / "app.py")]
+
+def test_stale_result_is_discarded(workspace, daemon_factory):
+    """Test that a result finished after a newer change never replaces it."""
+    results = []
+    daemon = daemon_factory(workspace, debounce=0.0,
+                            on_result=lambda path, issues: results.append(issues))
+    daemon.analyzer.gate.clear()
+    app = workspace / "app.py"
+    daemon.notify(str(app))
+    daemon.start()
+    assert daemon.analyzer.started.wait(5)
+    
+    # The file changes while its first analysis is running
+    app.write_text("x = 1\n")
+    daemon.notify(str(app))
+    daemon.analyzer.gate.set()
+    assert daemon.wait_idle(5)
+    assert daemon.issues(str(app)) == []
+    assert all(not any(i["type"] == "ZeroDivisionError" for i in r) for r in results)
+
+def test_poll_detects_changed_and_deleted_files(workspace, daemon_factory):
+    """Test that a scan schedules only changed files and forgets deleted ones."""
+    daemon = daemon_factory(workspace, debounce=0.0).start()
+    assert daemon.wait_idle(5)
+    daemon.analyzer.analyzed.clear()
+    
+    lib = workspace / "lib.py"
+    lib.write_text("y = 2\n")
+    os.utime(lib, ns=(time.time_ns(), time.time_ns() + 10**9))
+    (workspace / "app.py").unlink()
+    daemon.poll()
+    assert daemon.wait_idle(5)
+    assert daemon.analyzer.analyzed == [str(lib)]
+    assert daemon.issues(str(workspace / "app.py")) is None
+
+def test_history_change_triggers_reanalysis(workspace, daemon_factory, tmp_path_factory):
+    """Test that new errors for a file in the store re-analyze it."""
+    store_path = tmp_path_factory.mktemp("store")
+    daemon = daemon_factory(workspace, debounce=0.0, store=str(store_path)).start()
+    assert daemon.wait_idle(5)
+    daemon.analyzer.analyzed.clear()
+    
+    app = str(workspace / "app.py")
+    store = ErrorStore(str(store_path))
+    store.append({'key': f'{app}:f', 'error_type': 'KeyError', 'message': "'k'",
+                  'line': 2, 'file': app, 'timestamp': '2024-04-13T12:00:00', 'count': 1})
+    store.close()
+    daemon.poll()
+    assert daemon.wait_idle(5)
+    assert daemon.analyzer.analyzed == [app]
+
+def test_client_over_socket(workspace, daemon_factory, tmp_path_factory):
+    """Test that results are served to a client."""
+    daemon = daemon_factory(workspace, debounce=0.0).start().serve()
+    info = tmp_path_factory.mktemp("info") / "daemon.json"
+    daemon.write_info(str(info))
+    assert daemon.wait_idle(5)
+    
+    client = DaemonClient.from_info(str(info))
+    try:
+        issues = client.issues(str(workspace / "app.py"))
+        assert any(issue["type"] == "ZeroDivisionError" for issue in issues)
+        client.notify(str(workspace / "lib.py"))
+        assert client.status()["files"] == 2
+    finally:
+        client.close()
+
+def test_top_serves_only_ranked_issues(tmp_path, daemon_factory, tmp_path_factory):
+    """Test that with top set, only issues whose error type failed there are served."""
+    app = tmp_path / "app.py"
+    app.write_text("def f(d):\n    return d['k']\n\n\ndef g(a):\n    return a / 0\n")
+    store_path = tmp_path_factory.mktemp("store")
+    store = ErrorStore(str(store_path))
+    store.append({'key': f'{app}:f', 'error_type': 'KeyError', 'message': "'k'", 'line': 2,
+                  'file': str(app), 'timestamp': '2024-04-13T12:00:00', 'count': 3,
+                  'function_line': 1})
+    store.close()
+    
+    daemon = daemon_factory(tmp_path, analyzer=PatternAnalyzer(), debounce=0.0,
+                            store=str(store_path), top=5).start()
+    assert daemon.wait_idle(5)
+    issues = daemon.issues(str(app))
+    assert [(i['type'], i['line'], i['failures']) for i in issues] == [('KeyError', 2, 3)] 
\ No newline at end of file
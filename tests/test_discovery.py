@@ -0,0 +1,151 @@
+"""
+Tests for workspace file discovery.
+"""
+
+import os
+import shutil
+import subprocess
+import pytest
+from error_learner import discovery
+from error_learner.analyzer import PatternAnalyzer
+from error_learner.discovery import IgnoreRules, WorkspaceScanner
+
+def _tree(root, paths):
+    for path in paths:
+        full = root / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text("x = 1\n")
+
+def _relative(root, files):
+    return sorted(os.path.relpath(f, root).replace(os.sep, "/") for f in files)
+
+def _age(root, seconds=60):
+    """Backdate every directory so its listing can be kept."""
+    for dirpath, _, _ in os.walk(root):
+        st = os.stat(dirpath)
+        os.utime(dirpath, ns=(st.st_atime_ns, st.st_mtime_ns - seconds * 10**9))
+
+@pytest.mark.parametrize("pattern, path, is_dir, expected", [
+    ("*.py", "a/b/c.py", False, True),
+    ("build/", "pkg/build", True, True),
+    ("build/", "pkg/build", False, None),
+    ("/top.py", "top.py", False, True),
+    ("/top.py", "sub/top.py", False, None),
+    ("doc/*.txt", "doc/a.txt", False, True),
+    ("doc/*.txt", "doc/sub/a.txt", False, None),
+    ("**/gen", "a/b/gen", True, True),
+    ("gen/**", "gen/a/b.py", False, True),
+    ("a/**/b", "a/x/y/b", False, True),
+    ("a/**/b", "a/b", False, True),
+    ("test_[!a]*.py", "test_b.py", False, True),
+    ("test_[!a]*.py", "test_a.py", False, None),
+    ("\\#literal", "#literal", False, True),
+])
+def test_ignore_patterns(pattern, path, is_dir, expected):
+    """Test gitignore pattern semantics."""
+    assert IgnoreRules([pattern]).match(path, is_dir) is expected
+
+def test_last_matching_pattern_wins():
+    """Test that negated patterns re-include what earlier patterns ignore."""
+    rules = IgnoreRules(["# comment", "", "*.py", "!keep.py"])
+    assert rules.match("drop.py", False) is True
+    assert rules.match("keep.py", False) is False
+    assert rules.match("data.txt", False) is None
+
+def test_walk_prunes_ignored_directories(tmp_path, monkeypatch):
+    """Test that excluded directories and virtualenvs are never listed."""
+    _tree(tmp_path, [
+        "app/main.py", "app/__pycache__/main.py", "node_modules/pkg/x.py",
+        "build/lib/app.py", "test_venv/lib/site.py", "notes.txt",
+    ])
+    (tmp_path / "test_venv" / "pyvenv.cfg").write_text("home = /usr\n")
+    listed = []
+    scandir = os.scandir
+    monkeypatch.setattr(discovery.os, "scandir", lambda path: listed.append(path) or scandir(path))
+
+    files = WorkspaceScanner(str(tmp_path), use_git=False).files()
+    assert _relative(tmp_path, files) == ["app/main.py"]
+    assert str(tmp_path / "node_modules") not in listed
+    assert str(tmp_path / "build") not in listed
+
+def test_walk_honours_gitignore_files(tmp_path):
+    """Test nested .gitignore files, with deeper ones taking precedence."""
+    _tree(tmp_path, [
+        "a.py", "generated.py", "tools/run.py", "pkg/mod.py", "pkg/keep_generated.py",
+        "pkg/generated.py", "pkg/fixtures/data.py",
+    ])
+    (tmp_path / ".gitignore").write_text("generated.py\nfixtures/\n/tools\n")
+    (tmp_path / "pkg" / ".gitignore").write_text("keep_*.py\n!generated.py\n")
+
+    files = WorkspaceScanner(str(tmp_path), use_git=False).files()
+    assert _relative(tmp_path, files) == ["a.py", "pkg/generated.py", "pkg/mod.py"]
+    files = WorkspaceScanner(str(tmp_path), use_git=False, gitignore=False).files()
+    assert len(files) == 7
+
+def test_custom_excludes_replace_defaults(tmp_path):
+    """Test that exclude patterns are matched from the workspace root."""
+    _tree(tmp_path, ["build/x.py", "src/a.py", "src/a_test.py", "migrations/0001.py"])
+
+    scanner = WorkspaceScanner(str(tmp_path), exclude=["*_test.py", "/migrations/"], use_git=False)
+    assert _relative(tmp_path, scanner.files()) == ["build/x.py", "src/a.py"]
+
+def test_rescan_reuses_unchanged_listings(tmp_path, monkeypatch):
+    """Test that only directories whose mtime changed are listed again."""
+    _tree(tmp_path, ["a/x.py", "b/y.py", "b/c/z.py"])
+    _age(tmp_path)
+    scanner = WorkspaceScanner(str(tmp_path), use_git=False)
+    first = scanner.files()
+
+    listed = []
+    scandir = os.scandir
+    monkeypatch.setattr(discovery.os, "scandir", lambda path: listed.append(path) or scandir(path))
+    assert scanner.files() == first
+    assert listed == []
+
+    (tmp_path / "b" / "c" / "new.py").write_text("y = 2\n")
+    (tmp_path / "a" / "x.py").unlink()
+    files = scanner.files()
+    assert sorted(listed) == [str(tmp_path / "a"), str(tmp_path / "b" / "c")]
+    assert _relative(tmp_path, files) == ["b/c/new.py", "b/c/z.py", "b/y.py"]
+
+def test_changed_gitignore_is_reapplied(tmp_path):
+    """Test that editing a .gitignore filters cached listings again."""
+    _tree(tmp_path, ["a.py", "sub/b.py"])
+    (tmp_path / ".gitignore").write_text("")
+    _age(tmp_path)
+    scanner = WorkspaceScanner(str(tmp_path), use_git=False)
+    assert len(scanner.files()) == 2
+
+    (tmp_path / ".gitignore").write_text("b.py\n")
+    assert _relative(tmp_path, scanner.files()) == ["a.py"]
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_git_listing_matches_walk(tmp_path):
+    """Test that git ls-files finds tracked and untracked files, minus ignored and deleted ones."""
+    _tree(tmp_path, [
+        "tracked.py", "deleted.py", "untracked.py", "ignored.py", "pkg/mod.py",
+        "env/lib/site.py", "node_modules/x.py",
+    ])
+    (tmp_path / "env" / "pyvenv.cfg").write_text("home = /usr\n")
+    (tmp_path / ".gitignore").write_text("ignored.py\n")
+    git = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.run(git + ["init", "-q"], cwd=tmp_path, check=True)
+    subprocess.run(git + ["add", "tracked.py", "deleted.py", "pkg", "node_modules"], cwd=tmp_path, check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "init"], cwd=tmp_path, check=True)
+    (tmp_path / "deleted.py").unlink()
+
+    scanner = WorkspaceScanner(str(tmp_path))
+    files = scanner.files()
+    assert scanner.use_git
+    assert _relative(tmp_path, files) == ["pkg/mod.py", "tracked.py", "untracked.py"]
+    assert sorted(files) == sorted(WorkspaceScanner(str(tmp_path), use_git=False).files())
+
+def test_analyzer_skips_excluded_paths(tmp_path):
+    """Test that workspace analysis uses the analyzer's exclude patterns."""
+    _tree(tmp_path, ["app.py", "generated/schema.py"])
+    for path in ("app.py", "generated/schema.py"):
+        (tmp_path / path).write_text("def f(x):\n    return 1 / x\n")
+
+    assert len(PatternAnalyzer().analyze_workspace(str(tmp_path))) == 2
+    results = PatternAnalyzer(exclude=["generated/"]).analyze_workspace(str(tmp_path))
+    assert list(results) == [str(tmp_path / "app.py")] 
\ No newline at end of file
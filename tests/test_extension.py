@@ -4,7 +4,8 @@ Tests for the automatic error tracking extension.
 
 import pytest
 import sys
-from error_learner.extension import ErrorTracker, tracker
+from datetime import datetime
+from error_learner.extension import ErrorTracker, ExtensionTracker, HistoryEntry, tracker
 
 def test_automatic_error_tracking():
     """Test that errors are automatically tracked without decorators."""
@@ -117,4 +118,106 @@ def test_error_suggestions_content():
     error_key = f"{__file__}:zero_div"
     assert len(tracker.error_history[error_key]) == 3
     suggestion = tracker._generate_fix_suggestion(ZeroDivisionError)
-    assert "division by zero" in suggestion.lower() 
\ No newline at end of file
+    assert "division by zero" in suggestion.lower() 
+
+def test_repeated_error_updates_single_entry():
+    """Test that repeats of the same error at the same line share one entry."""
+    tracker = ExtensionTracker()
+    for _ in range(3):
+        tracker._track_error(KeyError, "'missing'", 'lookup', 10, 'module.py')
+    tracker._track_error(KeyError, "'other'", 'lookup', 12, 'module.py')
+    
+    entries = tracker.error_history['module.py:lookup']
+    assert [e['line'] for e in entries] == [10, 12]
+    assert entries[0]['count'] == 3
+    assert entries[1]['count'] == 1
+    assert tracker._type_counts[('module.py:lookup', 'KeyError')] == 4
+
+def test_concurrent_tracking_keeps_exact_counts():
+    """Test that concurrent threads do not lose counts."""
+    import threading
+    
+    tracker = ExtensionTracker()
+    tracker.logger.disabled = True
+    
+    def worker():
+        for i in range(1000):
+            tracker._track_error(KeyError, "'k'", f'func_{i % 4}', i % 8, 'module.py')
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    history = tracker.error_history
+    assert sum(e['count'] for entries in history.values() for e in entries) == 8000
+    assert sum(tracker._type_counts.values()) == 8000
+
+def test_functions_of_one_file_share_the_line_index():
+    """Test that concurrent new entries at one line of a file keep every error type."""
+    import threading
+    
+    tracker = ExtensionTracker()
+    tracker.logger.disabled = True
+    # Built now, so the threads below update it
+    assert tracker.get_file_errors('module.py') == []
+    types = [type(f'Error{i}', (Exception,), {}) for i in range(8)]
+    barrier = threading.Barrier(len(types))
+    
+    def worker(error_type):
+        barrier.wait()
+        for line in range(200):
+            tracker._track_error(error_type, 'x', f'func_{error_type.__name__}', line, 'module.py')
+    
+    threads = [threading.Thread(target=worker, args=(t,)) for t in types]
+    # Switch threads often, so unguarded updates would interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    
+    assert all(tracker.has_error('module.py', line, t.__name__)
+               for line in range(200) for t in types)
+    assert len(tracker.get_file_errors('module.py')) == 1600
+
+def test_history_entry_round_trip():
+    """Test that entries convert to and from the error_history dict format."""
+    entry = HistoryEntry('KeyError', "'k'", 10, 'module.py', 3, 1713000000.5, 'lookup', 8)
+    as_dict = entry.as_dict()
+    assert as_dict['timestamp'] == datetime.fromtimestamp(1713000000.5).isoformat()
+    assert as_dict['function'] == 'lookup'
+    assert as_dict['function_line'] == 8
+    
+    restored = HistoryEntry.from_dict(as_dict)
+    assert restored.as_dict() == as_dict
+    assert restored.epoch == 1713000000.5
+    assert restored.error_type is sys.intern('KeyError')
+    # Older records carry neither; the function comes from the history key
+    del as_dict['function'], as_dict['function_line']
+    restored = HistoryEntry.from_dict(as_dict, function='lookup')
+    assert (restored.function, restored.function_line) == ('lookup', None)
+
+
+def test_file_indexes_are_built_on_first_query():
+    """Test that the per-file indexes cover entries recorded before they existed."""
+    tracker = ExtensionTracker()
+    tracker.logger.disabled = True
+    tracker._track_error(KeyError, "'user_id'", 'load', 10, 'module.py')
+    tracker._track_error(KeyError, "".join(("'user", "_id'")), 'save', 20, 'module.py')
+    assert tracker._file_index is None
+    
+    assert tracker.has_error('module.py', 10, 'KeyError')
+    tracker._track_error(ValueError, 'bad', 'load', 30, 'module.py')
+    assert [e['line'] for e in tracker.get_file_errors('module.py')] == [10, 20, 30]
+    
+    # Equal messages are stored once
+    first, second = (entries[('KeyError', line)].message
+                     for entries, line in ((tracker._error_history['module.py:load'], 10),
+                                           (tracker._error_history['module.py:save'], 20)))
+    assert first is second 
\ No newline at end of file
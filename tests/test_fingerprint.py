@@ -0,0 +1,110 @@
+"""
+Tests for call path fingerprints.
+"""
+
+import sys
+import pytest
+from error_learner.core import ErrorTracker
+from error_learner.extension import ExtensionTracker
+from error_learner.fingerprint import (
+    call_path, entry_for, fingerprint, hash_path, innermost, location_hash
+)
+
+def fail():
+    raise KeyError("k")
+
+def via_a():
+    fail()
+
+def via_b():
+    fail()
+
+def traceback_of(func):
+    try:
+        func()
+    except KeyError:
+        return sys.exc_info()[2]
+
+def test_same_path_same_fingerprint():
+    """Test that fingerprints depend on the call path only."""
+    first = [fingerprint(traceback_of(via_a)) for _ in range(2)]
+    assert first[0] == first[1]
+    assert fingerprint(traceback_of(via_b)) != first[0]
+
+def test_location_hash_is_stable():
+    """Test that code locations hash the same way in every process."""
+    code = compile("x = 1", "/srv/app.py", "exec")
+    assert location_hash(code) == location_hash(code) == location_hash(
+        compile("x = 1", "/srv/app.py", "exec")
+    )
+    assert location_hash(code) != location_hash(compile("x = 1", "/srv/other.py", "exec"))
+
+def test_entry_for_finds_tracked_frame():
+    """Test locating a function's own frame on a traceback."""
+    tb = traceback_of(via_a)
+    assert entry_for(tb, via_a.__code__).tb_lineno == via_a.__code__.co_firstlineno + 1
+    assert entry_for(tb, None) is innermost(tb)
+    assert innermost(tb).tb_frame.f_code is fail.__code__
+
+@pytest.mark.parametrize("use_monitoring", [False, True])
+def test_line_is_in_tracked_function(use_monitoring):
+    """Test that the recorded line is the tracked function's, not the wrapper's."""
+    tracker = ErrorTracker()
+    tracker.use_monitoring = use_monitoring
+    
+    def outer():
+        fail()
+    
+    tracked = tracker.track(outer)
+    with pytest.raises(KeyError):
+        tracked()
+    assert tracker.error_history["outer"][0].line_number == outer.__code__.co_firstlineno + 1
+
+def test_storm_collapses_into_one_signature():
+    """Test that identical errors share a bucket and other paths get their own."""
+    tracker = ExtensionTracker()
+    tracker.logger.disabled = True
+    
+    @tracker.track
+    def lookup(data):
+        return data["missing"]
+    
+    def from_a():
+        lookup({})
+    
+    def from_b():
+        lookup({})
+    
+    for _ in range(100):
+        with pytest.raises(KeyError):
+            from_a()
+    with pytest.raises(KeyError):
+        from_b()
+    
+    signatures = tracker.get_signatures(f"{__file__}:lookup")
+    assert [s["count"] for s in signatures] == [100, 1]
+    assert {s["error_type"] for s in signatures} == {"KeyError"}
+    assert len(tracker.error_history[f"{__file__}:lookup"]) == 1
+
+def test_location_memo_drops_dead_code():
+    """Test that memoized locations do not keep generated code objects alive."""
+    import gc
+    from error_learner import fingerprint as module
+    
+    code = compile("x = 1", "<generated>", "exec")
+    code_id = id(code)
+    location_hash(code)
+    assert code_id in module._locations
+    del code
+    gc.collect()
+    assert code_id not in module._locations
+
+def test_call_path_keeps_no_frames():
+    """Test that a collected call path hashes like the traceback and holds only code and lines."""
+    tb = traceback_of(via_a)
+    # On one line: callers are mixed in at the line they are currently on
+    path, expected = call_path(tb), fingerprint(tb)
+    assert hash_path(path) == expected
+    assert all(type(code).__name__ == "code" and isinstance(line, int) for code, line in path)
+    assert path[-2:] == [(via_a.__code__, via_a.__code__.co_firstlineno + 1),
+                         (fail.__code__, fail.__code__.co_firstlineno + 1)]
@@ -0,0 +1,140 @@
+"""
+Tests for incremental re-analysis.
+"""
+
+import ast
+import random
+import pytest
+from error_learner.analyzer import PatternAnalyzer
+from error_learner.incremental import DocumentAnalysis
+from error_learner.rules import RuleContext, RuleEngine
+
+SOURCE = '''"""Module."""
+
+import os
+
+
+def first(d, k):
+    return d[k]
+
+
+@decorator
+def second(a, b):
+    return a / b
+
+
+class Third:
+    def method(self, items):
+        return items[0] / 2
+'''
+
+@pytest.fixture
+def engine():
+    return RuleEngine()
+
+@pytest.fixture
+def context():
+    return RuleContext("module.py", [])
+
+def _full(engine, context, source):
+    return engine.run(ast.parse(source), context)
+
+def test_first_update_matches_full_analysis(engine, context):
+    """Test that a fresh document gets the issues of a full analysis."""
+    document = DocumentAnalysis(engine)
+    assert document.update(SOURCE, context) == _full(engine, context, SOURCE)
+    assert [b.start for b in document.blocks] == [1, 3, 6, 10, 15]
+
+def test_edit_visits_only_changed_block(engine, context):
+    """Test that editing one function re-visits only that function."""
+    document = DocumentAnalysis(engine)
+    document.update(SOURCE, context)
+    edited = SOURCE.replace("return a / b", "return a / b / c")
+    assert document.update(edited, context) == _full(engine, context, edited)
+    assert document.visited == 1
+
+def test_inserted_lines_shift_later_issues(engine, context):
+    """Test that issues below an edit move with their lines without being re-visited."""
+    document = DocumentAnalysis(engine)
+    document.update(SOURCE, context)
+    third = document.blocks[-1]
+    edited = SOURCE.replace("    return d[k]\n", "    x = 1\n    y = 2\n    return d[k]\n")
+    issues = document.update(edited, context)
+    assert issues == _full(engine, context, edited)
+    assert document.visited == 1
+    assert document.blocks[-1].start == third.start + 2
+    assert document.blocks[-1].issues is third.issues
+
+def test_edit_spanning_blocks_falls_back_to_full_parse(engine, context):
+    """Test that an edit the changed region cannot parse alone is handled."""
+    document = DocumentAnalysis(engine)
+    document.update(SOURCE, context)
+    # A bracket opened in one function and closed in the next block
+    edited = SOURCE.replace("return d[k]", "return (d[k]").replace("@decorator", ")\n@decorator")
+    assert document.update(edited, context) == _full(engine, context, edited)
+    with pytest.raises(SyntaxError):
+        document.update(edited.replace("class Third:", "class Third"), context)
+    # The last version that parsed is still the base for the next edit
+    edited = edited.replace("import os", "import os\nz = q / 3")
+    assert document.update(edited, context) == _full(engine, context, edited)
+
+def test_error_history_change_revisits_all(engine, context):
+    """Test that a new error digest re-analyzes every block."""
+    document = DocumentAnalysis(engine)
+    document.update(SOURCE, context, errors_digest="a")
+    document.update(SOURCE, context, errors_digest="b")
+    assert document.visited == 5
+
+def test_random_edits_match_full_analysis(engine):
+    """Test incremental results against full analysis over random edits."""
+    context = RuleContext("module.py", [{"error_type": "TypeError", "line": 1}])
+    fragments = ["x = a / b", "    y = d[k] + 1", "", "# note", "def g():", "    return 1/0",
+                 "class K:", "@dec", "z = (1,", "2)", "a = b; c = d[1]"]
+    rng = random.Random(7)
+    document = DocumentAnalysis(engine)
+    source = SOURCE * 5
+    document.update(source, context)
+    for _ in range(500):
+        lines = source.split("\n")
+        i = rng.randrange(len(lines))
+        op = rng.randrange(3)
+        if op == 0:
+            lines.insert(i, rng.choice(fragments))
+        elif op == 1 and len(lines) > 1:
+            del lines[i]
+        else:
+            lines[i] = lines[i] + " + 1"
+        edited = "\n".join(lines)
+        try:
+            expected = _full(engine, context, edited)
+        except SyntaxError:
+            with pytest.raises(SyntaxError):
+                document.update(edited, context)
+            continue
+        assert document.update(edited, context) == expected
+        source = edited
+
+def test_analyzer_incremental_mode(tmp_path):
+    """Test that an analyzer in incremental mode returns the same issues."""
+    analyzer = PatternAnalyzer()
+    analyzer.enable_incremental(max_documents=1)
+    path = tmp_path / "module.py"
+    path.write_text(SOURCE)
+    expected = PatternAnalyzer().analyze_file(str(path), [])
+    assert analyzer.analyze_file(str(path), []) == expected
+    edited = SOURCE.replace("return items[0] / 2", "return items[0]")
+    assert analyzer.analyze_source(edited, str(path), []) == \
+        PatternAnalyzer().analyze_source(edited, str(path), [])
+    analyzer.analyze_source("x = 1", "other.py", [])
+    assert list(analyzer._documents) == ["other.py"]
+
+def test_incremental_cached_analysis_honors_coding_declaration(tmp_path):
+    """Test that a file in a declared non-UTF-8 encoding is analyzed, not skipped."""
+    analyzer = PatternAnalyzer()
+    analyzer.enable_cache(str(tmp_path / "cache.db"))
+    analyzer.enable_incremental()
+    path = tmp_path / "module.py"
+    path.write_bytes(("# -*- coding: latin-1 -*-\nNAME = 'caf\u00e9'\n" + SOURCE).encode("latin-1"))
+    expected = PatternAnalyzer().analyze_file(str(path), [])
+    assert expected
+    assert analyzer.analyze_file(str(path), []) == expected 
\ No newline at end of file
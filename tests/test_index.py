@@ -0,0 +1,137 @@
+"""
+Tests for the query index over the error store.
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+from error_learner.index import ErrorIndex
+from error_learner.store import ErrorStore
+
+def _record(key='app.py:handler', error_type='KeyError', line=3,
+            timestamp='2024-04-13T12:00:00', count=1):
+    return {
+        'key': key,
+        'error_type': error_type,
+        'message': 'boom',
+        'line': line,
+        'file': key.rsplit(':', 1)[0],
+        'timestamp': timestamp,
+        'count': count
+    }
+
+def _epoch(timestamp):
+    return datetime.fromisoformat(timestamp).timestamp()
+
+def _fill(path):
+    store = ErrorStore(str(path))
+    store.append(_record(count=5))
+    store.append(_record(key='lib/db.py:connect', error_type='OSError', line=10,
+                         timestamp='2024-04-14T09:30:00', count=2))
+    store.append(_record(key='lib/db.py:query', error_type='KeyError', line=20,
+                         timestamp='2024-04-15T18:00:00', count=7))
+    store.close()
+
+def test_query_filters_and_ranks(tmp_path):
+    """Test filtering by file, function and type, most frequent first."""
+    _fill(tmp_path)
+    index = ErrorIndex(str(tmp_path)).refresh()
+    
+    assert [e['function'] for e in index.query()] == ['query', 'handler', 'connect']
+    assert [e['function'] for e in index.query(top=1)] == ['query']
+    assert [e['function'] for e in index.query(file='db.py')] == ['query', 'connect']
+    assert [e['function'] for e in index.query(file='lib/*.py', error_type='OSError')] == ['connect']
+    assert index.query(function='handler')[0]['count'] == 5
+
+def test_query_time_range(tmp_path):
+    """Test that counts cover only the requested time range."""
+    _fill(tmp_path)
+    index = ErrorIndex(str(tmp_path)).refresh()
+    
+    errors = index.query(since=_epoch('2024-04-14T00:00:00'), until=_epoch('2024-04-15T00:00:00'))
+    assert [(e['function'], e['count']) for e in errors] == [('connect', 2)]
+    stats = index.stats(since=_epoch('2024-04-14T00:00:00'))
+    assert stats['total_errors'] == 9
+    assert stats['error_types'] == {'OSError': 2, 'KeyError': 7}
+
+def test_refresh_reads_only_new_records(tmp_path):
+    """Test that a saved index picks up appended records incrementally."""
+    _fill(tmp_path)
+    ErrorIndex(str(tmp_path)).refresh()
+    
+    store = ErrorStore(str(tmp_path))
+    store.append(_record(count=3))
+    store.close()
+    
+    index = ErrorIndex(str(tmp_path)).refresh()
+    assert index.query(function='handler')[0]['count'] == 8
+    assert index.stats()['total_errors'] == 17
+
+def test_index_survives_compaction(tmp_path):
+    """Test that compaction keeps the index, including its time buckets."""
+    _fill(tmp_path)
+    ErrorIndex(str(tmp_path)).refresh()
+    
+    store = ErrorStore(str(tmp_path))
+    store.append(_record(timestamp='2024-04-16T08:00:00'))
+    store.compact()
+    store.append(_record(timestamp='2024-04-16T09:00:00'))
+    store.close()
+    
+    index = ErrorIndex(str(tmp_path)).refresh()
+    assert index.query(function='handler')[0]['count'] == 7
+    errors = index.query(function='handler', since=_epoch('2024-04-16T00:00:00'))
+    assert errors[0]['count'] == 2
+
+def test_rebuilds_from_snapshot_without_index(tmp_path):
+    """Test that a store compacted before the index existed is still queryable."""
+    _fill(tmp_path)
+    ErrorStore(str(tmp_path)).compact()
+    (tmp_path / 'index.sqlite3').unlink()
+    
+    index = ErrorIndex(str(tmp_path)).refresh()
+    assert index.stats()['total_errors'] == 14
+    assert (tmp_path / 'index.sqlite3').exists()
+
+def test_index_reads_segments_kept_after_compaction(tmp_path):
+    """Test that an index behind a compaction reads on instead of rebuilding."""
+    _fill(tmp_path)
+    ErrorIndex(str(tmp_path)).refresh()
+    
+    store = ErrorStore(str(tmp_path))
+    store.append(_record(timestamp='2024-04-16T08:00:00'))
+    store._sync_index = lambda compacted: False
+    store.compact()
+    store.close()
+    assert list(tmp_path.glob('errors-*.log'))
+    
+    index = ErrorIndex(str(tmp_path)).refresh()
+    errors = index.query(function='handler', since=_epoch('2024-04-16T00:00:00'))
+    assert errors[0]['count'] == 1
+    assert index.query(function='handler')[0]['count'] == 6
+
+def test_compaction_does_not_hold_the_store_for_the_index(tmp_path):
+    """Test that a locked index delays deleting segments, not writing records."""
+    _fill(tmp_path)
+    ErrorIndex(str(tmp_path)).refresh()
+    reader = sqlite3.connect(str(tmp_path / 'index.sqlite3'), isolation_level=None)
+    reader.execute('BEGIN EXCLUSIVE')
+    
+    store = ErrorStore(str(tmp_path))
+    store.append(_record(timestamp='2024-04-16T08:00:00'))
+    compacting = threading.Thread(target=store.compact)
+    compacting.start()
+    while store._compacted is None:
+        compacting.join(0.01)
+    assert store._io_lock.acquire(timeout=5)
+    store._io_lock.release()
+    assert list(tmp_path.glob('errors-*.log'))
+    
+    reader.execute('COMMIT')
+    reader.close()
+    compacting.join()
+    store.close()
+    assert not list(tmp_path.glob('errors-*.log'))
+    index = ErrorIndex(str(tmp_path)).refresh()
+    errors = index.query(function='handler', since=_epoch('2024-04-16T00:00:00'))
+    assert errors[0]['count'] == 1 
\ No newline at end of file
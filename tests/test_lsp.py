@@ -0,0 +1,179 @@
+"""
+Tests for the language server.
+"""
+
+import io
+import json
+import pytest
+from error_learner.analyzer import PatternAnalyzer, get_analyzer
+from error_learner.lsp import LanguageServer, TextDocument
+from error_learner.store import ErrorStore
+
+URI = "file:///tmp/project/app.py"
+
+def _frame(message):
+    body = json.dumps(message).encode()
+    return b"Content-Length: %d\r\n\r\n" % len(body) + body
+
+def _messages(data):
+    messages = []
+    while data:
+        header, _, rest = data.partition(b"\r\n\r\n")
+        length = int(header.split(b":")[1])
+        messages.append(json.loads(rest[:length]))
+        data = rest[length:]
+    return messages
+
+def _change(start, end, text):
+    return {"range": {"start": {"line": start[0], "character": start[1]},
+                      "end": {"line": end[0], "character": end[1]}},
+            "text": text}
+
+def test_incremental_edits():
+    """Test applying range edits within and across lines."""
+    document = TextDocument(URI, "a = 1\nb = 2\nc = 3")
+    document.apply(_change((1, 4), (1, 5), "20"))
+    assert document.text == "a = 1\nb = 20\nc = 3"
+    document.apply(_change((0, 5), (2, 0), "\nx = 0\n"))
+    assert document.text == "a = 1\nx = 0\nc = 3"
+    document.apply({"text": "new"})
+    assert document.lines == ["new"]
+
+def test_edits_count_utf16_units():
+    """Test that character offsets are UTF-16 code units, as LSP specifies."""
+    document = TextDocument(URI, "s = '\U0001F600x'")
+    # The emoji is two UTF-16 units, so 'x' starts at 7
+    document.apply(_change((0, 7), (0, 8), "y"))
+    assert document.text == "s = '\U0001F600y'"
+
+def test_uri_to_path():
+    """Test that document paths are decoded from their URIs."""
+    assert TextDocument("file:///tmp/my%20project/a.py", "").path == "/tmp/my project/a.py"
+    # Decoded once: %25 is a literal percent sign
+    assert TextDocument("file:///tmp/a%252541.py", "").path == "/tmp/a%2541.py"
+
+@pytest.fixture
+def server():
+    server = LanguageServer(analyzer=PatternAnalyzer(), debounce=0.05).start(io.BytesIO())
+    server.handle({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
+    yield server
+    server.close()
+
+def _published(server):
+    return [m for m in _messages(server._output.getvalue())
+            if m.get("method") == "textDocument/publishDiagnostics"]
+
+def test_publishes_diagnostics_for_edits(server):
+    """Test that diagnostics follow in-memory edits, not the file on disk."""
+    server.handle({"method": "textDocument/didOpen", "params": {"textDocument": {
+        "uri": URI, "languageId": "python", "version": 1, "text": "x = 1\ny = x / 0\n"}}})
+    assert server.wait_idle(5)
+    published = _published(server)
+    assert published[-1]["params"]["version"] == 1
+    diagnostics = published[-1]["params"]["diagnostics"]
+    assert [(d["code"], d["range"]["start"]["line"]) for d in diagnostics] == [("ZeroDivisionError", 1)]
+    
+    server.handle({"method": "textDocument/didChange", "params": {
+        "textDocument": {"uri": URI, "version": 2},
+        "contentChanges": [_change((1, 6), (1, 7), "+")]}})
+    assert server.wait_idle(5)
+    published = _published(server)
+    assert published[-1]["params"] == {"uri": URI, "diagnostics": [], "version": 2}
+
+def test_burst_of_edits_is_analyzed_once(server):
+    """Test that only the latest version of a rapidly edited document is analyzed."""
+    server.handle({"method": "textDocument/didOpen", "params": {"textDocument": {
+        "uri": URI, "languageId": "python", "version": 1, "text": "x = 1\n"}}})
+    assert server.wait_idle(5)
+    for version in range(2, 12):
+        server.handle({"method": "textDocument/didChange", "params": {
+            "textDocument": {"uri": URI, "version": version},
+            "contentChanges": [_change((0, 4), (0, 5), str(version))]}})
+    assert server.wait_idle(5)
+    versions = [m["params"]["version"] for m in _published(server)]
+    assert versions == [1, 11]
+
+def test_syntax_error_keeps_diagnostics(server):
+    """Test that a document that does not parse mid-edit publishes nothing."""
+    server.handle({"method": "textDocument/didOpen", "params": {"textDocument": {
+        "uri": URI, "languageId": "python", "version": 1, "text": "def f(:\n"}}})
+    assert server.wait_idle(5)
+    assert _published(server) == []
+
+def test_close_clears_diagnostics(server):
+    """Test that closing a document clears its diagnostics."""
+    server.handle({"method": "textDocument/didOpen", "params": {"textDocument": {
+        "uri": URI, "languageId": "python", "version": 1, "text": "y = 1 / 0\n"}}})
+    assert server.wait_idle(5)
+    server.handle({"method": "textDocument/didClose", "params": {"textDocument": {"uri": URI}}})
+    assert _published(server)[-1]["params"] == {"uri": URI, "diagnostics": []}
+    assert URI not in server.documents
+
+def test_run_lifecycle():
+    """Test the initialize, shutdown and exit sequence over streams."""
+    input = io.BytesIO(b"".join([
+        _frame({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}}),
+        _frame({"jsonrpc": "2.0", "method": "initialized", "params": {}}),
+        _frame({"jsonrpc": "2.0", "id": 2, "method": "textDocument/hover", "params": {}}),
+        _frame({"jsonrpc": "2.0", "id": 3, "method": "shutdown"}),
+        _frame({"jsonrpc": "2.0", "method": "exit"}),
+    ]))
+    output = io.BytesIO()
+    assert LanguageServer(analyzer=PatternAnalyzer()).run(input, output) == 0
+    responses = {m["id"]: m for m in _messages(output.getvalue())}
+    assert responses[1]["result"]["capabilities"]["textDocumentSync"]["change"] == 2
+    assert responses[2]["error"]["code"] == -32601
+    assert responses[3]["result"] is None
+
+def test_malformed_messages_do_not_stop_the_server():
+    """Test that bad messages get error replies or are logged, and serving goes on."""
+    not_json = b"{not json"
+    input = io.BytesIO(b"".join([
+        _frame({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}}),
+        b"Content-Length: %d\r\n\r\n" % len(not_json) + not_json,
+        _frame({"jsonrpc": "2.0", "method": "textDocument/didOpen",
+                "params": {"textDocument": {"uri": URI}}}),
+        _frame({"jsonrpc": "2.0", "id": 2, "method": "textDocument/didOpen", "params": {}}),
+        _frame({"jsonrpc": "2.0", "id": 3, "method": "shutdown"}),
+        _frame({"jsonrpc": "2.0", "method": "exit"}),
+    ]))
+    output = io.BytesIO()
+    assert LanguageServer(analyzer=PatternAnalyzer()).run(input, output) == 0
+    responses = {m["id"]: m for m in _messages(output.getvalue())}
+    assert responses[None]["error"]["code"] == -32700
+    assert responses[2]["error"]["code"] == -32602
+    assert responses[3]["result"] is None
+
+def test_default_analyzer_is_not_the_global_one():
+    """Test that the server's incremental analyzer leaves the global analyzer alone."""
+    server = LanguageServer()
+    assert server.analyzer.incremental
+    assert server.analyzer is not get_analyzer()
+    assert not get_analyzer().incremental
+
+def test_top_publishes_only_ranked_issues(tmp_path):
+    """Test that with top set, only issues whose error type failed there are published."""
+    store = ErrorStore(str(tmp_path))
+    store.append({'key': '/tmp/project/app.py:f', 'error_type': 'KeyError', 'message': "'k'",
+                  'line': 2, 'file': '/tmp/project/app.py', 'timestamp': '2024-04-13T12:00:00',
+                  'count': 3, 'function_line': 1})
+    store.close()
+    server = LanguageServer(analyzer=PatternAnalyzer(), store=str(tmp_path), top=5)
+    server.start(io.BytesIO())
+    try:
+        server.handle({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
+        server.handle({"method": "textDocument/didOpen", "params": {"textDocument": {
+            "uri": URI, "languageId": "python", "version": 1,
+            "text": "def f(d):\n    return d['k']\n\n\ndef g(a):\n    return a / 0\n"}}})
+        assert server.wait_idle(5)
+        diagnostics = _published(server)[-1]["params"]["diagnostics"]
+        assert [(d["code"], d["range"]["start"]["line"]) for d in diagnostics] == [("KeyError", 1)]
+        
+        # Mid-edit, the last ranked diagnostics stay
+        server.handle({"method": "textDocument/didChange", "params": {
+            "textDocument": {"uri": URI, "version": 2},
+            "contentChanges": [_change((0, 0), (0, 0), "def (")]}})
+        assert server.wait_idle(5)
+        assert len(_published(server)) == 1
+    finally:
+        server.close() 
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Tests for wrapper-free tracking through sys.monitoring.
+"""
+
+import pytest
+from error_learner import monitoring
+from error_learner.core import ErrorTracker
+
+needs_monitoring = pytest.mark.skipif(not monitoring.AVAILABLE, reason="sys.monitoring needs Python 3.12+")
+
+@pytest.fixture
+def tracker():
+    """Fixture providing a fresh ErrorTracker instance."""
+    return ErrorTracker()
+
+@needs_monitoring
+def test_function_is_not_wrapped(tracker):
+    """Test that tracked functions are returned unchanged and still tracked."""
+    def fail(x):
+        if x:
+            raise ValueError("bad")
+        return x
+    
+    tracked = tracker.track(fail)
+    assert tracked is fail
+    assert tracked(0) == 0
+    with pytest.raises(ValueError):
+        tracked(1)
+    
+    history = tracker.error_history["fail"]
+    assert len(history) == 1
+    assert history[0].error_type is ValueError
+    assert history[0].line_number == fail.__code__.co_firstlineno + 2
+
+@needs_monitoring
+def test_handled_exceptions_are_ignored(tracker):
+    """Test that exceptions caught inside the function are not recorded."""
+    @tracker.track
+    def recovers():
+        try:
+            {}['missing']
+        except KeyError:
+            return None
+    
+    recovers()
+    assert "recovers" not in tracker.error_history
+
+@needs_monitoring
+def test_generators_are_wrapped(tracker):
+    """Test that generator functions fall back to the wrapper."""
+    def gen():
+        yield 1
+    
+    assert tracker.track(gen) is not gen
+
+def test_wrapper_fallback(tracker):
+    """Test that the wrapper is used when monitoring is off."""
+    tracker.use_monitoring = False
+    
+    def fail():
+        raise KeyError("k")
+    
+    tracked = tracker.track(fail)
+    assert tracked is not fail
+    assert tracked.__wrapped__ is fail
+    with pytest.raises(KeyError):
+        tracked()
+    assert len(tracker.error_history["fail"]) == 1
+
+@needs_monitoring
+def test_registrations_die_with_the_tracker():
+    """Test that tracking a function does not keep its tracker or code alive."""
+    import gc
+    import weakref
+    
+    trackers, codes = [], []
+    for _ in range(100):
+        tracker = ErrorTracker()
+        
+        def fail():
+            raise ValueError("bad")
+        
+        tracker.track(fail)
+        trackers.append(weakref.ref(tracker))
+        codes.append(id(fail.__code__))
+    del tracker, fail
+    gc.collect()
+    
+    assert all(ref() is None for ref in trackers)
+    assert not set(codes) & set(monitoring._codes)
+
+@needs_monitoring
+def test_unregistered_code_is_not_tracked(tracker):
+    """Test that unregistering a code object stops tracking it."""
+    def fail():
+        raise ValueError("bad")
+    
+    tracker.track(fail)
+    monitoring.unregister(fail.__code__, id(tracker))
+    with pytest.raises(ValueError):
+        fail()
+    assert "fail" not in tracker.error_history
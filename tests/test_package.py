@@ -0,0 +1,50 @@
+"""
+Tests for the package's lazy public names.
+"""
+
+import os
+import subprocess
+import sys
+
+import error_learner
+from error_learner.analyzer import PatternAnalyzer, get_analyzer
+from error_learner.extension import ExtensionTracker, get_tracker
+
+def test_import_defers_submodules():
+    """Test that importing the package loads neither the tracker nor the analyzer."""
+    code = (
+        "import sys, error_learner; "
+        "print([m for m in ('error_learner.extension', 'error_learner.analyzer', 'ast') "
+        "if m in sys.modules])"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run([sys.executable, "-c", code], env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+def test_tracker_import_defers_slow_modules():
+    """Test that the tracker loads without the modules only some features need."""
+    code = (
+        "import sys; from error_learner import tracker; "
+        "print([m for m in ('inspect', 'dataclasses', 'hashlib', 'sqlite3') "
+        "if m in sys.modules])"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run([sys.executable, "-c", code], env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+def test_single_global_tracker_and_analyzer():
+    """Test that every public path leads to the same instances."""
+    from error_learner import analyzer, tracker
+    from error_learner.extension import tracker as extension_tracker
+    
+    assert isinstance(tracker, ExtensionTracker)
+    assert tracker is extension_tracker is get_tracker()
+    assert isinstance(analyzer, PatternAnalyzer)
+    assert analyzer is error_learner.analyzer is get_analyzer()
+
+def test_unknown_name():
+    """Test that unknown names still raise AttributeError."""
+    assert 'tracker' in dir(error_learner)
+    assert not hasattr(error_learner, 'missing')
@@ -0,0 +1,178 @@
+"""
+Tests for history retention policies.
+"""
+
+import threading
+import time
+import pytest
+from error_learner.core import ErrorTracker
+from error_learner.extension import ExtensionTracker
+from error_learner.policies import (
+    AdaptiveSampler, KeyEvictor, RateLimiter, RetentionPolicy, SamplingPolicy, WindowedCounter
+)
+
+@pytest.fixture
+def quiet():
+    def make(cls, **policy):
+        tracker = cls(retention=RetentionPolicy(**policy))
+        tracker.logger.disabled = True
+        return tracker
+    return make
+
+def test_windowed_counter_slides():
+    """Test that old buckets fall out of the window."""
+    counter = WindowedCounter(60, buckets=6)
+    assert counter.add(now=0) == 1
+    assert counter.add(now=30) == 2
+    assert counter.add(now=65) == 2
+    assert counter.total(now=200) == 0
+
+def test_evictor_lru_and_lfu():
+    """Test the eviction order of both policies."""
+    lru = KeyEvictor('lru')
+    lfu = KeyEvictor('lfu')
+    for key in ['a', 'b', 'a', 'c', 'a', 'b']:
+        lru.touch(key)
+        lfu.touch(key)
+    assert lru.evict_over(1) == ['c', 'a']
+    assert lfu.evict_over(1) == ['c', 'b']
+
+def test_lfu_skips_missing_frequencies():
+    """Test that LFU eviction goes straight to the next frequency in use."""
+    lfu = KeyEvictor('lfu')
+    for key, uses in [('rare', 1), ('hot', 100_000), ('warm', 50)]:
+        for _ in range(uses):
+            lfu.touch(key)
+    chain, frequency = [], lfu._lowest
+    while frequency is not None:
+        chain.append(frequency)
+        frequency = lfu._higher[frequency]
+    assert chain == [1, 50, 100_000]
+    assert lfu.evict_over(0) == ['rare', 'warm', 'hot']
+    assert lfu._buckets == {} and lfu._lowest is None
+    with pytest.raises(KeyError):
+        lfu.evict()
+
+def test_max_entries_per_key(quiet):
+    """Test that each function keeps only its most recent entries."""
+    tracker = quiet(ExtensionTracker, max_entries_per_key=2)
+    for line in [1, 2, 1, 3]:
+        tracker._track_error(KeyError, "'k'", 'f', line, 'app.py')
+    assert [e['line'] for e in tracker.error_history['app.py:f']] == [1, 3]
+    assert not tracker.has_error('app.py', 2, 'KeyError')
+    
+    # Another function's entries at the same lines are left alone
+    tracker._track_error(KeyError, "'k'", 'g', 1, 'app.py')
+    tracker._track_error(IndexError, "0", 'f', 4, 'app.py')
+    tracker._track_error(IndexError, "0", 'f', 5, 'app.py')
+    assert tracker.has_error('app.py', 1, 'KeyError')
+    assert not tracker.has_error('app.py', 3, 'KeyError')
+    assert ('app.py:f', 'KeyError') not in tracker._type_counts
+    # Types with a single entry are not listed
+    assert tracker._type_entries == {('app.py:f', 'IndexError'): 2}
+    assert [e['line'] for e in tracker.get_file_errors('app.py')] == [1, 4, 5]
+    
+    core_tracker = quiet(ErrorTracker, max_entries_per_key=2)
+    
+    @core_tracker.track
+    def fail():
+        raise ValueError("boom")
+    
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            fail()
+    assert len(core_tracker.error_history['fail']) == 2
+    assert core_tracker.error_history['fail'][-1].fix_suggestion is not None
+
+def test_max_keys_evicts_functions(quiet):
+    """Test the global cap on tracked functions."""
+    tracker = quiet(ExtensionTracker, max_keys=2, eviction='lru')
+    for func in ['a', 'b', 'a', 'c']:
+        tracker._track_error(KeyError, "'k'", func, 1, 'app.py')
+    assert sorted(tracker.error_history) == ['app.py:a', 'app.py:c']
+    assert ('app.py:b', 'KeyError') not in tracker._type_counts
+    assert len(tracker.get_file_errors('app.py')) == 2
+
+def test_threshold_counts_window_only(quiet, monkeypatch):
+    """Test that the threshold means N errors within the window."""
+    import error_learner.extension as extension
+    tracker = quiet(ExtensionTracker, window_seconds=60)
+    now = [1000.0]
+    monkeypatch.setattr(extension.time, 'time', lambda: now[0])
+    
+    for offset in [0, 10, 200, 210]:
+        now[0] = 1000.0 + offset
+        tracker._track_error(KeyError, "'k'", 'f', 1, 'app.py')
+    assert tracker._windows[('app.py:f', 'KeyError')].total(now[0]) == 2
+    assert tracker._type_counts[('app.py:f', 'KeyError')] == 4
+
+def test_sampler_is_exact_then_scales():
+    """Test that sampled weights add up to the number of occurrences."""
+    sampler = AdaptiveSampler(exact_first=10, max_rate=8)
+    weights = [sampler.offer('k') for _ in range(1000)]
+    assert weights[:10] == [1] * 10
+    assert sum(weights) <= 1000
+    assert 1000 - sum(weights) < 8
+    assert max(weights) == 8
+    assert sum(1 for w in weights if w) < 200
+
+def test_rate_limiter_once_per_interval():
+    """Test that an action is allowed once per key per interval."""
+    limiter = RateLimiter(60)
+    assert limiter.allow('a', now=0)
+    assert not limiter.allow('a', now=30)
+    assert limiter.allow('b', now=30)
+    assert limiter.allow('a', now=61)
+
+def test_rate_limiter_allows_one_thread():
+    """Test that threads racing for the same key get one allowance between them."""
+    class SlowDict(dict):
+        def get(self, key, default=None):
+            value = super().get(key, default)
+            # Widen the window between the check and the update
+            time.sleep(0.01)
+            return value
+    
+    limiter = RateLimiter(60)
+    limiter._last = SlowDict()
+    barrier = threading.Barrier(8)
+    allowed = []
+    
+    def race():
+        barrier.wait()
+        if limiter.allow('key', now=0):
+            allowed.append(True)
+    
+    threads = [threading.Thread(target=race) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(allowed) == 1
+
+def test_storm_is_sampled(monkeypatch):
+    """Test that a storm is recorded with scaled counts and one suggestion."""
+    tracker = ExtensionTracker(sampling=SamplingPolicy(exact_first=50, max_rate=64))
+    logged = []
+    monkeypatch.setattr(tracker.logger, 'info', logged.append)
+    for _ in range(10_000):
+        tracker._track_error(KeyError, "'k'", 'f', 1, 'app.py')
+    
+    count = tracker._type_counts[('app.py:f', 'KeyError')]
+    assert 10_000 - 64 < count <= 10_000
+    assert tracker.error_history['app.py:f'][0]['count'] == count
+    assert len(logged) == 1
+
+def test_policies_compare_by_value():
+    """Test that policies compare and print like the dataclasses they replace."""
+    assert RetentionPolicy(max_keys=10) == RetentionPolicy(max_keys=10)
+    assert RetentionPolicy(max_keys=10) != RetentionPolicy(max_keys=20)
+    assert repr(SamplingPolicy()) == "SamplingPolicy(exact_first=100, max_rate=1024, suggest_interval=60.0)"
+    assert SamplingPolicy.suggest_interval == 60.0
+
+def test_sampling_policy_validation():
+    """Test that invalid sampling policies are rejected."""
+    with pytest.raises(ValueError):
+        SamplingPolicy(exact_first=0)
+    with pytest.raises(ValueError):
+        SamplingPolicy(max_rate=0)
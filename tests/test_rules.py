@@ -0,0 +1,59 @@
+"""
+Tests for the analysis rule engine.
+"""
+
+import ast
+from error_learner.rules import Rule, RuleContext, RuleEngine, default_rules
+from error_learner.analyzer import PatternAnalyzer
+
+CODE = """
+def process(data, total):
+    ratio = data['count'] / total
+    return ratio + data['offset']
+"""
+
+def test_rules_only_see_their_node_types():
+    """Test that rules are dispatched by node type."""
+    seen = []
+    
+    class NameRule(Rule):
+        node_types = (ast.Name,)
+        
+        def check(self, node, context):
+            seen.append(type(node))
+            return None
+    
+    RuleEngine([NameRule()]).run(ast.parse(CODE), RuleContext('f.py', []))
+    assert seen and all(t is ast.Name for t in seen)
+
+def test_default_rules_in_source_order():
+    """Test the default rules and the order of their issues."""
+    engine = RuleEngine()
+    issues = engine.run(ast.parse(CODE), RuleContext('f.py', []))
+    assert [(i['type'], i['line']) for i in issues] == [
+        ('ZeroDivisionError', 3), ('KeyError', 3), ('KeyError', 4)
+    ]
+    
+    context = RuleContext('f.py', [{'error_type': 'TypeError', 'line': 4}])
+    issues = engine.run(ast.parse(CODE), context)
+    assert ('TypeError', 4) in [(i['type'], i['line']) for i in issues]
+
+def test_custom_rule(tmp_path):
+    """Test adding a rule to an analyzer."""
+    class AssertRule(Rule):
+        node_types = (ast.Assert,)
+        
+        def check(self, node, context):
+            return {
+                'type': 'AssertionError',
+                'line': node.lineno,
+                'message': "Assertion may fail",
+                'suggestion': "Raise an explicit exception instead"
+            }
+    
+    source = tmp_path / 'module.py'
+    source.write_text("assert x\n")
+    analyzer = PatternAnalyzer()
+    analyzer.add_rule(AssertRule())
+    assert [i['type'] for i in analyzer.analyze_file(str(source))] == ['AssertionError']
+    assert len(analyzer.engine.rules) == len(default_rules()) + 1
@@ -0,0 +1,94 @@
+"""
+Tests for approximate error counting.
+"""
+
+import random
+
+import pytest
+
+from error_learner.extension import ExtensionTracker
+from error_learner.sketch import CountMinSketch, ErrorSketch
+from error_learner.utils import get_error_stats
+
+
+def _skewed_stream(n=10000, seed=7):
+    rng = random.Random(seed)
+    for _ in range(n):
+        # Zipf-like: a few functions raise most of the errors
+        func = f"func_{min(int(rng.paretovariate(1.2)), 2000)}"
+        yield func, rng.choice([KeyError, ValueError, TypeError])
+
+
+def test_count_min_never_undercounts():
+    """Test that estimates are upper bounds."""
+    sketch = CountMinSketch(width=64, depth=4, seed=1)
+    exact = {}
+    for i in range(5000):
+        key = i % 300
+        exact[key] = exact.get(key, 0) + 1
+        sketch.add(key)
+    assert all(sketch.estimate(key) >= count for key, count in exact.items())
+    assert sketch.total == 5000
+
+
+def test_sketch_matches_exact_tracker_within_bounds():
+    """Test the sketch against an exact tracker on a skewed stream."""
+    epsilon = 0.001
+    exact = ExtensionTracker()
+    approximate = ExtensionTracker(sketch=ErrorSketch(epsilon=epsilon, delta=0.01, seed=3))
+    events = list(_skewed_stream())
+    for func, error_type in events:
+        exact._track_error(error_type, "boom", func, 10, "app.py")
+        approximate._track_error(error_type, "boom", func, 10, "app.py")
+
+    sketch = approximate.sketch
+    bound = epsilon * len(events)
+    within = 0
+    for (error_key, type_name), counts in exact._type_counts.items():
+        func = error_key.split(":", 1)[1]
+        estimate = sketch.estimate("app.py", func, type_name)
+        assert estimate >= counts
+        within += estimate - counts <= bound
+    assert within >= 0.95 * len(exact._type_counts)
+    assert exact.get_error_stats()["total_errors"] == approximate.get_error_stats()["total_errors"]
+
+
+def test_heavy_hitters_include_true_top_errors():
+    """Test that the most frequent errors are kept."""
+    sketch = ErrorSketch(top_k=20, seed=5)
+    exact = {}
+    for func, error_type in _skewed_stream():
+        location = ("app.py", func, 10, error_type.__name__)
+        exact[location] = exact.get(location, 0) + 1
+        sketch.record(*location, "boom", 0.0)
+
+    true_top = sorted(exact, key=exact.get, reverse=True)[:5]
+    kept = {location for location, _ in sketch.heavy_hitters()}
+    assert set(true_top) <= kept
+    assert sketch.heavy_hitters(1)[0][0] == true_top[0]
+
+
+def test_tracker_in_sketch_mode():
+    """Test the recurrence threshold, history and stats in sketch mode."""
+    tracker = ExtensionTracker(sketch=ErrorSketch(seed=0))
+    for _ in range(3):
+        tracker._track_error(KeyError, "'missing'", "lookup", 4, "app.py")
+
+    assert tracker._error_history == {}
+    history = tracker.error_history
+    assert history["app.py:lookup"][0]["count"] == 3
+    assert history["app.py:lookup"][0]["error_type"] == "KeyError"
+
+    assert get_error_stats(tracker.sketch) == tracker.get_error_stats()
+    stats = tracker.get_error_stats()
+    assert stats["total_errors"] == 3
+    assert stats["error_types"] == {"KeyError": 3}
+    assert stats["top_errors"][0]["function"] == "lookup"
+    # No per-file history is kept
+    assert tracker.get_file_errors("app.py") == []
+
+
+def test_invalid_bounds():
+    """Test that impossible error bounds are rejected."""
+    with pytest.raises(ValueError):
+        ErrorSketch(epsilon=0)
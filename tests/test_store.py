@@ -0,0 +1,108 @@
+"""
+Tests for the persistent error store.
+"""
+
+import json
+import threading
+from collections import deque
+import pytest
+from error_learner.store import ErrorStore
+from error_learner.extension import ExtensionTracker
+
+def _record(line=3, count=1):
+    return {
+        'key': 'app.py:handler',
+        'error_type': 'KeyError',
+        'message': "'user'",
+        'line': line,
+        'file': 'app.py',
+        'timestamp': '2024-04-13T12:00:00',
+        'count': count
+    }
+
+def test_append_and_reload(tmp_path):
+    """Test that flushed records survive a new store instance."""
+    store = ErrorStore(str(tmp_path))
+    for _ in range(3):
+        store.append(_record())
+    store.append(_record(line=7))
+    store.close()
+    
+    history = ErrorStore(str(tmp_path)).load()
+    entries = history['app.py:handler']
+    assert entries[('KeyError', 3)]['count'] == 3
+    assert entries[('KeyError', 7)]['count'] == 1
+
+def test_append_after_close_is_written(tmp_path):
+    """Test that a record appended after close() is not left in the queue."""
+    store = ErrorStore(str(tmp_path))
+    store.append(_record())
+    store.close()
+    store.append(_record(line=7))
+    
+    assert not store._pending
+    entries = ErrorStore(str(tmp_path)).load()['app.py:handler']
+    assert entries[('KeyError', 7)]['count'] == 1
+
+def test_batch_is_coalesced(tmp_path):
+    """Test that repeats within a batch are written as one log line."""
+    store = ErrorStore(str(tmp_path))
+    for _ in range(5):
+        store.append(_record())
+    store.flush()
+    
+    segments = list(tmp_path.glob('errors-*.log'))
+    assert len(segments) == 1
+    lines = segments[0].read_text().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])['count'] == 5
+    store.close()
+
+def test_compaction_folds_segments_into_snapshot(tmp_path):
+    """Test that compaction replaces old segments with a snapshot."""
+    store = ErrorStore(str(tmp_path), compact_every=2)
+    store.append(_record(line=1))
+    store.append(_record(line=2))
+    store.flush()
+    store.append(_record(line=1))
+    store.close()
+    
+    assert (tmp_path / 'snapshot.json').exists()
+    assert len(list(tmp_path.glob('errors-*.log'))) == 1
+    
+    entries = ErrorStore(str(tmp_path)).load()['app.py:handler']
+    assert entries[('KeyError', 1)]['count'] == 2
+    assert entries[('KeyError', 2)]['count'] == 1
+
+def test_tracker_resumes_counts_from_store(tmp_path):
+    """Test that the recurrence threshold survives a restart."""
+    store = ErrorStore(str(tmp_path))
+    tracker = ExtensionTracker(store=store)
+    for _ in range(2):
+        tracker._track_error(KeyError, "'user'", 'handler', 3, 'app.py')
+    store.close()
+    
+    restarted = ExtensionTracker(store=ErrorStore(str(tmp_path)))
+    assert restarted.error_history['app.py:handler'][0]['count'] == 2
+    restarted._track_error(KeyError, "'user'", 'handler', 3, 'app.py')
+    assert restarted._type_counts[('app.py:handler', 'KeyError')] == 3
+
+def test_recording_does_not_wait_for_the_load(tmp_path, monkeypatch):
+    """Test that errors raised while the history loads are merged with it, not blocked by it."""
+    store = ErrorStore(str(tmp_path))
+    store.append(_record())
+    store.close()
+    
+    store = ErrorStore(str(tmp_path))
+    release = threading.Event()
+    load = store.load
+    monkeypatch.setattr(store, 'load', lambda: release.wait(5) and load())
+    tracker = ExtensionTracker(store=store)
+    tracker._track_error(KeyError, "'user'", 'handler', 3, 'app.py')
+    assert not release.is_set()
+    assert store._pending == deque()
+    
+    release.set()
+    assert tracker.error_history['app.py:handler'][0]['count'] == 2
+    store.close()
+    assert ErrorStore(str(tmp_path)).load()['app.py:handler'][('KeyError', 3)]['count'] == 2